@@ -0,0 +1,169 @@
+"""
+Benchmark: add_flight resource availability, per-entity path vs. availability engine.
+
+The per-entity path is what add_flight used to do: one time-overlap query per resource type,
+then one continuity query (legacy_location_continuity) for every candidate aircraft / pilot / attendant.
+The engine is find_available_resources(), measured twice:
+- sql:      one set-based query per resource type (RESOURCE_TIMELINE=0)
+- timeline: candidates query + the in-memory ResourceTimeline index
+
+Every path is run for every route at the given departure time; the script reports wall time,
+DB round-trips (pooled connection borrows) and checks that all paths return the same entities.
+
+Usage (from the repository root, against a populated database):
+    python -m benchmarks.availability --departure "2026-03-01 08:00" --repeat 5
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import main as flytau
+from main import db_manager, find_available_resources, resource_timeline
+
+
+def legacy_location_continuity(entity_id, entity_type, new_origin, check_time):
+    """The pre-timeline check_location_continuity(): one ORDER BY arrival DESC LIMIT 1 query per entity."""
+    join = {
+        'aircraft': "FROM Flight f JOIN Route r ON f.route_id = r.route_id WHERE f.aircraft_id = %s",
+        'pilot': "FROM Pilots_on_Flights pf JOIN Flight f ON pf.flight_id = f.flight_id "
+                 "JOIN Route r ON f.route_id = r.route_id WHERE pf.employee_id = %s",
+        'attendant': "FROM Flight_Attendant_on_Flights af JOIN Flight f ON af.flight_id = f.flight_id "
+                     "JOIN Route r ON f.route_id = r.route_id WHERE af.employee_id = %s",
+    }[entity_type]
+    last_flight = db_manager.fetch_one(f"""
+        SELECT r.destination,
+               COALESCE(f.arrival_datetime, DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time),
+                                                     INTERVAL r.duration MINUTE)) AS arrival_dt
+        {join}
+          AND f.flight_status != 'Cancelled'
+        ORDER BY arrival_dt DESC
+        LIMIT 1
+    """, (entity_id,))
+    if not last_flight:
+        return new_origin == 'TLV'
+    return (new_origin == last_flight['destination']) and (check_time >= last_flight['arrival_dt'])
+
+
+def legacy_available_resources(route, start_dt):
+    """The pre-engine add_flight logic (steps check_availability + assign_crew)."""
+    duration_minutes = int(route['duration'])
+    is_long_flight = duration_minutes > 360
+    end_dt = start_dt + timedelta(minutes=duration_minutes)
+    size_filter = " AND a.size = 'Big' " if is_long_flight else ""
+    pilot_qual_filter = "AND p.is_qualified = 1" if is_long_flight else ""
+    attendant_qual_filter = "AND a.is_qualified = 1" if is_long_flight else ""
+
+    aircraft = db_manager.fetch_all(f"""
+        SELECT a.* FROM Aircraft a
+        WHERE 1=1
+        {size_filter}
+        AND a.aircraft_id NOT IN (
+            SELECT f.aircraft_id FROM Flight f
+            JOIN Route r ON f.route_id = r.route_id
+            WHERE f.flight_status != 'Cancelled'
+            AND (
+                TIMESTAMP(f.departure_date, f.departure_time) < %s
+                AND
+                ADDTIME(TIMESTAMP(f.departure_date, f.departure_time), SEC_TO_TIME(r.duration * 60)) > %s
+            )
+        )
+    """, (end_dt, start_dt)) or []
+
+    pilots = db_manager.fetch_all(f"""
+        SELECT p.* FROM Pilot p
+        WHERE 1=1 {pilot_qual_filter}
+          AND p.employee_id NOT IN (
+              SELECT pf.employee_id
+              FROM Pilots_on_Flights pf
+              JOIN Flight f ON pf.flight_id = f.flight_id
+              JOIN Route r ON f.route_id = r.route_id
+              WHERE f.flight_status != 'Cancelled'
+                AND TIMESTAMP(f.departure_date, f.departure_time) < %s
+                AND COALESCE(f.arrival_datetime,
+                    DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE)) > %s
+          )
+    """, (end_dt, start_dt)) or []
+
+    attendants = db_manager.fetch_all(f"""
+        SELECT a.* FROM Flight_Attendant a
+        WHERE 1=1 {attendant_qual_filter}
+          AND a.employee_id NOT IN (
+              SELECT af.employee_id
+              FROM Flight_Attendant_on_Flights af
+              JOIN Flight f ON af.flight_id = f.flight_id
+              JOIN Route r ON f.route_id = r.route_id
+              WHERE f.flight_status != 'Cancelled'
+                AND TIMESTAMP(f.departure_date, f.departure_time) < %s
+                AND COALESCE(f.arrival_datetime,
+                    DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE)) > %s
+          )
+    """, (end_dt, start_dt)) or []
+
+    origin = route['origin']
+    return {
+        'aircraft': [a for a in aircraft
+                     if legacy_location_continuity(a['aircraft_id'], 'aircraft', origin, start_dt)],
+        'pilots': [p for p in pilots
+                   if legacy_location_continuity(p['employee_id'], 'pilot', origin, start_dt)],
+        'attendants': [a for a in attendants
+                       if legacy_location_continuity(a['employee_id'], 'attendant', origin, start_dt)],
+    }
+
+
+def _ids(result):
+    return {
+        'aircraft': sorted(a['aircraft_id'] for a in result['aircraft']),
+        'pilots': sorted(p['employee_id'] for p in result['pilots']),
+        'attendants': sorted(a['employee_id'] for a in result['attendants']),
+    }
+
+
+def run(label, fn, routes, start_dt, repeat):
+    borrowed_before = db_manager.pool.stats()['borrowed']
+    started = time.perf_counter()
+    results = {}
+    for _ in range(repeat):
+        for route in routes:
+            results[route['route_id']] = _ids(fn(route, start_dt))
+    elapsed = time.perf_counter() - started
+    round_trips = db_manager.pool.stats()['borrowed'] - borrowed_before
+    calls = repeat * len(routes)
+    print(f"{label:<12} {elapsed / calls * 1000:9.2f} ms/lookup   {round_trips / calls:7.1f} queries/lookup")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-entity availability path with the engine.")
+    parser.add_argument('--departure', default=None,
+                        help="Departure 'YYYY-MM-DD HH:MM' (default: tomorrow 08:00)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    start_dt = (datetime.strptime(args.departure, '%Y-%m-%d %H:%M') if args.departure
+                else datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time()).replace(hour=8))
+    routes = db_manager.fetch_all("SELECT * FROM Route") or []
+    if not routes:
+        print("ERROR: no routes (is the database populated?)")
+        raise SystemExit(1)
+
+    print(f"{len(routes)} routes, departure {start_dt}, repeat {args.repeat}")
+    legacy = run('per-entity', legacy_available_resources, routes, start_dt, args.repeat)
+
+    flytau.RESOURCE_TIMELINE_ENABLED = False
+    engine_sql = run('sql', find_available_resources, routes, start_dt, args.repeat)
+
+    flytau.RESOURCE_TIMELINE_ENABLED = True
+    resource_timeline.rebuild()
+    print(f"timeline built in {resource_timeline.last_build_seconds:.3f}s: {resource_timeline.stats()}")
+    engine_timeline = run('timeline', find_available_resources, routes, start_dt, args.repeat)
+
+    mismatches = [route_id for route_id in legacy
+                  if not (legacy[route_id] == engine_sql[route_id] == engine_timeline[route_id])]
+    if mismatches:
+        print(f"MISMATCH for route(s) {mismatches}")
+        raise SystemExit(1)
+    print("All paths returned the same eligible resources.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+"""
+Benchmark: end-to-end user journeys through the Flask app, against a local MySQL.
+
+Every worker thread has its own Flask test client (its own session cookie) and repeatedly runs a
+weighted mix of journeys:
+- browse:   GET /, then the next page
+- search:   GET /search by origin / destination / date
+- book:     customer login, GET /book/<id> -> POST (seat hold) -> GET/POST /booking_summary
+            -> GET /my_bookings -> GET /cancel_booking/<booking_id> (the benchmark cleans up after itself)
+- guest:    GET/POST /manage_booking_guest for an existing Active booking
+- manager:  manager login, add_flight steps 1-3 (route/time, aircraft, crew; no flight is created)
+            and GET /manager/reports
+
+Per step it reports p50 / p95 / p99 latency, throughput and queries per request (from the
+X-DB-Queries header; queries of a streamed body, e.g. /my_bookings rows, are not included).
+Results can be saved as JSON and compared with an earlier run; steps whose p95 latency or queries per
+request grew by more than --threshold percent are flagged and the exit code is 1.
+
+Usage (from the repository root, against a populated test database, e.g. from generate_data.py):
+    python -m benchmarks.http_journeys --concurrency 8 --duration 60 --output before.json
+    python -m benchmarks.http_journeys --concurrency 8 --duration 60 --compare before.json --threshold 10
+
+It creates and cancels real bookings: run it against a test database only.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+
+JOURNEYS = {'browse': 30, 'search': 25, 'book': 20, 'guest': 10, 'manager': 15}
+
+_SEAT_RE = re.compile(r'name="selected_seats"\s+value="([^"]+)"')
+_AIRCRAFT_RE = re.compile(r'name="aircraft_id" value="([^"]+)"')
+_NEXT_PAGE_RE = re.compile(r'href="([^"]*[?&]after=[^"]*)"')
+_BOOKING_ID_RE = re.compile(r'([A-Z0-9]{8})')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive user journeys through the app and report latencies.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel workers (simulated users)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run (after --warmup)")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds of unrecorded warm-up")
+    parser.add_argument('--mix', default=None,
+                        help="Journey weights, e.g. browse=30,search=25,book=20,guest=10,manager=15")
+    parser.add_argument('--manager-id', default=None, help="Manager employee_id (default: first manager)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Flag steps whose p95 / queries per request grew by more than this percent")
+    return parser.parse_args()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+class Recorder:
+    """Latency / query samples per step, shared by the workers."""
+
+    def __init__(self):
+        self.samples = {}   # step -> list of (ms, queries)
+        self.errors = {}    # step -> count
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, step, ms, queries, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples.setdefault(step, []).append((ms, queries))
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def summary(self, seconds):
+        steps = {}
+        for step, samples in sorted(self.samples.items()):
+            latencies = sorted(ms for ms, _ in samples)
+            queries = [q for _, q in samples if q is not None]
+            steps[step] = {
+                'requests': len(samples),
+                'errors': self.errors.get(step, 0),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        total = sum(step['requests'] for step in steps.values())
+        return {'requests': total, 'throughput_rps': round(total / seconds, 1) if seconds else None,
+                'steps': steps}
+
+
+class Worker(threading.Thread):
+    """One simulated user: a test client running random journeys until `stop` is set."""
+
+    def __init__(self, app, fixtures, recorder, stop, weights, seed):
+        super().__init__(daemon=True)
+        self.client = app.test_client()
+        self.fixtures = fixtures
+        self.recorder = recorder
+        self.stop = stop
+        self.weights = weights
+        self.rng = random.Random(seed)
+        self.role = None
+
+    def call(self, step, method, url, data=None):
+        started = time.perf_counter()
+        ok = True
+        try:
+            response = self.client.open(url, method=method, data=data)
+            body = response.get_data(as_text=True)   # consumes streamed bodies too
+            ok = response.status_code < 500
+            queries = response.headers.get('X-DB-Queries')
+        except Exception:
+            body, ok, queries = '', False, None
+        self.recorder.add(step, (time.perf_counter() - started) * 1000,
+                          int(queries) if queries is not None else None, ok)
+        return body
+
+    def login(self, role):
+        if self.role == role:
+            return
+        self.client.get('/logout')
+        if role == 'customer':
+            email, password = self.rng.choice(self.fixtures['customers'])
+        else:
+            email, password = self.fixtures['manager']
+        self.call('POST /login', 'POST', '/login', {'email': email, 'password': password})
+        self.role = role
+
+    def browse(self):
+        body = self.call('GET /', 'GET', '/')
+        match = _NEXT_PAGE_RE.search(body)
+        if match:
+            self.call('GET / (next page)', 'GET', match.group(1).replace('&amp;', '&'))
+
+    def search(self):
+        origin, destination = self.rng.choice(self.fixtures['routes'])
+        date_from = (date.today() + timedelta(days=self.rng.randrange(0, 60))).isoformat()
+        self.call('GET /search', 'GET', f'/search?origin={origin}&destination={destination}&date_from={date_from}')
+
+    def book(self):
+        if not self.fixtures['flights']:
+            return
+        self.login('customer')
+        flight_id = self.rng.choice(self.fixtures['flights'])
+        body = self.call('GET /book', 'GET', f'/book/{flight_id}')
+        free = _SEAT_RE.findall(body)
+        if not free:
+            return
+        seats = self.rng.sample(free, min(len(free), self.rng.choice((1, 1, 2, 3))))
+        self.call('POST /book', 'POST', f'/book/{flight_id}', {'selected_seats': seats})
+        self.call('GET /booking_summary', 'GET', '/booking_summary')
+        self.call('POST /booking_summary', 'POST', '/booking_summary', {})
+        body = self.call('GET /my_bookings', 'GET', '/my_bookings')
+        # The confirmation flash ("... מספר ההזמנה שלך הוא: <id>") is shown on /my_bookings.
+        match = _BOOKING_ID_RE.search(body.split('הוא:', 1)[1]) if 'הוא:' in body else None
+        if match:
+            self.call('GET /cancel_booking', 'GET', f'/cancel_booking/{match.group(1)}')
+
+    def guest(self):
+        if not self.fixtures['guest_bookings']:
+            return
+        booking_id, email = self.rng.choice(self.fixtures['guest_bookings'])
+        self.call('GET /manage_booking_guest', 'GET', '/manage_booking_guest')
+        self.call('POST /manage_booking_guest', 'POST', '/manage_booking_guest',
+                  {'booking_id': booking_id, 'email': email})
+
+    def manager(self):
+        self.login('manager')
+        route_id = self.rng.choice(self.fixtures['route_ids'])
+        form = {'route_id': route_id,
+                'date': (date.today() + timedelta(days=self.rng.randrange(7, 90))).isoformat(),
+                'time': f"{self.rng.randrange(5, 23):02d}:{self.rng.choice((0, 15, 30, 45)):02d}"}
+        self.call('GET /manager/add_flight', 'GET', '/manager/add_flight')
+        body = self.call('POST /manager/add_flight (check_availability)', 'POST', '/manager/add_flight',
+                         dict(form, step='check_availability'))
+        aircraft = _AIRCRAFT_RE.findall(body)
+        if aircraft:
+            self.call('POST /manager/add_flight (assign_crew)', 'POST', '/manager/add_flight',
+                      dict(form, step='assign_crew', aircraft_id=self.rng.choice(aircraft)))
+        self.call('GET /manager/reports', 'GET', '/manager/reports')
+
+    def run(self):
+        names = list(self.weights)
+        weights = [self.weights[name] for name in names]
+        while not self.stop.is_set():
+            journey = self.rng.choices(names, weights)[0]
+            getattr(self, journey)()
+
+
+def load_fixtures(db_manager, manager_id):
+    """Ids the journeys pick from: bookable flights, customers, guest bookings, routes, a manager."""
+    flights = db_manager.fetch_all("""
+        SELECT f.flight_id
+        FROM Flight f
+        JOIN Flight_Inventory fi ON fi.flight_id = f.flight_id
+        WHERE f.flight_status = 'Active'
+          AND f.departure_date > CURDATE() + INTERVAL 3 DAY
+        GROUP BY f.flight_id
+        HAVING SUM(fi.total_seats - fi.booked_seats) >= 3
+        LIMIT 500
+    """) or []
+    customers = db_manager.fetch_all("SELECT email, password FROM Registered_Customer LIMIT 500") or []
+    guest_bookings = db_manager.fetch_all("""
+        SELECT booking_id, email FROM Booking WHERE booking_status = 'Active' LIMIT 500
+    """) or []
+    routes = db_manager.fetch_all("SELECT route_id, origin, destination FROM Route") or []
+    if manager_id:
+        manager = db_manager.fetch_one("SELECT employee_id, password FROM Manager WHERE employee_id = %s",
+                                       (manager_id,))
+    else:
+        manager = db_manager.fetch_one("SELECT employee_id, password FROM Manager ORDER BY employee_id LIMIT 1")
+    return {
+        'flights': [row['flight_id'] for row in flights],
+        'customers': [(row['email'], row['password']) for row in customers],
+        'guest_bookings': [(row['booking_id'], row['email']) for row in guest_bookings],
+        'routes': [(row['origin'], row['destination']) for row in routes],
+        'route_ids': [row['route_id'] for row in routes],
+        'manager': (manager['employee_id'], manager['password']) if manager else None,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Steps whose p95 latency or queries per request grew by more than `threshold` percent."""
+    regressions = []
+    for step, now in current['steps'].items():
+        before = baseline['steps'].get(step)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'queries_per_request'):
+            old, new = before.get(metric), now.get(metric)
+            if old and new is not None and (new - old) / old * 100 > threshold:
+                regressions.append(f"{step}: {metric} {old} -> {new} (+{(new - old) / old * 100:.0f}%)")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    # Query counts come from the X-DB-Queries header; one pooled connection per worker plus slack.
+    # The status scheduler would only add background noise. (Must be set before importing main.)
+    os.environ['DB_QUERY_HEADERS'] = '1'
+    os.environ.setdefault('STATUS_SCHEDULER', '0')
+    os.environ.setdefault('DB_POOL_SIZE', str(args.concurrency + 4))
+    from main import app, db_manager
+
+    weights = dict(JOURNEYS)
+    if args.mix:
+        weights = {name: float(weight) for name, weight in (item.split('=') for item in args.mix.split(','))}
+        unknown = set(weights) - set(JOURNEYS)
+        if unknown:
+            raise SystemExit(f"Unknown journey(s): {', '.join(sorted(unknown))}")
+
+    fixtures = load_fixtures(db_manager, args.manager_id)
+    if not fixtures['routes']:
+        raise SystemExit("ERROR: no routes (is the database populated?)")
+    if not fixtures['customers']:
+        weights.pop('book', None)
+    if not fixtures['manager']:
+        weights.pop('manager', None)
+    print(f"{len(fixtures['flights'])} bookable flights, {len(fixtures['customers'])} customers, "
+          f"{len(fixtures['guest_bookings'])} guest bookings; mix {weights}")
+
+    recorder = Recorder()
+    stop = threading.Event()
+    workers = [Worker(app, fixtures, recorder, stop, weights, args.seed + i) for i in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    results = recorder.summary(elapsed)
+    results.update({'revision': git_revision(), 'concurrency': args.concurrency,
+                    'duration_s': round(elapsed, 1), 'mix': weights})
+
+    print(f"\n{results['requests']} requests in {elapsed:.1f}s ({results['throughput_rps']} req/s), "
+          f"concurrency {args.concurrency}")
+    print(f"{'step':<45} {'n':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}")
+    for step, s in results['steps'].items():
+        queries = '-' if s['queries_per_request'] is None else s['queries_per_request']
+        print(f"{step:<45} {s['requests']:>6} {s['errors']:>4} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+              f"{s['p99_ms']:>8} {queries:>6}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {args.compare} (revision {baseline.get('revision')}), "
+              f"threshold {args.threshold}%:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print("  no regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: registered statements as text queries vs. server-side prepared statements.
+
+Every statement registered on db_manager (see register_statement in main.py) is run --calls times
+with real parameters, once through fetch_all (SQL text parsed by the server on every call) and once
+through fetch_all_prepared (prepared once per pooled connection, then only parameters are sent).
+
+Reported per statement: latency per call of each path, the saving, and how many server-side
+prepares the prepared path needed (Com_stmt_prepare delta: at most one per connection).
+The last line projects the saving for the hot pages (book_flight: seat_map + reserved_seats;
+guest booking lookup: guest_booking + booking_seats).
+
+Usage (from the repository root, against a populated database):
+    python -m benchmarks.prepared_statements --calls 2000
+"""
+import argparse
+import time
+
+from main import db_manager
+
+
+def sample_params():
+    """One realistic parameter tuple per registered statement, taken from the data."""
+    flight = db_manager.fetch_one("SELECT flight_id, aircraft_id FROM Flight ORDER BY flight_id DESC LIMIT 1") or {}
+    booking = db_manager.fetch_one("""
+        SELECT booking_id, email FROM Booking WHERE booking_status = 'Active' ORDER BY booking_datetime DESC LIMIT 1
+    """) or {}
+    return {
+        'seat_map': (flight.get('aircraft_id'),),
+        'reserved_seats': (flight.get('flight_id'),),
+        'booking_details': (booking.get('booking_id'),),
+        'guest_booking': (booking.get('booking_id'), booking.get('email')),
+        'booking_seats': (booking.get('booking_id'),),
+    }
+
+
+def server_prepares():
+    row = db_manager.fetch_one("SHOW GLOBAL STATUS LIKE 'Com_stmt_prepare'") or {}
+    return int(row.get('Value') or 0)
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text queries with server-side prepared statements.")
+    parser.add_argument('--calls', type=int, default=1000)
+    args = parser.parse_args()
+
+    params = sample_params()
+    saved = {}
+    print(f"{'statement':<16} {'text ms':>9} {'prepared ms':>12} {'saved ms':>9} {'prepares':>9}")
+    for name, query in db_manager.statements.items():
+        statement_params = params.get(name, ())
+        # Warm up both paths (connections, buffer pool, first prepare).
+        db_manager.fetch_all(query, statement_params)
+        db_manager.fetch_all_prepared(name, statement_params)
+
+        text_ms = per_call(lambda: db_manager.fetch_all(query, statement_params), args.calls)
+        prepares_before = server_prepares()
+        prepared_ms = per_call(lambda: db_manager.fetch_all_prepared(name, statement_params), args.calls)
+        prepares = server_prepares() - prepares_before
+        saved[name] = text_ms - prepared_ms
+        print(f"{name:<16} {text_ms:9.3f} {prepared_ms:12.3f} {saved[name]:9.3f} {prepares:9d}")
+
+    pages = {
+        'book_flight': ('seat_map', 'reserved_seats'),
+        'manage_booking_guest': ('guest_booking', 'booking_seats'),
+    }
+    for page, names in pages.items():
+        print(f"{page}: {sum(saved.get(n, 0) for n in names):.3f} ms saved per request")
+    print(f"prepared statement counters: {db_manager.prepared_stats()}")
+    db_manager.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Query plan regression check: EXPLAIN FORMAT=JSON of every statement the app issues, against a baseline.
+
+1. Capture: every statement that goes through DBManager is recorded (first sample per query
+   fingerprint, with its real parameters) while the script drives the app: the user journeys of
+   benchmarks.http_journeys (browse, search, book + cancel, guest lookup, manager add_flight / reports)
+   plus the code paths no page reaches directly (status sweep, scheduler queue, SQL availability path,
+   resource timeline load, every export, ledger report).
+2. Explain: each captured SELECT / UPDATE / DELETE / INSERT ... SELECT is run through EXPLAIN FORMAT=JSON;
+   per table the access type, chosen index and estimated rows are kept.
+3. Compare with the baseline (--update writes it). A plan is a regression when a table
+   - becomes a full scan (access type ALL / index) and holds more than --small-table rows,
+   - loses its index (key was set, now none),
+   - or its estimated rows exceed --rows-factor x the baseline (or --max-rows, when given).
+   New statements that full-scan a large table are regressions too. Exit code 1 on any regression.
+
+Run it against a local MySQL loaded with a large synthetic dataset (generate_data.py), e.g.:
+    python generate_data.py --scale 1 --truncate
+    python -m benchmarks.query_plans --update          # record benchmarks/query_plans.json
+    python -m benchmarks.query_plans                   # after a schema / query change
+It creates and cancels a booking (the book journey): run it against a test database only.
+The same check runs under pytest as tests/test_query_plans.py (opt-in with FLYTAU_QUERY_PLANS=1,
+skipped without a reachable database or a baseline).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_plans.json')
+DEFAULT_SMALL_TABLE = 1000
+DEFAULT_ROWS_FACTOR = 10.0
+
+# Access types from best to worst (MySQL EXPLAIN "access_type").
+ACCESS_RANK = ['system', 'const', 'eq_ref', 'ref', 'fulltext', 'ref_or_null', 'index_merge',
+               'unique_subquery', 'index_subquery', 'range', 'index', 'ALL']
+FULL_SCANS = {'index', 'ALL'}
+
+_EXPLAINABLE_RE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\s+INTO\s+\w+[^;]*?\bSELECT|WITH)\b',
+                             re.IGNORECASE | re.DOTALL)
+_EXPLAIN_PREFIX_RE = re.compile(r'^\s*EXPLAIN\s+', re.IGNORECASE)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the app's query plans with a baseline.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--update', action='store_true', help="Write the current plans as the new baseline")
+    parser.add_argument('--small-table', type=int, default=DEFAULT_SMALL_TABLE,
+                        help="Full scans of tables estimated at or below this many rows are accepted")
+    parser.add_argument('--rows-factor', type=float, default=DEFAULT_ROWS_FACTOR,
+                        help="Flag tables whose estimated rows grew more than this factor over the baseline")
+    parser.add_argument('--max-rows', type=int, default=None, help="Flag any table estimated above this")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+class StatementCapture:
+    """Wraps QueryInstrumentation.record() to keep the first (query, params) of every fingerprint."""
+
+    def __init__(self, instrumentation, fingerprint):
+        self.statements = {}
+        self._fingerprint = fingerprint
+        self._record = instrumentation.record
+        self._lock = threading.Lock()
+        self._instrumentation = instrumentation
+        instrumentation.record = self.record
+
+    def close(self):
+        """Stops capturing (restores the instrumentation's own record())."""
+        self._instrumentation.record = self._record
+
+    def record(self, query, params, elapsed_ms, rows, error=None):
+        if error is None and isinstance(query, str):
+            if isinstance(params, list) and params and isinstance(params[0], (tuple, list)):
+                params = params[0]   # executemany: one row of parameters is enough for a plan
+            fingerprint = self._fingerprint(query)
+            with self._lock:
+                self.statements.setdefault(fingerprint, (query, tuple(params or ())))
+        return self._record(query, params, elapsed_ms, rows, error=error)
+
+
+def drive_app(flytau, seed):
+    """Runs every journey once plus the background / CLI code paths, so their statements are captured."""
+    from benchmarks.http_journeys import Recorder, Worker, load_fixtures, JOURNEYS
+
+    fixtures = load_fixtures(flytau.db_manager, None)
+    worker = Worker(flytau.app, fixtures, Recorder(), threading.Event(), JOURNEYS, seed)
+    for journey in JOURNEYS:
+        if journey == 'book' and not fixtures['customers']:
+            continue
+        if journey == 'manager' and not fixtures['manager']:
+            continue
+        getattr(worker, journey)()
+        worker.client.get('/logout')
+        worker.role = None
+    # Customer lists (the journeys above browse as a guest or manager).
+    if fixtures['customers']:
+        worker.login('customer')
+        worker.browse()
+        worker.search()
+
+    flytau.update_statuses()
+    flytau.status_scheduler._reload_queue()
+    flytau.resource_timeline.rebuild()
+    routes = flytau.db_manager.fetch_all("SELECT * FROM Route") or []
+    if routes:
+        route = random.Random(seed).choice(routes)
+        start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=14)
+        for kind, extra in (('aircraft', "AND e.size = 'Big'"), ('pilot', ''), ('attendant', '')):
+            flytau._eligible_entities(kind, route['origin'], start,
+                                      start + timedelta(minutes=int(route['duration'])), extra)
+    flytau.revenue_by_aircraft_class()
+    today = datetime.now().date()
+    args = {'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat()}
+    for name in flytau.EXPORTS:
+        with flytau.export_rows(name, args) as rows:
+            next(iter(rows), None)
+
+
+def table_plans(node, found=None):
+    """Every "table" entry of an EXPLAIN FORMAT=JSON document (nested loops, subqueries, derived tables)."""
+    found = [] if found is None else found
+    if isinstance(node, dict):
+        table = node.get('table')
+        if isinstance(table, dict) and 'table_name' in table:
+            found.append({
+                'table': table['table_name'],
+                'access_type': table.get('access_type'),
+                'key': table.get('key'),
+                'rows': table.get('rows_examined_per_scan'),
+            })
+        for value in node.values():
+            table_plans(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            table_plans(value, found)
+    return found
+
+
+def explain_all(db_manager, statements):
+    """{fingerprint: {'tables': [...]} or {'error': ...}} for every explainable captured statement."""
+    plans = {}
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for fingerprint, (query, params) in sorted(statements.items()):
+                query = _EXPLAIN_PREFIX_RE.sub('', query)
+                if not _EXPLAINABLE_RE.match(query) or 'GET_LOCK' in query.upper():
+                    continue
+                try:
+                    cursor.execute(f"EXPLAIN FORMAT=JSON {query}", params)
+                    document = json.loads(cursor.fetchone()[0])
+                    plans[fingerprint] = {'tables': table_plans(document)}
+                except Exception as e:
+                    plans[fingerprint] = {'error': str(e)}
+        finally:
+            cursor.close()
+    return plans
+
+
+def _rank(access_type):
+    return ACCESS_RANK.index(access_type) if access_type in ACCESS_RANK else len(ACCESS_RANK)
+
+
+def _by_occurrence(tables):
+    """{(alias, n): table} -- the same alias can appear several times (e.g. in a subquery)."""
+    seen = {}
+    keyed = {}
+    for table in tables:
+        n = seen[table['table']] = seen.get(table['table'], 0) + 1
+        keyed[(table['table'], n)] = table
+    return keyed
+
+
+def compare(current, baseline, small_table, rows_factor, max_rows):
+    """Regression messages for `current` plans against `baseline` (both {fingerprint: plan})."""
+    regressions = []
+    for fingerprint, plan in current.items():
+        label = fingerprint if len(fingerprint) <= 140 else fingerprint[:137] + '...'
+        before = _by_occurrence(baseline.get(fingerprint, {}).get('tables', []))
+        for key, table in _by_occurrence(plan.get('tables', [])).items():
+            rows = table['rows'] or 0
+            old = before.get(key)
+            problems = []
+            if table['access_type'] in FULL_SCANS and rows > small_table and \
+                    (old is None or _rank(table['access_type']) > _rank(old['access_type'])):
+                problems.append(f"full scan ({table['access_type']}, ~{rows} rows)")
+            if old is not None and old['key'] and not table['key']:
+                problems.append(f"lost index {old['key']}")
+            if old is not None and old['rows'] and rows > old['rows'] * rows_factor and rows > small_table:
+                problems.append(f"estimated rows {old['rows']} -> {rows}")
+            if max_rows is not None and rows > max_rows:
+                problems.append(f"estimated rows {rows} > {max_rows}")
+            for problem in problems:
+                regressions.append(f"{table['table']}: {problem}\n      in {label}")
+        if 'error' in plan and fingerprint in baseline and 'error' not in baseline[fingerprint]:
+            regressions.append(f"EXPLAIN failed: {plan['error']}\n      in {label}")
+    return regressions
+
+
+def capture_plans(flytau, seed):
+    """Drives the app (drive_app) and returns (captured statements, their plans from explain_all)."""
+    capture = StatementCapture(flytau.db_manager.instrumentation, flytau.query_fingerprint)
+    timeline_enabled = flytau.RESOURCE_TIMELINE_ENABLED
+    flytau.RESOURCE_TIMELINE_ENABLED = False   # exercise the SQL availability path as well
+    try:
+        drive_app(flytau, seed)
+    finally:
+        flytau.RESOURCE_TIMELINE_ENABLED = timeline_enabled
+        capture.close()
+    return capture.statements, explain_all(flytau.db_manager, capture.statements)
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault('STATUS_SCHEDULER', '0')
+    import main as flytau
+
+    statements, plans = capture_plans(flytau, args.seed)
+    print(f"{len(statements)} distinct statements captured, {len(plans)} explained.")
+
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'plans': plans}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        raise SystemExit(f"ERROR: no baseline at {args.baseline}; record one with --update first.")
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['plans']
+
+    regressions = compare(plans, baseline, args.small_table, args.rows_factor, args.max_rows)
+    missing = sorted(set(baseline) - set(plans))
+    new = sorted(set(plans) - set(baseline))
+    if new:
+        print(f"{len(new)} statement(s) not in the baseline (checked for full scans only).")
+    if missing:
+        print(f"{len(missing)} baseline statement(s) no longer issued.")
+    for line in regressions:
+        print(f"  REGRESSION {line}")
+    if regressions:
+        raise SystemExit(1)
+    print("No plan regressions.")
+
+
+if __name__ == '__main__':
+    main()
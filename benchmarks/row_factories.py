@@ -0,0 +1,88 @@
+"""
+Benchmark: row shapes returned by DBManager.fetch_all (row_factory=dict / tuple / record / columns).
+
+For each query and row factory the script reports:
+- rows/sec: end-to-end fetch_all throughput (query + decode + row construction)
+- bytes/row: memory held by the result, measured with tracemalloc
+
+Queries:
+- seat_map: the book_flight seat map of the aircraft with the most seats
+- flights:  the manager flight list (same columns as fetch_flight_page), up to --limit rows
+- report:   the aircraft-month report summary
+
+Usage (from the repository root, against a populated database):
+    python -m benchmarks.row_factories --repeat 20 --limit 50000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from main import db_manager, AVAILABLE_SEATS_SQL, ROW_FACTORIES
+
+
+def queries(limit):
+    biggest = db_manager.fetch_one("""
+        SELECT aircraft_id, COUNT(*) AS seats FROM Seat GROUP BY aircraft_id ORDER BY seats DESC LIMIT 1
+    """) or {'aircraft_id': 0}
+    return {
+        'seat_map': ("SELECT * FROM Seat WHERE aircraft_id = %s ORDER BY class DESC, row_num, col_num",
+                     (biggest['aircraft_id'],)),
+        'flights': (f"""
+            SELECT f.*, r.origin, r.destination, r.duration,
+            {AVAILABLE_SEATS_SQL} as available_seats
+            FROM Flight f
+            JOIN Route r ON f.route_id = r.route_id
+            ORDER BY f.departure_date DESC, f.departure_time DESC, f.flight_id DESC
+            LIMIT %s
+        """, (limit,)),
+        'report': ("SELECT * FROM Report_Aircraft_Month ORDER BY month DESC, aircraft_id", ()),
+    }
+
+
+def row_count(result, row_factory):
+    if row_factory == 'columns':
+        return len(next(iter(result.values()), ()))
+    return len(result)
+
+
+def measure(query, params, row_factory, repeat):
+    # Throughput.
+    started = time.perf_counter()
+    rows = 0
+    for _ in range(repeat):
+        rows += row_count(db_manager.fetch_all(query, params, row_factory=row_factory) or [], row_factory)
+    elapsed = time.perf_counter() - started
+
+    # Memory held by one result.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = db_manager.fetch_all(query, params, row_factory=row_factory) or []
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    count = row_count(result, row_factory)
+    del result
+    return rows / elapsed if elapsed else 0, (held / count if count else 0), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory and throughput of the DBManager row factories.")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=50000, help="Rows for the flights query")
+    args = parser.parse_args()
+
+    for name, (query, params) in queries(args.limit).items():
+        print(f"\n{name}")
+        baseline = None
+        for row_factory in ROW_FACTORIES:
+            rate, per_row, count = measure(query, params, row_factory, args.repeat)
+            if baseline is None:
+                baseline = per_row or 1
+            print(f"  {row_factory:<8} {count:7d} rows  {rate:12,.0f} rows/s  {per_row:8.0f} bytes/row"
+                  f"  ({per_row / baseline:5.0%} of dict)")
+    db_manager.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,46 +1,55 @@
+"""
+FLYTAU database diagnostics.
+
+Probes the database the app is configured for (DB_HOST / DB_USER / DB_PASS / DB_NAME) and prints one
+JSON document, so two environments (e.g. staging vs. production, or before vs. after a migration)
+can be compared with a plain diff:
+
+- server: host, database, server version and the app's connection pool settings.
+- latency: connect latency (a fresh connection each time) and round-trip latency (COM_PING on one
+  connection), as min / p50 / p99 / max over --connects / --pings samples.
+- hot_queries: wall time of the app's hot reads on the current data (flight list pages, search,
+  registered prepared statements, seat holds, add_flight availability, revenue report), with real
+  parameters sampled from the data; min / p50 / p99 over --runs calls after one warm-up call.
+- tables: every table of the schema with its estimated rows, data / index size, and per index its
+  columns and cardinality. Tables the app needs but that are missing are listed under missing_tables.
+- missing_index_hints: a HEURISTIC, not a plan check. Columns main.py filters or joins on (WHERE / ON
+  clauses of the SQL string literals, found by regex-scanning the source) in statements where no
+  index of the table looks usable: none of the table's filtered columns is the first column of an
+  index (or the next one after other filtered columns). Conditions built at runtime (e.g. the
+  flight_list filters) are not seen, and aliases next to LATERAL / window clauses can be mis-read,
+  so entries are leads to check with EXPLAIN. For the authoritative check, run benchmarks.query_plans
+  (EXPLAIN of the statements the app actually issues).
+
+Usage:
+    python debug_db.py                                  # JSON on stdout
+    python debug_db.py --output prod.json --pings 200
+    diff <(python -m json.tool staging.json) <(python -m json.tool prod.json)
+
+Progress and errors go to stderr. Exit code 1 if the database cannot be reached.
+"""
+import argparse
+import ast
+import json
 import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+# The scheduler is not needed for a read-only probe (must be set before importing main).
+os.environ.setdefault('STATUS_SCHEDULER', '0')
+
 import mysql.connector
-from dotenv import load_dotenv
-from datetime import datetime
-
-print("==== FLYTAU DEBUG START ====")
-
-# 1) Load environment variables
-load_dotenv()
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_NAME = os.getenv("DB_NAME")
-
-print(f"Time: {datetime.utcnow().isoformat()}Z")
-print(f"DB_HOST = {DB_HOST!r}")
-print(f"DB_USER = {DB_USER!r}")
-print(f"DB_NAME = {DB_NAME!r}")
-
-if not all([DB_HOST, DB_USER, DB_NAME]):
-    print("ERROR: One or more DB env vars are missing (HOST/USER/NAME).")
-    print("==== FLYTAU DEBUG END ====")
-    raise SystemExit(1)
-
-# 2) Try to connect to MySQL
-try:
-    print("\nConnecting to MySQL...")
-    conn = mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASS,
-        database=DB_NAME,
-    )
-    print("SUCCESS: Connected to MySQL.")
-except mysql.connector.Error as err:
-    print(f"ERROR: MySQL connection failed: {err}")
-    print("==== FLYTAU DEBUG END ====")
-    raise SystemExit(1)
-
-cursor = conn.cursor()
-
-# 3) Check that key tables exist and list their columns
-tables_to_check = [
+
+import main as flytau
+from main import db_manager, DB_CONFIG, DB_POOL_CONFIG
+
+MAIN_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# Tables the app cannot run without.
+REQUIRED_TABLES = [
     "Aircraft",
     "Route",
     "Flight",
@@ -51,48 +60,369 @@ tables_to_check = [
     "Registered_Customer",
     "Customer_Phone",
     "Pilot",
-    "Pilot_on_Flights",
+    "Pilots_on_Flights",
     "Flight_Attendant",
     "Flight_Attendant_on_Flights",
     "Manager",
+    "Flight_Inventory",
+    "Seat_Hold",
+    "Revenue_Ledger",
+    "Report_Aircraft_Month",
+    "Report_Aircraft_Month_Route",
+    "Report_Booking_Month",
+    "Report_Flight_Occupancy",
+    "Schema_Migration",
 ]
 
-print("\nChecking tables and columns:")
-for table in tables_to_check:
-    try:
-        cursor.execute(f"SHOW TABLES LIKE '{table}'")
-        row = cursor.fetchone()
-        if not row:
-            print(f"TABLE MISSING: {table}")
-            continue
-        print(f"TABLE OK: {table}")
-        cursor.execute(f"SHOW COLUMNS FROM {table}")
-        cols = cursor.fetchall()
-        col_names = [c[0] for c in cols]
-        print(f"  Columns: {col_names}")
-    except mysql.connector.Error as err:
-        print(f"ERROR inspecting table {table}: {err}")
-
-# 4) Try a sample query similar to your home page
-print("\nRunning sample Flight + Route query:")
-try:
-    cursor.execute("""
-        SELECT f.flight_id, f.route_id, f.aircraft_id,
-               f.departure_date, f.departure_time, f.flight_status,
-               r.origin, r.destination, r.duration
+_SQL_RE = re.compile(r'\b(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+_ALIAS_RE = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+`?(\w+)`?'
+    r'(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|RIGHT|INNER|CROSS|SET|GROUP|ORDER|LIMIT|USING|FORCE|USE|'
+    r'VALUES|SELECT|FOR|LATERAL|HAVING|UNION)\b)(\w+))?',
+    re.IGNORECASE)
+# A WHERE / ON clause runs until the next clause keyword.
+_PREDICATE_RE = re.compile(
+    r'\b(?:WHERE|ON(?!\s+DUPLICATE))\b(.*?)(?=\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|JOIN|UNION|SET|'
+    r'FOR\s+UPDATE|ON\s+DUPLICATE)\b|$)',
+    re.IGNORECASE | re.DOTALL)
+_QUALIFIED_RE = re.compile(r'\b(\w+)\.`?(\w+)`?')
+_UNQUALIFIED_RE = re.compile(r'(?<![\w.])(\w+)\s*(?:=|<=>|<>|!=|<=|>=|<|>|\bBETWEEN\b|\bIN\s*\()', re.IGNORECASE)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Database diagnostics for FLYTAU (JSON output).")
+    parser.add_argument('--connects', type=int, default=10, help="Number of fresh connections to time")
+    parser.add_argument('--pings', type=int, default=100, help="Number of round trips (pings) to time")
+    parser.add_argument('--runs', type=int, default=20, help="Timed calls per hot query")
+    parser.add_argument('--exact-counts', action='store_true',
+                        help="Also run COUNT(*) per table (slow on large tables; estimates otherwise)")
+    parser.add_argument('--output', help="Write the JSON here instead of stdout")
+    return parser.parse_args()
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def latency_summary(samples_ms):
+    """min / p50 / p99 / max of a list of milliseconds."""
+    values = sorted(samples_ms)
+    if not values:
+        return {'samples': 0}
+    return {
+        'samples': len(values),
+        'min_ms': round(values[0], 3),
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def timed(fn, runs):
+    """Calls fn once to warm up, then `runs` times; returns (latency summary, last result)."""
+    result = fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return latency_summary(samples), result
+
+
+def probe_latency(connects, pings):
+    """Connect latency (new connection, closed right away) and round-trip latency (ping) on one connection."""
+    connect_ms = []
+    for _ in range(connects):
+        started = time.perf_counter()
+        conn = mysql.connector.connect(**DB_CONFIG)
+        connect_ms.append((time.perf_counter() - started) * 1000)
+        conn.close()
+
+    ping_ms = []
+    with db_manager.connection() as conn:
+        for _ in range(pings):
+            started = time.perf_counter()
+            conn.ping(reconnect=False)
+            ping_ms.append((time.perf_counter() - started) * 1000)
+    return {'connect': latency_summary(connect_ms), 'ping': latency_summary(ping_ms)}
+
+
+def sample_data():
+    """Real parameters for the hot queries: the next bookable flight, a recent booking and a route."""
+    flight = db_manager.fetch_one("""
+        SELECT f.flight_id, f.aircraft_id, f.departure_ts, r.origin, r.destination, r.duration
         FROM Flight f
         JOIN Route r ON f.route_id = r.route_id
-        ORDER BY f.departure_date DESC, f.departure_time DESC
-        LIMIT 5
-    """)
-    rows = cursor.fetchall()
-    print(f"Query returned {len(rows)} rows.")
-    for r in rows:
-        print("  Row:", r)
-except mysql.connector.Error as err:
-    print(f"ERROR in sample Flight query: {err}")
-
-# 5) Close connection
-cursor.close()
-conn.close()
-print("\n==== FLYTAU DEBUG END ====")
+        WHERE f.flight_status = 'Active' AND f.departure_ts >= NOW()
+        ORDER BY f.departure_ts
+        LIMIT 1
+    """) or {}
+    booking = db_manager.fetch_one("""
+        SELECT booking_id, email FROM Booking WHERE booking_status = 'Active' ORDER BY booking_datetime DESC LIMIT 1
+    """) or {}
+    return flight, booking
+
+
+def hot_queries(flight, booking):
+    """(name, call) for every hot read of the app; each call returns the function's own result."""
+    today = flytau.day_range(date.today())[0]
+    customer = (["f.flight_status = 'Active'", "f.departure_ts >= %s"], [today])
+    departure = flight.get('departure_ts') or datetime.now() + timedelta(days=7)
+    search = (["f.flight_status = 'Active'", "r.origin = %s", "r.destination = %s",
+               "f.departure_ts >= %s AND f.departure_ts < %s"],
+              [flight.get('origin'), flight.get('destination')] + list(flytau.day_range(departure.date())))
+    start = departure.replace(second=0, microsecond=0) + timedelta(days=1)
+    end = start + timedelta(minutes=int(flight.get('duration') or 60))
+    statement_params = {
+        'seat_map': (flight.get('aircraft_id'),),
+        'reserved_seats': (flight.get('flight_id'),),
+        'booking_details': (booking.get('booking_id'),),
+        'guest_booking': (booking.get('booking_id'), booking.get('email')),
+        'booking_seats': (booking.get('booking_id'),),
+    }
+
+    queries = [
+        ('index_customer_page', lambda: flytau.fetch_flight_page(*customer, having='available_seats > 0')[0]),
+        ('index_manager_page', lambda: flytau.fetch_flight_page([], [], descending=True)[0]),
+        ('index_count_estimate', lambda: flytau.estimate_flight_count(*customer)),
+        ('search_route_day', lambda: flytau.fetch_flight_page(*search, having='available_seats > 0')[0]),
+        ('search_dropdowns', lambda: db_manager.fetch_all("SELECT DISTINCT origin FROM Route")),
+        ('held_seats', lambda: flytau.held_seats(flight.get('flight_id'))),
+        ('eligible_aircraft', lambda: flytau._eligible_entities('aircraft', flight.get('origin') or 'TLV',
+                                                                 start, end)),
+        ('revenue_by_aircraft_class', lambda: flytau.revenue_by_aircraft_class()),
+    ]
+    for name in sorted(db_manager.statements):
+        params = statement_params.get(name)
+        if params and None not in params:
+            queries.append((f"prepared:{name}",
+                            lambda name=name, params=params: db_manager.fetch_all_prepared(name, params)))
+    return queries
+
+
+def probe_hot_queries(runs):
+    flight, booking = sample_data()
+    results = {}
+    for name, call in hot_queries(flight, booking):
+        log(f"  {name}")
+        try:
+            summary, result = timed(call, runs)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            continue
+        # The None-returning helpers swallow database errors (logged by the app).
+        summary['ok'] = result is not None
+        summary['rows'] = len(result) if isinstance(result, (list, tuple, set)) else None
+        results[name] = summary
+    return results
+
+
+def probe_tables(exact_counts):
+    """Sizes and indexes of every table in the schema, plus the columns per table."""
+    database = DB_CONFIG['database']
+    tables = {}
+    columns = {}
+    with db_manager.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # Fresh statistics instead of the cached ones (MySQL 8 caches them for a day by default).
+            try:
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except mysql.connector.Error:
+                pass
+            cursor.execute("""
+                SELECT TABLE_NAME AS name, TABLE_ROWS AS est_rows, DATA_LENGTH AS data_bytes,
+                       INDEX_LENGTH AS index_bytes
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'
+                ORDER BY TABLE_NAME
+            """, (database,))
+            for row in cursor.fetchall():
+                tables[row['name']] = {
+                    'estimated_rows': int(row['est_rows'] or 0),
+                    'data_bytes': int(row['data_bytes'] or 0),
+                    'index_bytes': int(row['index_bytes'] or 0),
+                    'indexes': {},
+                }
+            cursor.execute("""
+                SELECT TABLE_NAME AS tbl, INDEX_NAME AS name, NON_UNIQUE AS non_unique,
+                       COLUMN_NAME AS col, CARDINALITY AS cardinality
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """, (database,))
+            for row in cursor.fetchall():
+                if row['tbl'] not in tables:
+                    continue
+                index = tables[row['tbl']]['indexes'].setdefault(
+                    row['name'], {'unique': not int(row['non_unique']), 'columns': [], 'cardinality': []})
+                index['columns'].append(row['col'])
+                index['cardinality'].append(None if row['cardinality'] is None else int(row['cardinality']))
+            cursor.execute("""
+                SELECT TABLE_NAME AS tbl, COLUMN_NAME AS col
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s
+            """, (database,))
+            for row in cursor.fetchall():
+                columns.setdefault(row['tbl'], set()).add(row['col'].lower())
+            if exact_counts:
+                for name, table in tables.items():
+                    cursor.execute(f"SELECT COUNT(*) AS cnt FROM `{name}`")
+                    table['rows'] = int(cursor.fetchone()['cnt'])
+        finally:
+            cursor.close()
+    return tables, columns
+
+
+def sql_strings(path):
+    """(enclosing function, SQL text, interpolated) for every string literal of a Python file that looks
+    like SQL. Interpolated parts of f-strings are left out (their pieces are literals of their own)."""
+    tree = ast.parse(open(path, encoding='utf-8').read(), filename=path)
+    found = []
+
+    def visit(node, scope):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            scope = node.name
+        if isinstance(node, ast.JoinedStr):
+            text = ' '.join(part.value if isinstance(part, ast.Constant) else ' '
+                            for part in node.values)
+            if _SQL_RE.search(text):
+                found.append((scope, text, len(node.values) > 1))
+            return
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and _SQL_RE.search(node.value):
+            found.append((scope, node.value, False))
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child, scope)
+
+    visit(tree, '<module>')
+    return found
+
+
+def predicate_columns(sql, table_names):
+    """{table: set(columns)} filtered / joined on in a statement's WHERE and ON clauses."""
+    aliases = {}
+    for table, alias in _ALIAS_RE.findall(sql):
+        table = table_names.get(table.lower())
+        if table:
+            aliases[table.lower()] = table
+            if alias:
+                aliases[alias.lower()] = table
+    used = defaultdict(set)
+    single = set(aliases.values())
+    for clause in _PREDICATE_RE.findall(sql):
+        for alias, column in _QUALIFIED_RE.findall(clause):
+            if alias.lower() in aliases:
+                used[aliases[alias.lower()]].add(column.lower())
+        if len(single) == 1:
+            (table,) = single
+            for column in _UNQUALIFIED_RE.findall(clause):
+                used[table].add(column.lower())
+    return used
+
+
+def _usable(column, used, indexes):
+    """True if some index can be used for `column`: every index column before it is filtered on too."""
+    for index in indexes.values():
+        for index_column in (c.lower() for c in index['columns']):
+            if index_column == column:
+                return True
+            if index_column not in used:
+                break
+    return False
+
+
+def find_missing_indexes(tables, columns):
+    """
+    WHERE / ON columns of main.py's SQL literals that no index of their table seems to serve
+    (heuristic source scan; see the module docstring for what it cannot see).
+    """
+    table_names = {name.lower(): name for name in tables}
+    missing = {}
+    for scope, sql, interpolated in sql_strings(MAIN_SOURCE):
+        for table, used in predicate_columns(sql, table_names).items():
+            used &= columns.get(table, set())   # drops keywords / select aliases the regexes picked up
+            # One usable index is enough to avoid scanning the table (e.g. PK lookup + password check).
+            if any(_usable(column, used, tables[table]['indexes']) for column in used):
+                continue
+            for column in used:
+                entry = missing.setdefault(f"{table}.{column}", {
+                    'table': table,
+                    'column': column,
+                    'estimated_rows': tables[table]['estimated_rows'],
+                    'in_indexes': sorted(name for name, index in tables[table]['indexes'].items()
+                                         if column in (c.lower() for c in index['columns'])),
+                    'used_in': set(),
+                    'statements': 0,
+                    # Built with f-strings: conditions passed in at runtime are not seen by the scan.
+                    'dynamic_sql': False,
+                })
+                entry['used_in'].add(scope)
+                entry['statements'] += 1
+                entry['dynamic_sql'] |= interpolated
+    for entry in missing.values():
+        entry['used_in'] = sorted(entry['used_in'])
+    return dict(sorted(missing.items()))
+
+
+def server_info():
+    row = db_manager.fetch_one("SELECT VERSION() AS version, @@hostname AS hostname") or {}
+    return {
+        'host': DB_CONFIG['host'],
+        'database': DB_CONFIG['database'],
+        'user': DB_CONFIG['user'],
+        'server_version': row.get('version'),
+        'server_hostname': row.get('hostname'),
+        'pool': DB_POOL_CONFIG,
+    }
+
+
+def main():
+    args = parse_args()
+
+    if not all([DB_CONFIG['host'], DB_CONFIG['user'], DB_CONFIG['database']]):
+        log("ERROR: One or more DB env vars are missing (HOST/USER/NAME).")
+        raise SystemExit(1)
+
+    log(f"Connecting to {DB_CONFIG['user']}@{DB_CONFIG['host']}/{DB_CONFIG['database']}...")
+    try:
+        db_manager.pool.release(db_manager.pool.acquire())
+    except mysql.connector.Error as err:
+        log(f"ERROR: MySQL connection failed: {err}")
+        raise SystemExit(1)
+
+    report = {'generated_at': datetime.now().isoformat(timespec='seconds'), 'server': server_info()}
+    log(f"Latency ({args.connects} connects, {args.pings} pings)...")
+    report['latency'] = probe_latency(args.connects, args.pings)
+    log("Tables and indexes...")
+    tables, columns = probe_tables(args.exact_counts)
+    report['tables'] = tables
+    report['missing_tables'] = [name for name in REQUIRED_TABLES if name not in tables]
+    log("Missing index hints (heuristic scan of the WHERE / JOIN columns in main.py's SQL)...")
+    report['missing_index_hints'] = {
+        'method': "heuristic: regex scan of the SQL string literals in main.py; runtime-built conditions "
+                  "are not seen. Confirm with EXPLAIN (python -m benchmarks.query_plans).",
+        'columns': find_missing_indexes(tables, columns),
+    }
+    log(f"Hot queries ({args.runs} runs each)...")
+    report['hot_queries'] = probe_hot_queries(args.runs)
+    report['pool_stats'] = db_manager.pool.stats()
+    db_manager.pool.close_all()
+
+    document = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(document + '\n')
+        log(f"Written to {args.output}")
+    else:
+        print(document)
+
+
+if __name__ == '__main__':
+    main()
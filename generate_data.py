@@ -0,0 +1,484 @@
+"""
+FLYTAU synthetic dataset generator.
+
+Builds a realistic, internally consistent dataset at a chosen scale, to see how the queries behave
+at airline scale instead of on the ~30 flights of schema.sql:
+- aircraft (Big / Small) with full seat maps, TLV <-> destination routes (long routes need Big aircraft)
+- years of flights: every aircraft flies TLV -> X -> TLV rotations with its own crew team, so aircraft
+  and crew always depart from where their previous flight landed and never overlap; long flights get
+  Big aircraft and qualified crew, as add_flight requires
+- customers (a quarter of them registered, password "flytau123"), bookings and reserved seats, with
+  Performed / Active / Full flights, flights cancelled by the company and customer cancellations
+- the derived tables the app maintains: Flight_Inventory, Revenue_Ledger and the report summaries
+
+Everything is bulk-loaded on one connection with foreign key / unique checks off: multi-row INSERTs
+(default) or LOAD DATA LOCAL INFILE (--method load-data, needs local_infile=ON on the server).
+
+Usage:
+    python generate_data.py --scale 1 --truncate                       # ~1M bookings
+    python generate_data.py --scale 10 --method load-data --truncate   # ~10M bookings
+    python generate_data.py --aircraft 10 --customers 5000 --bookings 20000 --years 1 --truncate
+
+Run it against a test database: --truncate deletes every flight, booking, customer, aircraft and
+crew row (managers are kept).
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+
+from main import DB_CONFIG, CANCELLATION_FEE_RATE, apply_migrations, rebuild_report_summaries
+
+# Destinations from TLV with their flight time in minutes (> 360 = long flight, Big aircraft only).
+DESTINATIONS = {
+    'LCA': 60, 'ATH': 120, 'IST': 140, 'OTP': 165, 'VIE': 200, 'BUD': 200, 'DXB': 200, 'WAW': 215,
+    'FCO': 225, 'PRG': 240, 'ZRH': 250, 'BER': 250, 'MUC': 255, 'FRA': 265, 'BCN': 270, 'CDG': 290,
+    'AMS': 295, 'LHR': 320, 'MAD': 330, 'DEL': 420, 'BKK': 660, 'EWR': 660, 'SIN': 675, 'JFK': 690,
+}
+HUB = 'TLV'
+LONG_FLIGHT_MINUTES = 360
+
+MANUFACTURERS = ('Boeing', 'Airbus', 'Daso')
+# (business rows, business columns, economy rows, economy columns)
+SEAT_LAYOUTS = {'Big': (6, 4, 30, 6), 'Small': (0, 0, 25, 6)}
+CREW = {'Big': (3, 6), 'Small': (2, 3)}  # (pilots, attendants), as add_flight requires
+
+FIRST_NAMES = ('noa', 'yael', 'tamar', 'maya', 'shira', 'roni', 'dana', 'michal', 'adi', 'lior',
+               'itay', 'omer', 'yonatan', 'daniel', 'amit', 'eitan', 'noam', 'yosef', 'ariel', 'guy')
+LAST_NAMES = ('cohen', 'levi', 'mizrahi', 'peretz', 'biton', 'dahan', 'avraham', 'friedman', 'azoulay',
+              'katz', 'malka', 'shapiro', 'klein', 'rosen', 'golan', 'ben-david', 'amar', 'hadad')
+EMPLOYEE_FIRST = ('נועה', 'יובל', 'חן', 'דניאל', 'איתי', 'רות', 'נעם', 'דור', 'גל', 'שירה', 'עומר', 'מאיה')
+EMPLOYEE_LAST = ('כהן', 'לוי', 'פרץ', 'קליין', 'ריבין', 'אצקין', 'מזרחי', 'ביטון', 'דהן', 'שפירא')
+CITIES = ('תל אביב', 'רמת גן', 'חיפה', 'ירושלים', 'רעננה', 'הרצליה', 'פתח תקווה', 'מודיעין')
+STREETS = ('הרצל', 'הכרמל', 'גאולה', 'אלנבי', 'ויצמן', 'רוטשילד', 'סוקולוב', 'ביאליק')
+
+CUSTOMER_PASSWORD = 'flytau123'
+SEATS_PER_BOOKING = (1, 1, 1, 1, 2, 2, 2, 3, 4, 5)   # drawn uniformly -> ~2.2 seats per booking
+BUSINESS_SHARE = 0.12            # bookings in Business class on Big aircraft
+CUSTOMER_CANCEL_RATE = 0.07      # bookings cancelled by the customer
+FLIGHT_CANCEL_RATE = 0.01        # rotations cancelled by the company (both legs)
+
+# Per --scale unit.
+SCALE_AIRCRAFT = 40
+SCALE_CUSTOMERS = 300_000
+SCALE_BOOKINGS = 1_000_000
+
+# Booking ids: 8 base-36 characters, a bijective scramble of a sequence number (unique, random-looking).
+_BOOKING_ID_ALPHABET = string.digits + string.ascii_uppercase
+_BOOKING_ID_SPACE = 36 ** 8
+_BOOKING_ID_MULTIPLIER = 2_654_435_761   # coprime with 36
+
+# Truncated by --truncate (children first; FK checks are off anyway).
+DATA_TABLES = (
+    'Revenue_Ledger', 'Report_Aircraft_Month_Route', 'Report_Aircraft_Month', 'Report_Booking_Month',
+    'Report_Flight_Occupancy', 'Seat_Hold', 'Reserved_Seat', 'Booking', 'Flight_Inventory',
+    'Pilots_on_Flights', 'Flight_Attendant_on_Flights', 'Flight', 'Route', 'Seat', 'Aircraft',
+    'Pilot', 'Flight_Attendant', 'Customer_Phone', 'Registered_Customer', 'Customer',
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic FLYTAU dataset and bulk-load it.")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f"Scale factor: {SCALE_AIRCRAFT} aircraft, {SCALE_CUSTOMERS:,} customers and "
+                             f"{SCALE_BOOKINGS:,} bookings per unit")
+    parser.add_argument('--aircraft', type=int, help="Number of aircraft (overrides --scale)")
+    parser.add_argument('--customers', type=int, help="Number of customers (overrides --scale)")
+    parser.add_argument('--bookings', type=int, help="Approximate number of bookings (overrides --scale)")
+    parser.add_argument('--years', type=float, default=2.0, help="Years of flight history before today")
+    parser.add_argument('--future-days', type=int, default=120, help="Days of scheduled flights after today")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--method', choices=('insert', 'load-data'), default='insert',
+                        help="Multi-row INSERTs or LOAD DATA LOCAL INFILE")
+    parser.add_argument('--batch-rows', type=int, default=None,
+                        help="Rows per INSERT statement / per loaded file (default 2000 / 200000)")
+    parser.add_argument('--truncate', action='store_true', help="Delete existing data first")
+    parser.add_argument('--skip-reports', action='store_true', help="Do not rebuild the report summaries")
+    return parser.parse_args()
+
+
+class TableWriter:
+    """Buffers rows for one table and bulk-loads them every `batch_rows` rows."""
+
+    def __init__(self, conn, table, columns, method, batch_rows):
+        self.conn = conn
+        self.table = table
+        self.columns = columns
+        self.method = method
+        self.batch_rows = batch_rows
+        self.rows = []
+        self.count = 0
+        self._insert_sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        cursor = self.conn.cursor()
+        try:
+            if self.method == 'insert':
+                # mysql-connector turns an INSERT ... VALUES executemany() into one multi-row statement.
+                cursor.executemany(self._insert_sql, self.rows)
+            else:
+                self._load_data(cursor)
+            self.conn.commit()
+        finally:
+            cursor.close()
+        self.count += len(self.rows)
+        self.rows = []
+
+    def _load_data(self, cursor):
+        fd, path = tempfile.mkstemp(prefix=f'flytau_{self.table}_', suffix='.tsv')
+        try:
+            # Generated values never contain tabs, newlines or backslashes; NULL is \N.
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                for row in self.rows:
+                    f.write('\t'.join('\\N' if value is None else str(value) for value in row))
+                    f.write('\n')
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {self.table}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'
+                ({', '.join(self.columns)})
+            """, (path,))
+        finally:
+            os.remove(path)
+
+
+def booking_id(sequence):
+    n = (sequence * _BOOKING_ID_MULTIPLIER + 12_345_678) % _BOOKING_ID_SPACE
+    chars = []
+    for _ in range(8):
+        n, digit = divmod(n, 36)
+        chars.append(_BOOKING_ID_ALPHABET[digit])
+    return ''.join(chars)
+
+
+def customer_email(index):
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return f"{first}.{last}{index}@example.com"
+
+
+def round_up_5(dt):
+    """Departures are scheduled on 5-minute marks."""
+    extra = (5 - dt.minute % 5) % 5
+    return dt.replace(second=0, microsecond=0) + timedelta(minutes=extra)
+
+
+def generate_fleet(rng, n_aircraft, writers):
+    """Aircraft + seat maps; returns {aircraft_id: {'size', 'manufacturer', 'seats': {class: [(row, col)]}}}."""
+    fleet = {}
+    for aircraft_id in range(1, n_aircraft + 1):
+        size = 'Big' if rng.random() < 0.35 else 'Small'
+        manufacturer = rng.choice(MANUFACTURERS)
+        purchase_date = date.today() - timedelta(days=rng.randrange(365, 365 * 20))
+        writers['Aircraft'].add((aircraft_id, manufacturer, size, purchase_date))
+
+        bus_rows, bus_cols, eco_rows, eco_cols = SEAT_LAYOUTS[size]
+        seats = {'Business': [], 'Economy': []}
+        for row in range(1, bus_rows + eco_rows + 1):
+            seat_class, cols = ('Business', bus_cols) if row <= bus_rows else ('Economy', eco_cols)
+            for c in range(cols):
+                col = chr(65 + c)
+                seats[seat_class].append((row, col))
+                writers['Seat'].add((aircraft_id, row, col, seat_class))
+        fleet[aircraft_id] = {'size': size, 'manufacturer': manufacturer,
+                              'seats': {k: v for k, v in seats.items() if v}}
+    return fleet
+
+
+def generate_routes(writers):
+    """Both directions for every destination; returns {(origin, destination): (route_id, duration)}."""
+    routes = {}
+    route_id = 0
+    for destination, duration in DESTINATIONS.items():
+        for origin, dest in ((HUB, destination), (destination, HUB)):
+            route_id += 1
+            routes[(origin, dest)] = (route_id, duration)
+            writers['Route'].add((route_id, origin, dest, duration))
+    return routes
+
+
+def _employee(rng, employee_id, qualified):
+    return (employee_id, rng.choice(EMPLOYEE_FIRST), rng.choice(EMPLOYEE_LAST),
+            '05' + ''.join(rng.choices(string.digits, k=8)),
+            date.today() - timedelta(days=rng.randrange(30, 365 * 25)),
+            rng.choice(CITIES), rng.choice(STREETS), str(rng.randrange(1, 120)), int(qualified))
+
+
+def generate_crews(rng, fleet, writers):
+    """
+    One crew team per aircraft (it flies every rotation of that aircraft, so crew continuity follows
+    the aircraft's), plus ~20% unassigned staff for add_flight. Teams of Big aircraft are qualified.
+    Returns {aircraft_id: (pilot ids, attendant ids)}.
+    """
+    teams = {}
+    next_pilot, next_attendant = 100_000_000, 500_000_000
+    for aircraft_id, aircraft in fleet.items():
+        n_pilots, n_attendants = CREW[aircraft['size']]
+        qualified = aircraft['size'] == 'Big'
+        pilots, attendants = [], []
+        for _ in range(n_pilots):
+            next_pilot += 1
+            pilots.append(str(next_pilot))
+            writers['Pilot'].add(_employee(rng, str(next_pilot), qualified or rng.random() < 0.3))
+        for _ in range(n_attendants):
+            next_attendant += 1
+            attendants.append(str(next_attendant))
+            writers['Flight_Attendant'].add(_employee(rng, str(next_attendant), qualified or rng.random() < 0.3))
+        teams[aircraft_id] = (pilots, attendants)
+
+    for _ in range(max(2, len(fleet) // 5)):
+        next_pilot += 1
+        writers['Pilot'].add(_employee(rng, str(next_pilot), rng.random() < 0.5))
+        for _ in range(2):
+            next_attendant += 1
+            writers['Flight_Attendant'].add(_employee(rng, str(next_attendant), rng.random() < 0.5))
+    return teams
+
+
+def generate_customers(rng, n_customers, writers):
+    today = date.today()
+    for index in range(n_customers):
+        email = customer_email(index)
+        writers['Customer'].add((email, FIRST_NAMES[index % len(FIRST_NAMES)],
+                                 LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]))
+        writers['Customer_Phone'].add((email, '05' + str(10_000_000 + index)[-8:]))
+        if index % 4 == 0:
+            writers['Registered_Customer'].add((
+                email, str(10_000_000 + index), today - timedelta(days=rng.randrange(18 * 365, 80 * 365)),
+                CUSTOMER_PASSWORD, today - timedelta(days=rng.randrange(1, 5 * 365)),
+            ))
+
+
+def plan_rotations(rng, fleet, routes, start, end):
+    """
+    Every aircraft flies TLV -> X -> TLV rotations back to back (turnaround 1-2.5 h, then 2-14 h
+    on the ground at TLV). Returns the flights as dicts, sorted by departure.
+    """
+    short_only = [d for d, minutes in DESTINATIONS.items() if minutes <= LONG_FLIGHT_MINUTES]
+    flights = []
+    for aircraft_id, aircraft in fleet.items():
+        destinations = list(DESTINATIONS) if aircraft['size'] == 'Big' else short_only
+        t = round_up_5(start + timedelta(minutes=rng.randrange(5 * 60, 14 * 60)))
+        while t < end:
+            destination = rng.choice(destinations)
+            cancelled = rng.random() < FLIGHT_CANCEL_RATE
+            base_price = round(DESTINATIONS[destination] * 1.4 + 80, -1)
+            for origin, dest in ((HUB, destination), (destination, HUB)):
+                route_id, duration = routes[(origin, dest)]
+                arrival = t + timedelta(minutes=duration)
+                price = round(base_price * rng.uniform(0.8, 1.3), -1)
+                flights.append({
+                    'route_id': route_id, 'aircraft_id': aircraft_id, 'departure': t, 'arrival': arrival,
+                    'cancelled': cancelled, 'market': destination, 'price_economy': price,
+                    'price_business': round(price * 3.5, -1) if aircraft['size'] == 'Big' else 0,
+                })
+                t = round_up_5(arrival + timedelta(minutes=rng.randrange(60, 150)))
+            t = round_up_5(t + timedelta(hours=rng.uniform(2, 14)))
+    flights.sort(key=lambda f: (f['departure'], f['aircraft_id']))
+    return flights
+
+
+def generate_flights(rng, args, fleet, teams, flights, n_customers, total_bookings, writers):
+    """Flights with their crew, bookings, reserved seats, inventory and revenue ledger rows."""
+    now = datetime.now()
+    horizon = max(args.future_days, 1)
+
+    # Demand weight per flight: popular destinations fill better, future flights are still selling.
+    popularity = {destination: rng.uniform(0.6, 1.4) for destination in DESTINATIONS}
+    weights = []
+    for flight in flights:
+        weight = popularity[flight['market']] * rng.uniform(0.7, 1.3)
+        if flight['departure'] > now:
+            weight *= max(0.05, 1 - (flight['departure'] - now).days / horizon)
+        weights.append(weight)
+    per_weight = total_bookings / (sum(weights) or 1)
+
+    sequence = 0
+    started = time.perf_counter()
+    for flight_id, (flight, weight) in enumerate(zip(flights, weights), start=1):
+        aircraft = fleet[flight['aircraft_id']]
+        departed = flight['departure'] <= now
+        expected = weight * per_weight
+        n_bookings = int(expected) + (rng.random() < expected - int(expected))
+
+        # Draw the bookings, then give seats to those that keep them (cancelled ones released theirs).
+        free = {seat_class: len(seats) for seat_class, seats in aircraft['seats'].items()}
+        bookings = []
+        for _ in range(n_bookings):
+            seat_class = 'Business' if 'Business' in free and rng.random() < BUSINESS_SHARE else 'Economy'
+            n_seats = rng.choice(SEATS_PER_BOOKING)
+            if flight['cancelled']:
+                status = 'Cancelled by System'
+            elif rng.random() < CUSTOMER_CANCEL_RATE:
+                status = 'Cancelled by Customer'
+            else:
+                if free[seat_class] < n_seats:
+                    continue
+                free[seat_class] -= n_seats
+                status = 'Performed' if departed else 'Active'
+            bookings.append((seat_class, n_seats, status))
+
+        taken = {seat_class: rng.sample(seats, len(seats) - free[seat_class])
+                 for seat_class, seats in aircraft['seats'].items()}
+        booked = {seat_class: len(seats) for seat_class, seats in taken.items()}
+        price = {'Business': flight['price_business'], 'Economy': flight['price_economy']}
+        departure_date = flight['departure'].date()
+
+        for seat_class, n_seats, status in bookings:
+            sequence += 1
+            bid = booking_id(sequence)
+            email = customer_email(int(n_customers * rng.random() ** 1.6))
+            booked_at = flight['departure'] - timedelta(minutes=rng.randrange(60, 120 * 24 * 60))
+            if booked_at > now:
+                booked_at = now - timedelta(minutes=rng.randrange(1, 30 * 24 * 60))
+            booked_at = booked_at.replace(microsecond=0)
+
+            if status in ('Active', 'Performed'):
+                seats = [taken[seat_class].pop() for _ in range(n_seats)]
+            else:
+                seats = rng.sample(aircraft['seats'][seat_class], n_seats)
+            amount = price[seat_class] * n_seats
+            if status == 'Cancelled by System':
+                total_price, retained = 0, 0
+            elif status == 'Cancelled by Customer':
+                total_price, retained = round(amount * CANCELLATION_FEE_RATE, 2), CANCELLATION_FEE_RATE
+            else:
+                total_price, retained = amount, None
+
+            writers['Booking'].add((bid, email, flight_id, booked_at, total_price, status))
+            for row, col in seats:
+                if retained is None:
+                    writers['Reserved_Seat'].add((bid, flight_id, flight['aircraft_id'], row, col))
+                ledger = (bid, flight_id, departure_date, aircraft['size'], aircraft['manufacturer'],
+                          seat_class, row, col)
+                writers['Revenue_Ledger'].add(ledger + ('sale', price[seat_class], booked_at))
+                if retained is not None:
+                    writers['Revenue_Ledger'].add(ledger + (
+                        'refund', -round(price[seat_class] * (1 - retained), 2), booked_at))
+
+        if flight['cancelled']:
+            status = 'Cancelled'
+        elif departed:
+            status = 'Performed'
+        else:
+            status = 'Full' if not any(free.values()) else 'Active'
+        writers['Flight'].add((
+            flight_id, flight['route_id'], flight['aircraft_id'], departure_date,
+            flight['departure'].strftime('%H:%M:%S'), flight['arrival'], status,
+            flight['price_economy'], flight['price_business'],
+        ))
+        for seat_class, seats in aircraft['seats'].items():
+            writers['Flight_Inventory'].add((flight_id, seat_class, len(seats),
+                                             0 if flight['cancelled'] else booked[seat_class]))
+        pilots, attendants = teams[flight['aircraft_id']]
+        for employee_id in pilots:
+            writers['Pilots_on_Flights'].add((flight_id, employee_id))
+        for employee_id in attendants:
+            writers['Flight_Attendant_on_Flights'].add((flight_id, employee_id))
+
+        if flight_id % 20_000 == 0:
+            elapsed = time.perf_counter() - started
+            print(f"  {flight_id:,}/{len(flights):,} flights, {sequence:,} bookings "
+                  f"({sequence / elapsed:,.0f} bookings/s)")
+    return sequence
+
+
+def main():
+    args = parse_args()
+    n_aircraft = args.aircraft or max(2, round(SCALE_AIRCRAFT * args.scale))
+    n_customers = args.customers or max(10, round(SCALE_CUSTOMERS * args.scale))
+    total_bookings = args.bookings if args.bookings is not None else round(SCALE_BOOKINGS * args.scale)
+    batch_rows = args.batch_rows or (2000 if args.method == 'insert' else 200_000)
+    rng = random.Random(args.seed)
+
+    # The generator writes the tables of every migration (Flight_Inventory, Revenue_Ledger, reports...).
+    apply_migrations()
+
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=args.method == 'load-data')
+    cursor = conn.cursor()
+    cursor.execute("SELECT (SELECT COUNT(*) FROM Flight) + (SELECT COUNT(*) FROM Booking)")
+    if cursor.fetchone()[0] and not args.truncate:
+        print("ERROR: the database already has flights / bookings; use --truncate to replace them.")
+        raise SystemExit(1)
+
+    # Bulk-load session: integrity is guaranteed by construction.
+    cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    if args.truncate:
+        for table in DATA_TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.close()
+
+    columns = {
+        'Aircraft': ('aircraft_id', 'manufacturer', 'size', 'purchase_date'),
+        'Seat': ('aircraft_id', 'row_num', 'col_num', 'class'),
+        'Route': ('route_id', 'origin', 'destination', 'duration'),
+        'Pilot': ('employee_id', 'first_name', 'last_name', 'employee_phone', 'start_date',
+                  'city', 'street', 'house_num', 'is_qualified'),
+        'Flight_Attendant': ('employee_id', 'first_name', 'last_name', 'employee_phone', 'start_date',
+                             'city', 'street', 'house_num', 'is_qualified'),
+        'Customer': ('email', 'first_name', 'last_name'),
+        'Customer_Phone': ('email', 'phone_num'),
+        'Registered_Customer': ('email', 'passport_num', 'birth_date', 'password', 'register_date'),
+        'Flight': ('flight_id', 'route_id', 'aircraft_id', 'departure_date', 'departure_time',
+                   'arrival_datetime', 'flight_status', 'price_economy', 'price_business'),
+        'Flight_Inventory': ('flight_id', 'seat_class', 'total_seats', 'booked_seats'),
+        'Pilots_on_Flights': ('flight_id', 'employee_id'),
+        'Flight_Attendant_on_Flights': ('flight_id', 'employee_id'),
+        'Booking': ('booking_id', 'email', 'flight_id', 'booking_datetime', 'total_price', 'booking_status'),
+        'Reserved_Seat': ('booking_id', 'flight_id', 'aircraft_id', 'row_num', 'col_num'),
+        'Revenue_Ledger': ('booking_id', 'flight_id', 'departure_date', 'aircraft_size', 'manufacturer',
+                           'seat_class', 'row_num', 'col_num', 'entry_type', 'amount', 'recorded_at'),
+    }
+    writers = {table: TableWriter(conn, table, cols, args.method, batch_rows) for table, cols in columns.items()}
+
+    t0 = time.perf_counter()
+    today = datetime.combine(date.today(), datetime.min.time())
+    start = today - timedelta(days=round(args.years * 365))
+    end = today + timedelta(days=args.future_days)
+
+    fleet = generate_fleet(rng, n_aircraft, writers)
+    routes = generate_routes(writers)
+    teams = generate_crews(rng, fleet, writers)
+    print(f"{n_aircraft} aircraft, {len(routes)} routes; generating {n_customers:,} customers...")
+    generate_customers(rng, n_customers, writers)
+
+    flights = plan_rotations(rng, fleet, routes, start, end)
+    print(f"{len(flights):,} flights from {start.date()} to {end.date()}; generating ~{total_bookings:,} bookings...")
+    n_bookings = generate_flights(rng, args, fleet, teams, flights, n_customers, total_bookings, writers)
+    for writer in writers.values():
+        writer.flush()
+    load_seconds = time.perf_counter() - t0
+
+    cursor = conn.cursor()
+    for table in columns:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    if not args.skip_reports:
+        print("Rebuilding report summaries...")
+        rebuild_report_summaries()
+
+    print(f"Done in {time.perf_counter() - t0:.1f}s (load {load_seconds:.1f}s, method {args.method}):")
+    for table, writer in writers.items():
+        print(f"  {table:<28} {writer.count:>12,} rows")
+    print(f"{n_bookings:,} bookings. Registered customers use the password {CUSTOMER_PASSWORD!r}, "
+          f"e.g. {customer_email(0)}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,16 +8,39 @@ Main rules enforced in the system:
 - "Append-only" continuity: an aircraft/crew can only be scheduled for the NEXT flight that departs
   from the last destination they will reach in their current schedule chain.
 """
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, stream_template, request, redirect, url_for, session, flash, jsonify, \
+    Response, stream_with_context, g
+import click
 import mysql.connector
+from mysql.connector import errorcode
 from contextlib import contextmanager  # ✅ NEW
+from collections import deque, OrderedDict
+import bisect
+import functools
+import hashlib
+import keyword
+import csv
+import io
+import json
+import heapq
+import itertools
+import pickle
 import random
 import string
 import re
+import secrets
+import threading
+import time
+import weakref
 from datetime import datetime, date, timedelta
 import os
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:  # Windows: SingleFlight coalesces within one process only
+    fcntl = None
+
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
 
@@ -30,200 +53,3005 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME')
 }
 
+# Connection pool settings (all optional, see ConnectionPool).
+DB_POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', '10')),
+    'acquire_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+    'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+}
+
+# Read replicas (see DBManager.use_replicas): DB_REPLICAS="host[:port],host[:port]", same user / password /
+# database as the primary. Reads of GET requests go to a replica, except for a session that wrote in the
+# last DB_READ_YOUR_WRITES seconds; an unreachable replica is skipped for DB_REPLICA_RETRY seconds.
+DB_REPLICA_CONFIGS = [
+    dict(DB_CONFIG, host=host, port=int(port or 3306))
+    for host, _, port in (item.strip().partition(':') for item in os.getenv('DB_REPLICAS', '').split(','))
+    if host
+]
+DB_READ_YOUR_WRITES = float(os.getenv('DB_READ_YOUR_WRITES', '10'))
+DB_REPLICA_RETRY = float(os.getenv('DB_REPLICA_RETRY', '30'))
+
+# Flight list pagination (index / search): default and maximum rows per page.
+FLIGHT_PAGE_SIZE = int(os.getenv('FLIGHT_PAGE_SIZE', '50'))
+FLIGHT_PAGE_SIZE_MAX = 200
+
+# Rows per fetchmany() round trip for DBManager.fetch_iter().
+DB_FETCH_BATCH = int(os.getenv('DB_FETCH_BATCH', '500'))
+
+# Query instrumentation (see QueryInstrumentation): slow-query threshold, N+1 warning threshold
+# (same statement more than K times in one request) and opt-in X-DB-Queries / X-DB-Time headers.
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', '10'))
+DB_QUERY_HEADERS = os.getenv('DB_QUERY_HEADERS', '0') == '1'
+
+# Prometheus /metrics endpoint (see Metrics). When METRICS_TOKEN is set, scrapers must send
+# "Authorization: Bearer <token>"; otherwise the endpoint is open (keep it off the public network).
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Opt-in read cache (see QueryCache / DBManager.fetch_all_cached).
+QUERY_CACHE_CONFIG = {
+    'max_entries': int(os.getenv('QUERY_CACHE_SIZE', '1024')),
+    'default_ttl': float(os.getenv('QUERY_CACHE_TTL', '60')),
+}
+
+# Coalescing of identical concurrent flight list queries (see SingleFlight). Set SINGLEFLIGHT=0 to disable.
+# SINGLEFLIGHT_DIR (a local directory) also coalesces across the worker processes of one host;
+# SINGLEFLIGHT_WAIT is the longest a request waits for another one's result before querying itself.
+SINGLEFLIGHT_ENABLED = os.getenv('SINGLEFLIGHT', '1') != '0'
+SINGLEFLIGHT_DIR = os.getenv('SINGLEFLIGHT_DIR', '')
+SINGLEFLIGHT_WAIT = float(os.getenv('SINGLEFLIGHT_WAIT', '5'))
+
+# Background status maintenance (see StatusScheduler). Set STATUS_SCHEDULER=0 to disable it.
+STATUS_SCHEDULER_ENABLED = os.getenv('STATUS_SCHEDULER', '1') != '0'
+STATUS_SCHEDULER_REFRESH = float(os.getenv('STATUS_SCHEDULER_REFRESH', '60'))
+STATUS_SCHEDULER_CATCH_UP = float(os.getenv('STATUS_SCHEDULER_CATCH_UP', '900'))
+
+# Process-local resource timeline index (see ResourceTimeline). Set RESOURCE_TIMELINE=0 to use SQL only.
+RESOURCE_TIMELINE_ENABLED = os.getenv('RESOURCE_TIMELINE', '1') != '0'
+RESOURCE_TIMELINE_MAX_AGE = float(os.getenv('RESOURCE_TIMELINE_MAX_AGE', '300'))
+
+# Share of the booking price kept when a customer cancels (cancel_booking).
+CANCELLATION_FEE_RATE = 0.05
+
+# How long selected seats stay held for a user between seat selection and confirmation.
+SEAT_HOLD_TTL = int(os.getenv('SEAT_HOLD_TTL', '600'))
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html')
 
 
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+
+    - At most `size` connections exist at once; callers wait up to `acquire_timeout` seconds
+      for a free one and get a mysql.connector.PoolError otherwise.
+    - Every borrowed connection is pinged first (health-check-on-borrow) and replaced if dead.
+    - Connections older than `max_lifetime` or idle longer than `max_idle` seconds are closed
+      instead of being handed out again.
+    """
+
+    def __init__(self, config, size=10, acquire_timeout=10, max_lifetime=1800, max_idle=300):
+        self.config = config
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque()    # (conn, created_at, last_used), most recently used on the right
+        self._created_at = {}   # id(conn) -> creation time, for connections currently borrowed
+        self._open = 0          # idle + borrowed connections
+
+        self._stats = {
+            'created': 0, 'closed': 0, 'borrowed': 0, 'waits': 0,
+            'timeouts': 0, 'health_check_failures': 0, 'expired': 0,
+        }
+
+    def _bump(self, counter):
+        with self._cond:
+            self._stats[counter] += 1
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        self._bump('created')
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        self._bump('closed')
+
+    def _is_expired(self, created_at, last_used, now):
+        return (now - created_at) > self.max_lifetime or (now - last_used) > self.max_idle
+
+    def acquire(self):
+        """Borrow a healthy connection (waits while the pool is exhausted)."""
+        deadline = time.monotonic() + self.acquire_timeout
+        conn = None
+        created_at = None
+        with self._cond:
+            while conn is None:
+                now = time.monotonic()
+                while self._idle:
+                    candidate, born, last_used = self._idle.pop()
+                    if self._is_expired(born, last_used, now):
+                        self._open -= 1
+                        self._stats['expired'] += 1
+                        self._close(candidate)
+                        continue
+                    conn, created_at = candidate, born
+                    break
+                if conn is not None:
+                    break
+                if self._open < self.size:
+                    # Reserve the slot now, connect outside the lock.
+                    self._open += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise mysql.connector.PoolError("Connection pool exhausted")
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+
+        try:
+            if conn is None:
+                conn = self._connect()
+                created_at = time.monotonic()
+            else:
+                try:
+                    conn.ping(reconnect=False)
+                except mysql.connector.Error:
+                    self._bump('health_check_failures')
+                    self._close(conn)
+                    conn = self._connect()
+                    created_at = time.monotonic()
+        except mysql.connector.Error:
+            # Give the reserved slot back so other callers can try again.
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created_at[id(conn)] = created_at
+            self._stats['borrowed'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection; `discard=True` closes it instead (e.g. broken state)."""
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close(conn)
+
+    def close_all(self):
+        """Close every idle connection (borrowed ones are closed when released with discard=True)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Snapshot of pool usage counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': len(self._created_at),
+            })
+        return snapshot
+
+
+# Table names a statement reads or writes (used for cache tags / invalidation).
+_TABLE_REF_RE = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?', re.IGNORECASE)
+_WRITE_RE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE|ALTER|CREATE|DROP|TRUNCATE|LOAD)\b', re.IGNORECASE)
+
+
+def tables_in(query):
+    """Lower-cased table names referenced by a statement (FROM / JOIN / INTO / UPDATE targets)."""
+    return {name.lower() for name in _TABLE_REF_RE.findall(query)}
+
+
+def written_tables(query):
+    """Tables a write statement may change (conservatively: every table it references); empty for reads."""
+    return tables_in(query) if _WRITE_RE.match(query) else set()
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of read results, keyed on (SQL text, params).
+
+    - Every entry is tagged with the tables it reads; invalidate(*tables) drops all entries
+      tagged with any of them (called by DBManager after writes).
+    - Entries expire after their TTL. The cache is per process, so writes made by other
+      workers are only seen once the TTL expires: cache only data that may be that stale.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value), least recently used first
+        self._by_table = {}            # table -> set of keys
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def _drop(self, key):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[2]
+
+    def set(self, key, value, tables, ttl=None):
+        tables = frozenset(t.lower() for t in tables)
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, tables, value)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                for key in list(self._by_table.pop(table.lower(), ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = round(snapshot['hits'] / lookups, 4) if lookups else None
+        return snapshot
+
+
+class _Flight:
+    """One in-progress SingleFlight execution: waiters block on `done`, then read result / error."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent do(key, fn) calls with the same key share ONE execution of fn.
+
+    - The first caller (leader) runs fn; callers arriving while it runs wait for it and get the same
+      result object (or the same exception). Nothing is cached: a call after the leader finished runs fn
+      again, so results are exactly as fresh as without coalescing. Callers must not mutate the result.
+    - With `shared_dir` (cross-process mode, needs fcntl), the leaders of the worker processes of one host
+      also coordinate: per key, an flock'ed lock file elects one of them; it writes its result (pickled)
+      next to the lock, and processes that waited for the lock read that result instead of running fn.
+      Results must be picklable then.
+    - A caller waits at most `wait_timeout` seconds for another execution, then runs fn itself.
+    - stats(): executions, calls coalesced in the process / across processes, and wait timeouts.
+    """
+
+    POLL_INTERVAL = 0.005   # seconds between lock attempts while another process runs the query
+    SHARED_MAX_AGE = 60     # seconds shared result files are kept (swept by leaders)
+
+    def __init__(self, shared_dir=None, wait_timeout=5):
+        self.shared_dir = shared_dir if shared_dir and fcntl is not None else None
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights = {}  # key -> _Flight running in this process
+        self._next_sweep = 0.0
+        self._stats = {'executions': 0, 'coalesced': 0, 'coalesced_shared': 0, 'timeouts': 0}
+
+    def _bump(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def do(self, key, fn):
+        """Returns fn()'s result, sharing the execution with concurrent calls for the same key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                self._bump('timeouts')
+                return self._run(fn)
+            self._bump('coalesced')
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._lead(key, fn)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _run(self, fn):
+        result = fn()
+        self._bump('executions')
+        return result
+
+    def _lead(self, key, fn):
+        if self.shared_dir is None:
+            return self._run(fn)
+        path = os.path.join(self.shared_dir, hashlib.sha1(repr(key).encode()).hexdigest())
+        arrived = time.time()
+        with open(path + '.lock', 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process runs the same query: wait for it and take its result.
+                if not self._wait_for_lock(lock_file):
+                    self._bump('timeouts')
+                    return self._run(fn)
+                found, result = self._read_shared(path, arrived)
+                if found:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    self._bump('coalesced_shared')
+                    return result
+                # Its execution failed: run it here (still holding the lock for the next waiters).
+            try:
+                result = self._run(fn)
+                self._write_shared(path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._sweep()
+
+    def _wait_for_lock(self, lock_file):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                continue
+        return False
+
+    def _read_shared(self, path, arrived):
+        """(True, result) if a result finished after `arrived` was written, (False, None) otherwise."""
+        try:
+            with open(path + '.result', 'rb') as f:
+                finished, result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        return (True, result) if finished >= arrived else (False, None)
+
+    def _write_shared(self, path, result):
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, 'wb') as f:
+                pickle.dump((time.time(), result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path + '.result')  # atomic: readers never see a partial file
+        except (OSError, pickle.PicklingError, TypeError):
+            app.logger.warning("SingleFlight: result for %s not shared", path, exc_info=True)
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+
+    def _sweep(self):
+        """Removes result files (and their lock files) older than SHARED_MAX_AGE, at most once a minute."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + 60
+        cutoff = time.time() - self.SHARED_MAX_AGE
+        for entry in os.scandir(self.shared_dir):
+            try:
+                if entry.name.endswith('.result') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    os.remove(entry.path[:-len('.result')] + '.lock')
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['in_flight'] = len(self._flights)
+        snapshot['shared'] = self.shared_dir is not None
+        return snapshot
+
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), '?'),               # string literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),                    # numbers
+    (re.compile(r'%s'), '?'),                                   # placeholders
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?+)'),            # IN (?, ?, ...) of any length
+    (re.compile(r'\(\s*\(\?\+?\)(?:\s*,\s*\(\?\+?\))+\s*\)'), '((?+)+)'),  # row lists
+    (re.compile(r'\s+'), ' '),
+]
+
+
+@functools.lru_cache(maxsize=1024)
+def query_fingerprint(query):
+    """Normalized statement shape: literals and placeholders -> ?, IN lists collapsed, whitespace squeezed."""
+    for pattern, replacement in _FINGERPRINT_RULES:
+        query = pattern.sub(replacement, query)
+    return query.strip()
+
+
+def redact_params(params):
+    """Parameter shapes for logs, never the values (e.g. ['int', 'str(12)'])."""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: redact_params([value])[0] for key, value in params.items()}
+    shapes = []
+    for value in params:
+        if isinstance(value, (str, bytes)):
+            shapes.append(f"{type(value).__name__}({len(value)})")
+        elif isinstance(value, (list, tuple)):
+            shapes.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            shapes.append(type(value).__name__)
+    return shapes
+
+
+class Metrics:
+    """
+    Process-local counters and histograms, rendered in the Prometheus text format (GET /metrics).
+
+    Lock-light: every thread writes to its own shard (its own lock, only contended while a scrape
+    reads that shard), so hot-path updates never wait on each other. render() merges the shards;
+    shards of threads that have exited are folded into a retired total so short-lived request
+    threads do not pile up. Histograms use fixed, cumulative-on-render buckets.
+    Metrics are per process: with several workers, scrape each one (or sum in Prometheus).
+    """
+
+    REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+    def __init__(self):
+        self._families = {}   # name -> (type, help, buckets)
+        self._local = threading.local()
+        self._shards = []     # (thread, lock, values) for every thread that recorded something
+        self._shards_lock = threading.Lock()
+        self._retired = {}    # values of exited threads
+
+    def counter(self, name, help_text):
+        self._families[name] = ('counter', help_text, None)
+
+    def histogram(self, name, help_text, buckets=REQUEST_BUCKETS):
+        self._families[name] = ('histogram', help_text, tuple(buckets))
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = (threading.current_thread(), threading.Lock(), {})
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, amount=1, **labels):
+        """Adds `amount` to a counter (labels as keyword arguments)."""
+        _, lock, values = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        with lock:
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Records one histogram sample (seconds)."""
+        buckets = self._families[name][2]
+        _, lock, values = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        with lock:
+            entry = values.get(key)
+            if entry is None:
+                entry = values[key] = [[0] * (len(buckets) + 1), 0.0, 0]   # per-bucket counts, sum, count
+            entry[0][bisect.bisect_left(buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @staticmethod
+    def _merge(into, values):
+        for key, value in values.items():
+            current = into.get(key)
+            if current is None:
+                into[key] = [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+            elif isinstance(value, list):
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+                current[2] += value[2]
+            else:
+                into[key] = current + value
+
+    def collect(self):
+        """Merged values of every shard: {(name, labels): count | [bucket counts, sum, count]}."""
+        merged = {}
+        with self._shards_lock:
+            alive = []
+            for thread, lock, values in self._shards:
+                with lock:
+                    if thread.is_alive():
+                        alive.append((thread, lock, values))
+                        self._merge(merged, values)
+                    else:
+                        self._merge(self._retired, values)
+            self._shards = alive
+            self._merge(merged, self._retired)
+        return merged
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+    def render(self, sampled=()):
+        """
+        Prometheus text exposition of every registered metric plus `sampled` values read at scrape
+        time from other components: an iterable of (name, type, help, [(labels dict, value), ...]).
+        """
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(merged.items()):
+                if metric != name:
+                    continue
+                if kind == 'counter':
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+        for name, kind, help_text, samples in sampled:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{self._labels(sorted(labels.items()))} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class QueryInstrumentation:
+    """
+    Timing of every statement run through DBManager, aggregated per request and per route.
+
+    - record() gets wall time, rows and the statement; statements are grouped by query_fingerprint().
+    - Requests are delimited by begin_request() / end_request() (Flask hooks); queries run outside
+      a request (scheduler thread, CLI, streamed bodies) only count for the slow-query log.
+    - Statements slower than slow_query_ms are logged (parameters redacted) and kept in slow_queries.
+    - A request that runs the same fingerprint more than n_plus_one_threshold times logs an N+1 warning.
+    - With `metrics`, every statement is also observed in the flytau_db_query_duration_seconds histogram.
+    """
+
+    def __init__(self, logger, slow_query_ms=200, n_plus_one_threshold=10, slow_log_size=100, metrics=None):
+        self.logger = logger
+        self.metrics = metrics
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._routes = {}  # route -> totals + per-fingerprint counts
+
+    def begin_request(self, route):
+        self._local.request = {'route': route, 'queries': 0, 'db_ms': 0.0, 'errors': 0,
+                               'fingerprints': {}, 'warned': set()}
+
+    def end_request(self):
+        """Closes the current request and adds it to its route's totals; returns its summary (or None)."""
+        current = getattr(self._local, 'request', None)
+        self._local.request = None
+        if current is None:
+            return None
+        with self._lock:
+            totals = self._routes.setdefault(current['route'], {
+                'requests': 0, 'queries': 0, 'db_ms': 0.0, 'errors': 0, 'n_plus_one': 0, 'fingerprints': {},
+            })
+            totals['requests'] += 1
+            totals['queries'] += current['queries']
+            totals['db_ms'] += current['db_ms']
+            totals['errors'] += current['errors']
+            totals['n_plus_one'] += len(current['warned'])
+            for fingerprint, count in current['fingerprints'].items():
+                totals['fingerprints'][fingerprint] = totals['fingerprints'].get(fingerprint, 0) + count
+        return current
+
+    def record(self, query, params, elapsed_ms, rows, error=None):
+        fingerprint = query_fingerprint(query)
+        if self.metrics is not None:
+            self.metrics.observe('flytau_db_query_duration_seconds', elapsed_ms / 1000, statement=fingerprint)
+        current = getattr(self._local, 'request', None)
+        if current is not None:
+            current['queries'] += 1
+            current['db_ms'] += elapsed_ms
+            count = current['fingerprints'][fingerprint] = current['fingerprints'].get(fingerprint, 0) + 1
+            if error is not None:
+                current['errors'] += 1
+            if count > self.n_plus_one_threshold and fingerprint not in current['warned']:
+                current['warned'].add(fingerprint)
+                self.logger.warning("Possible N+1: %s ran the same statement more than %d times: %s",
+                                    current['route'], self.n_plus_one_threshold, fingerprint)
+        if error is not None:
+            error.query_logged = True  # DBManager._log_swallowed does not log it again
+            self.logger.warning("Query failed (%s): %s params=%s", error, fingerprint, redact_params(params))
+        if elapsed_ms >= self.slow_query_ms:
+            entry = {
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'route': current['route'] if current else None,
+                'ms': round(elapsed_ms, 1),
+                'rows': rows,
+                'query': fingerprint,
+                'params': redact_params(params),
+            }
+            with self._lock:
+                self.slow_queries.append(entry)
+            self.logger.warning("Slow query %.1f ms (%s rows) on %s: %s params=%s",
+                                elapsed_ms, rows, entry['route'], fingerprint, entry['params'])
+
+    def stats(self, top=5):
+        """Per-route averages with the most frequent statements, plus the recent slow queries."""
+        with self._lock:
+            routes = {}
+            for route, totals in self._routes.items():
+                requests = totals['requests'] or 1
+                routes[route] = {
+                    'requests': totals['requests'],
+                    'queries_per_request': round(totals['queries'] / requests, 2),
+                    'db_ms_per_request': round(totals['db_ms'] / requests, 2),
+                    'errors': totals['errors'],
+                    'n_plus_one_warnings': totals['n_plus_one'],
+                    'top_statements': sorted(totals['fingerprints'].items(), key=lambda item: -item[1])[:top],
+                }
+            return {'routes': routes, 'slow_queries': list(self.slow_queries)}
+
+
+class _InstrumentedCursor:
+    """Cursor proxy used by DBManager._cursor(): times every execute / executemany (QueryInstrumentation)."""
+
+    def __init__(self, cursor, instrumentation):
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+
+    def _timed(self, method, query, params):
+        started = time.perf_counter()
+        try:
+            result = method(query, params)
+        except mysql.connector.Error as e:
+            self._instrumentation.record(query, params, (time.perf_counter() - started) * 1000, 0, error=e)
+            raise
+        self._instrumentation.record(query, params, (time.perf_counter() - started) * 1000, self._cursor.rowcount)
+        return result
+
+    def execute(self, query, params=None):
+        return self._timed(self._cursor.execute, query, params)
+
+    def executemany(self, query, seq_params):
+        return self._timed(self._cursor.executemany, query, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TrackingCursor:
+    """Cursor proxy used by DBManager.transaction(): records the tables written through it."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.written = set()
+
+    def execute(self, query, params=None):
+        self.written |= written_tables(query)
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq_params):
+        self.written |= written_tables(query)
+        return self._cursor.executemany(query, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Record:
+    """
+    Base class of the compact row classes made by record_class(): one __slots__ attribute per column,
+    no per-row dict. Rows read like dict rows too (row['col'], row.get, keys()), so templates and
+    callers work with either; columns that are not valid attribute names (e.g. `class`) are still
+    reachable as row.class in templates and as row['class'].
+    """
+    __slots__ = ()
+    _columns = ()  # column names, as returned by the query
+    _fields = {}   # column name -> attribute name
+
+    def __getattr__(self, name):
+        # Only reached for columns whose name is not a usable attribute name.
+        try:
+            return object.__getattribute__(self, self._fields[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, column):
+        return object.__getattribute__(self, self._fields[column])
+
+    def get(self, column, default=None):
+        return self[column] if column in self._fields else default
+
+    def keys(self):
+        return self._columns
+
+    def _asdict(self):
+        return {column: self[column] for column in self._columns}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self._asdict() == other._asdict()
+
+    def __repr__(self):
+        return f"Record({self._asdict()!r})"
+
+    def __reduce__(self):
+        # Picklable although the class is built at runtime (e.g. results shared by SingleFlight).
+        return _restore_record, (self._columns, tuple(self[column] for column in self._columns))
+
+
+@functools.lru_cache(maxsize=256)
+def record_class(columns):
+    """
+    __slots__ row class for a tuple of column names (cached per query shape).
+    Like dict rows, a repeated column name keeps the value of its last occurrence.
+    """
+    fields = {}
+    for i, column in enumerate(columns):
+        usable = column.isidentifier() and not keyword.iskeyword(column) and not column.startswith('_')
+        fields[column] = column if usable else f"_c{i}"
+    args = [f"_v{i}" for i in range(len(columns))]
+    body = "\n".join(f"    self.{fields[column]} = {arg}" for column, arg in zip(columns, args)) or "    pass"
+    namespace = {}
+    exec(f"def __init__(self, {', '.join(args)}):\n{body}", namespace)
+    return type('Record', (Record,), {
+        '__slots__': tuple(dict.fromkeys(fields.values())),
+        '__init__': namespace['__init__'],
+        '_columns': tuple(dict.fromkeys(columns)),
+        '_fields': fields,
+    })
+
+
+def _restore_record(columns, values):
+    return record_class(columns)(*values)
+
+
+# Row shapes for DBManager.fetch_* (row_factory=...):
+# - dict:    one dict per row (default, what the rest of the app expects)
+# - tuple:   plain tuples in SELECT order (smallest, positional access only)
+# - record:  __slots__ Record per row (attribute / key access, no per-row dict)
+# - columns: {column: tuple of values} for the whole result (column-oriented, e.g. report series)
+ROW_FACTORIES = ('dict', 'tuple', 'record', 'columns')
+
+
+def shape_rows(columns, rows, row_factory):
+    """Converts tuple rows from a non-dictionary cursor to the requested row_factory shape."""
+    if row_factory == 'tuple':
+        return rows
+    if row_factory == 'record':
+        make = record_class(tuple(columns))
+        return [make(*row) for row in rows]
+    if row_factory == 'columns':
+        values = list(zip(*rows)) or [()] * len(columns)
+        return dict(zip(columns, values))
+    raise ValueError(f"Unknown row_factory: {row_factory!r}")
+
+
+class RowStream:
+    """
+    Iterator over streamed rows, returned by DBManager.fetch_iter().
+
+    Also a context manager: leaving the `with` block (or calling close()) ends the stream
+    and releases its connection right away, even if not every row was read.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def close(self):
+        self._rows.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class DBManager:
-    """Small helper class for running MySQL queries and returning dict-based rows."""
+    """
+    Small helper class for running MySQL queries and returning dict-based rows.
 
-    def __init__(self, config):
+    With `replica_configs`, reads can be split off to read replicas (see use_replicas): `pool` is the
+    primary, `replicas` one pool per replica endpoint.
+    """
+
+    def __init__(self, config, pool_config=None, cache_config=None, fetch_batch_size=500, instrumentation=None,
+                 replica_configs=(), replica_retry=30):
         self.config = config
+        self.pool = ConnectionPool(config, **(pool_config or {}))
+        self.replicas = [ConnectionPool(replica, **(pool_config or {})) for replica in replica_configs]
+        self.replica_retry = replica_retry
+        self._routing = threading.local()  # per thread: reads go to replicas? wrote since use_replicas()?
+        self._routing_lock = threading.Lock()
+        self._replica_down_until = [0.0] * len(self.replicas)
+        self._next_replica = 0
+        self._routing_stats = {'primary_reads': 0, 'replica_reads': 0, 'replica_failures': 0}
+        self.cache = QueryCache(**(cache_config or {}))
+        self.fetch_batch_size = fetch_batch_size
+        self.instrumentation = instrumentation or QueryInstrumentation(app.logger)
+
+        # Named statements run as server-side prepared statements (see register_statement).
+        self.statements = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> {'connection_id', 'cursors'}
+        self._prepared_lock = threading.Lock()
+        self._prepared_stats = {'prepares': 0, 'executions': 0, 'reprepares': 0}
+
+    def use_replicas(self, enabled=True):
+        """
+        Routes this thread's reads (fetch_*) to the read replicas, round-robin, until the next call;
+        enabled=False (and the default for threads that never call it) reads from the primary.
+
+        Writes (execute_query, transaction) always go to the primary, and once this thread wrote, its
+        reads go to the primary again, so a request sees its own writes. The Flask hooks call it per
+        request and keep a session on the primary for DB_READ_YOUR_WRITES seconds after a write (see wrote()).
+        """
+        self._routing.replica = enabled and bool(self.replicas)
+        self._routing.wrote = False
+
+    def wrote(self):
+        """True if this thread wrote (execute_query / transaction) since the last use_replicas() call."""
+        return getattr(self._routing, 'wrote', False)
+
+    def _mark_write(self):
+        self._routing.replica = False
+        self._routing.wrote = True
+
+    def reads_replica(self):
+        """True if this thread's reads currently go to a replica (see use_replicas)."""
+        return getattr(self._routing, 'replica', False)
+
+    def _acquire_read(self):
+        """(pool, connection) for a read: the next healthy replica when routed there, the primary otherwise."""
+        if self.reads_replica():
+            now = time.monotonic()
+            with self._routing_lock:
+                first = self._next_replica
+                self._next_replica = (first + 1) % len(self.replicas)
+            for offset in range(len(self.replicas)):
+                index = (first + offset) % len(self.replicas)
+                if self._replica_down_until[index] > now:
+                    continue
+                replica = self.replicas[index]
+                try:
+                    conn = replica.acquire()
+                except mysql.connector.Error as e:
+                    # Unreachable / exhausted replica: skip it for replica_retry seconds.
+                    with self._routing_lock:
+                        self._replica_down_until[index] = now + self.replica_retry
+                        self._routing_stats['replica_failures'] += 1
+                    self.instrumentation.logger.warning("Replica %s:%s unavailable for %ss: %s",
+                                                        replica.config['host'], replica.config.get('port', 3306),
+                                                        self.replica_retry, e)
+                    continue
+                with self._routing_lock:
+                    self._routing_stats['replica_reads'] += 1
+                return replica, conn
+        with self._routing_lock:
+            self._routing_stats['primary_reads'] += 1
+        return self.pool, self.pool.acquire()
+
+    def routing_stats(self):
+        """Reads per target, replica failures, and per replica its endpoint, state and pool usage."""
+        now = time.monotonic()
+        with self._routing_lock:
+            snapshot = dict(self._routing_stats)
+            down_until = list(self._replica_down_until)
+        snapshot['replicas'] = [
+            {'host': replica.config['host'], 'port': replica.config.get('port', 3306),
+             'available': down_until[index] <= now, 'pool': replica.stats()}
+            for index, replica in enumerate(self.replicas)
+        ]
+        return snapshot
 
     @contextmanager
-    def _cursor(self, dictionary=True):
+    def connection(self, read=False):
         """
-        Context manager that opens a DB connection + cursor and ALWAYS closes them.
-        Commits on success, rollbacks on error.
+        Context manager that borrows a pooled connection and ALWAYS returns it.
+        A connection that could not be rolled back is discarded instead of being reused.
+        read=True borrows from a replica when this thread's reads are routed there (see use_replicas).
         """
-        conn = None
-        cursor = None
+        pool, conn = self._acquire_read() if read else (self.pool, self.pool.acquire())
+        discard = False
         try:
-            conn = mysql.connector.connect(**self.config)
-            cursor = conn.cursor(dictionary=dictionary)
-            yield conn, cursor
-            conn.commit()
-        except mysql.connector.Error:
-            if conn:
+            yield conn
+        except BaseException:
+            try:
                 conn.rollback()
+            except mysql.connector.Error:
+                discard = True
             raise
         finally:
-            if cursor:
+            pool.release(conn, discard=discard)
+
+    @contextmanager
+    def _cursor(self, dictionary=True, read=False):
+        """
+        Context manager that borrows a pooled connection + opens a cursor and ALWAYS closes the cursor.
+        Commits on success, rollbacks on error (see connection()).
+        """
+        with self.connection(read) as conn:
+            # Buffered so a partially read result (fetch_one) never leaks into the next borrower.
+            cursor = conn.cursor(dictionary=dictionary, buffered=True)
+            try:
+                yield conn, _InstrumentedCursor(cursor, self.instrumentation)
+                conn.commit()
+            finally:
                 cursor.close()
-            if conn:
-                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager for multi-statement writes: yields one dict cursor, commits once at the end
+        and rolls back everything on any error. Unlike execute_query, errors are re-raised.
+        """
+        try:
+            with self._cursor(dictionary=True) as (conn, cursor):
+                tracked = _TrackingCursor(cursor)
+                yield tracked
+        finally:
+            self._mark_write()
+        # Committed: drop cached reads of every table written in the transaction.
+        if tracked.written:
+            self.cache.invalidate(*tracked.written)
 
     def execute_query(self, query, params=None):
         """
         Execute INSERT/UPDATE/DELETE.
         Returns lastrowid for INSERT, or None on failure.
+        Cached reads of the tables the statement touches are invalidated.
         """
         try:
             with self._cursor(dictionary=True) as (conn, cursor):
                 cursor.execute(query, params or ())
-                return cursor.lastrowid
-        except mysql.connector.Error:
+                lastrowid = cursor.lastrowid
+        except mysql.connector.Error as e:
+            self._log_swallowed(e)
+            return None
+        finally:
+            # Invalidate even on failure: part of a multi-row write may have happened.
+            self.cache.invalidate(*written_tables(query))
+            self._mark_write()
+        return lastrowid
+
+    def fetch_one(self, query, params=None, row_factory='dict'):
+        """
+        Execute SELECT and return a single row or None if no rows / failure.
+        row_factory: 'dict' (default), 'tuple' or 'record' (see ROW_FACTORIES).
+        """
+        try:
+            with self._cursor(dictionary=(row_factory == 'dict'), read=True) as (conn, cursor):
+                cursor.execute(query, params or ())
+                row = cursor.fetchone()
+                if row is None or row_factory == 'dict':
+                    return row
+                return shape_rows(cursor.column_names, [row], row_factory)[0]
+        except mysql.connector.Error as e:
+            self._log_swallowed(e)
             return None
 
-    def fetch_one(self, query, params=None):
-        """Execute SELECT and return a single row (dict) or None if no rows / failure."""
+    def fetch_all(self, query, params=None, row_factory='dict'):
+        """
+        Execute SELECT and return all rows or None on failure.
+        row_factory picks the row shape (see ROW_FACTORIES): a list of dicts (default), tuples or
+        records, or one {column: values} dict for 'columns'.
+        """
         try:
-            with self._cursor(dictionary=True) as (conn, cursor):
+            with self._cursor(dictionary=(row_factory == 'dict'), read=True) as (conn, cursor):
                 cursor.execute(query, params or ())
-                return cursor.fetchone()
-        except mysql.connector.Error:
+                rows = cursor.fetchall()
+                if row_factory == 'dict':
+                    return rows
+                return shape_rows(cursor.column_names, rows, row_factory)
+        except mysql.connector.Error as e:
+            self._log_swallowed(e)
             return None
 
-    def fetch_all(self, query, params=None):
-        """Execute SELECT and return all rows (list of dicts) or None on failure."""
+    def _log_swallowed(self, error):
+        """Logs an error the None-returning helpers swallow (statement failures are already logged by record())."""
+        if not getattr(error, 'query_logged', False):
+            self.instrumentation.logger.warning("Database error: %s", error)
+
+    def fetch_iter(self, query, params=None, batch_size=None, row_factory='dict'):
+        """
+        Execute SELECT and iterate over its rows (dicts) without materializing the result:
+        for large or unbounded results (exports, long histories, streamed templates).
+
+        - Uses an unbuffered cursor: the server streams the result and rows are read
+          `batch_size` (default fetch_batch_size) at a time with fetchmany().
+        - The query runs on the first next(); the pooled connection is held until the rows are
+          exhausted or the stream is closed (RowStream.close / `with`). A stream closed early
+          still has unread rows on the wire, so its connection is discarded instead of reused.
+        - row_factory: 'dict' (default), 'tuple' or 'record' (see ROW_FACTORIES).
+        - Unlike fetch_all, errors are raised (a streamed response has usually started already).
+        """
+        if row_factory == 'columns':
+            raise ValueError("fetch_iter yields rows; use fetch_all(row_factory='columns')")
+        return RowStream(self._iter_rows(query, params, batch_size or self.fetch_batch_size, row_factory))
+
+    def _iter_rows(self, query, params, batch_size, row_factory):
+        pool, conn = self._acquire_read()
+        finished = False
+        db_seconds, row_count = 0.0, 0  # time spent in the database only, not in the consumer
+        try:
+            cursor = conn.cursor(dictionary=(row_factory == 'dict'), buffered=False)
+            started = time.perf_counter()
+            cursor.execute(query, params or ())
+            db_seconds += time.perf_counter() - started
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                db_seconds += time.perf_counter() - started
+                if not rows:
+                    break
+                row_count += len(rows)
+                if row_factory != 'dict':
+                    rows = shape_rows(cursor.column_names, rows, row_factory)
+                yield from rows
+            cursor.close()
+            conn.rollback()  # end the read snapshot
+            finished = True
+        finally:
+            pool.release(conn, discard=not finished)
+            self.instrumentation.record(query, params, db_seconds * 1000, row_count)
+
+    def register_statement(self, name, query):
+        """
+        Registers a hot SELECT under `name` for fetch_all_prepared / fetch_one_prepared.
+
+        Registered statements run as server-side prepared statements: each pooled connection prepares
+        a statement once (on first use) and keeps it in its own statement cache, so later calls
+        (including from later requests) only send the parameters instead of SQL text to parse.
+        """
+        self.statements[name] = query
+
+    def _prepared_cursor(self, conn, name, dictionary):
+        """Returns the connection's cached prepared cursor for a statement (created on first use)."""
+        with self._prepared_lock:
+            cache = self._prepared.get(conn)
+            # A connection that reconnected has a new id and none of its old statements.
+            if cache is None or cache['connection_id'] != conn.connection_id:
+                cache = {'connection_id': conn.connection_id, 'cursors': {}}
+                self._prepared[conn] = cache
+        key = (name, dictionary)
+        cursor = cache['cursors'].get(key)
+        if cursor is None:
+            cursor = conn.cursor(prepared=True, dictionary=dictionary)
+            cache['cursors'][key] = cursor
+            with self._prepared_lock:
+                self._prepared_stats['prepares'] += 1
+        return cursor
+
+    def _forget_prepared(self, conn, name, dictionary):
+        with self._prepared_lock:
+            cache = self._prepared.get(conn)
+            if cache:
+                cache['cursors'].pop((name, dictionary), None)
+
+    def _run_prepared(self, name, params, row_factory):
+        query = self.statements[name]  # always the same str object: the cursor skips re-preparing it
+        dictionary = row_factory == 'dict'
+        with self.connection(read=True) as conn:
+            for attempt in range(2):
+                cursor = self._prepared_cursor(conn, name, dictionary)
+                started = time.perf_counter()
+                try:
+                    cursor.execute(query, tuple(params or ()))
+                    rows = cursor.fetchall()
+                    self.instrumentation.record(query, params, (time.perf_counter() - started) * 1000, len(rows))
+                    break
+                except mysql.connector.Error as e:
+                    self.instrumentation.record(query, params, (time.perf_counter() - started) * 1000, 0, error=e)
+                    # Statement handle lost (e.g. server-side reconnect / statement limit): prepare again once.
+                    self._forget_prepared(conn, name, dictionary)
+                    if attempt or e.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+                        raise
+                    with self._prepared_lock:
+                        self._prepared_stats['reprepares'] += 1
+            conn.commit()
+            columns = cursor.column_names
+        with self._prepared_lock:
+            self._prepared_stats['executions'] += 1
+        if row_factory == 'dict':
+            return rows
+        return shape_rows(columns, rows, row_factory)
+
+    def fetch_all_prepared(self, name, params=None, row_factory='dict'):
+        """fetch_all() for a registered statement, run as a prepared statement. Returns None on failure."""
+        try:
+            return self._run_prepared(name, params, row_factory)
+        except mysql.connector.Error as e:
+            self._log_swallowed(e)
+            return None
+
+    def fetch_one_prepared(self, name, params=None, row_factory='dict'):
+        """fetch_one() for a registered statement, run as a prepared statement. Returns None if no rows / failure."""
+        rows = self.fetch_all_prepared(name, params, row_factory)
+        return rows[0] if rows else None
+
+    def prepared_stats(self):
+        """Prepared statement counters: statements prepared, executions, re-prepares after a lost handle."""
+        with self._prepared_lock:
+            snapshot = dict(self._prepared_stats)
+            snapshot['connections'] = len(self._prepared)
+        return snapshot
+
+    def _cached(self, fetch, query, params, tables, ttl):
+        # Rows read from a (possibly lagging) replica are cached apart from the primary's, so a session
+        # inside its read-your-writes window never gets a replica's copy.
+        key = (fetch.__name__, query, tuple(params or ()), self.reads_replica())
+        hit, rows = self.cache.get(key)
+        if not hit:
+            rows = fetch(query, params)
+            if rows is None:
+                return None  # failures are not cached
+            self.cache.set(key, rows, tables or tables_in(query), ttl)
+        # Callers get their own copies, so mutating a row never changes the cached entry.
+        if isinstance(rows, list):
+            return [dict(row) for row in rows]
+        return dict(rows) if rows else rows
+
+    def fetch_all_cached(self, query, params=None, tables=None, ttl=None):
+        """
+        fetch_all() through the query cache (opt-in, for hot reads that may be slightly stale).
+        `tables` are the invalidation tags (default: tables referenced by the query);
+        `ttl` seconds overrides the cache default.
+        """
+        return self._cached(self.fetch_all, query, params, tables, ttl)
+
+    def fetch_one_cached(self, query, params=None, tables=None, ttl=None):
+        """fetch_one() through the query cache (see fetch_all_cached)."""
+        return self._cached(self.fetch_one, query, params, tables, ttl)
+
+
+# Process metrics exposed on /metrics (pool / cache / scheduler values are sampled at scrape time).
+metrics = Metrics()
+metrics.histogram('flytau_http_request_duration_seconds',
+                  "HTTP request latency by endpoint (add_flight also by wizard step)")
+metrics.histogram('flytau_db_query_duration_seconds',
+                  "Statement latency by query fingerprint", Metrics.QUERY_BUCKETS)
+metrics.histogram('flytau_update_statuses_duration_seconds', "Duration of the full status sweep (update_statuses)")
+metrics.counter('flytau_flights_performed_total', "Flights moved to Performed by the status maintenance")
+metrics.counter('flytau_bookings_created_total', "Bookings created")
+metrics.counter('flytau_seats_reserved_total', "Seats reserved by created bookings")
+metrics.counter('flytau_cancellations_total',
+                "Cancellations (kind=booking: by the customer, flight: by a manager, "
+                "flight_booking: bookings cancelled with their flight)")
+
+# Global DB access object used across the app (one connection pool per process).
+db_manager = DBManager(
+    DB_CONFIG, DB_POOL_CONFIG, QUERY_CACHE_CONFIG, fetch_batch_size=DB_FETCH_BATCH,
+    instrumentation=QueryInstrumentation(app.logger, DB_SLOW_QUERY_MS, DB_N_PLUS_ONE_THRESHOLD, metrics=metrics),
+    replica_configs=DB_REPLICA_CONFIGS, replica_retry=DB_REPLICA_RETRY,
+)
+
+# Coalescing of identical concurrent flight list queries (index / search, see flight_list).
+flight_coalescer = SingleFlight(SINGLEFLIGHT_DIR or None, SINGLEFLIGHT_WAIT)
+if SINGLEFLIGHT_DIR and flight_coalescer.shared_dir is None:
+    app.logger.warning("SINGLEFLIGHT_DIR needs fcntl (not available here): coalescing within each process only")
+
+# Hot statements, run as server-side prepared statements (fetch_all_prepared / fetch_one_prepared).
+db_manager.register_statement('seat_map', """
+    SELECT * FROM Seat WHERE aircraft_id = %s ORDER BY class DESC, row_num, col_num
+""")
+db_manager.register_statement('reserved_seats', """
+    SELECT rs.row_num, rs.col_num
+    FROM Reserved_Seat rs
+    JOIN Booking b ON rs.booking_id = b.booking_id
+    WHERE b.flight_id = %s AND b.booking_status = 'Active'
+""")
+db_manager.register_statement('booking_details', """
+    SELECT b.*, f.departure_date, f.departure_time, f.departure_ts, r.origin, r.destination
+    FROM Booking b
+    JOIN Flight f ON b.flight_id = f.flight_id
+    JOIN Route r ON f.route_id = r.route_id
+    WHERE b.booking_id = %s
+""")
+db_manager.register_statement('guest_booking', """
+    SELECT b.*, f.departure_date, f.departure_time, r.origin, r.destination
+    FROM Booking b
+    JOIN Flight f ON b.flight_id = f.flight_id
+    JOIN Route r ON f.route_id = r.route_id
+    WHERE b.booking_id = %s
+      AND b.email = %s
+      AND b.booking_status = 'Active'
+""")
+db_manager.register_statement('booking_seats', """
+    SELECT rs.row_num, rs.col_num, s.class
+    FROM Reserved_Seat rs
+    JOIN Seat s
+      ON rs.aircraft_id = s.aircraft_id
+     AND rs.row_num = s.row_num
+     AND rs.col_num = s.col_num
+    WHERE rs.booking_id = %s
+    ORDER BY rs.row_num, rs.col_num
+""")
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def _split_sql(script):
+    """Splits a migration script into statements (drops `--` comment lines, splits on `;`)."""
+    lines = [line for line in script.splitlines() if not line.strip().startswith('--')]
+    return [stmt.strip() for stmt in '\n'.join(lines).split(';') if stmt.strip()]
+
+
+def apply_migrations():
+    """
+    Applies pending migrations/NNN_name.sql files in version order.
+    Applied versions are recorded in Schema_Migration, so running it again is a no-op.
+    Returns the list of applied file names.
+    """
+    with db_manager.transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Schema_Migration (
+                version int NOT NULL,
+                name varchar(255) NOT NULL,
+                applied_at datetime DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (version)
+            )
+        """)
+        cursor.execute("SELECT version FROM Schema_Migration")
+        applied = {row['version'] for row in cursor.fetchall()}
+
+    newly_applied = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.sql'):
+            continue
+        version = int(filename.split('_', 1)[0])
+        if version in applied:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            statements = _split_sql(f.read())
+        # Note: MySQL commits DDL implicitly, so a failing migration may be partially applied.
+        with db_manager.transaction() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO Schema_Migration (version, name) VALUES (%s, %s)",
+                (version, filename)
+            )
+        newly_applied.append(filename)
+    return newly_applied
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = apply_migrations()
+    for filename in applied:
+        click.echo(f"Applied {filename}")
+    if not applied:
+        click.echo("Database schema is up to date.")
+
+
+def create_flight_inventory(cursor, flight_id, aircraft_id):
+    """Creates the per-class seat inventory rows for a new flight (all seats free)."""
+    cursor.execute("""
+        INSERT INTO Flight_Inventory (flight_id, seat_class, total_seats, booked_seats)
+        SELECT %s, s.class, COUNT(*), 0
+        FROM Seat s
+        WHERE s.aircraft_id = %s
+        GROUP BY s.class
+    """, (flight_id, aircraft_id))
+
+
+def _seat_filter_sql(seats):
+    """`(row_num, col_num) IN ((%s, %s), ...)` for a list of (row_num, col_num), plus its params."""
+    placeholders = ','.join(['(%s, %s)'] * len(seats))
+    params = [value for seat in seats for value in seat]
+    return f"(row_num, col_num) IN ({placeholders})", params
+
+
+def adjust_flight_inventory(cursor, flight_id, seats_by_class, sign=1):
+    """Adds (sign=1) or releases (sign=-1) booked seats per class in Flight_Inventory."""
+    for seat_class, count in seats_by_class.items():
+        cursor.execute("""
+            UPDATE Flight_Inventory
+            SET booked_seats = booked_seats + %s
+            WHERE flight_id = %s AND seat_class = %s
+        """, (sign * count, flight_id, seat_class))
+
+
+def sync_flight_occupancy(cursor, flight_id):
+    """
+    Flips a single Active/Full flight between Active and Full based on its inventory row(s).
+    Runs inside the caller's transaction, right after the inventory changed.
+    """
+    cursor.execute("""
+        UPDATE Flight f
+        SET f.flight_status = CASE
+            WHEN (SELECT SUM(fi.total_seats - fi.booked_seats)
+                  FROM Flight_Inventory fi WHERE fi.flight_id = f.flight_id) <= 0 THEN 'Full'
+            ELSE 'Active'
+        END
+        WHERE f.flight_id = %s AND f.flight_status IN ('Active', 'Full')
+    """, (flight_id,))
+
+
+# available_seats column for flight listings: a primary-key lookup into Flight_Inventory.
+AVAILABLE_SEATS_SQL = """COALESCE((SELECT SUM(fi.total_seats - fi.booked_seats)
+                      FROM Flight_Inventory fi WHERE fi.flight_id = f.flight_id), 0)"""
+
+
+def encode_flight_cursor(flight):
+    """Keyset cursor for a flight row: 'YYYYMMDDTHHMMSS_<flight_id>' (its departure_ts and id)."""
+    return f"{flight['departure_ts']:%Y%m%dT%H%M%S}_{flight['flight_id']}"
+
+
+def decode_flight_cursor(cursor):
+    """Inverse of encode_flight_cursor(); returns (datetime, flight_id) or None if malformed."""
+    try:
+        departure_ts, flight_id = cursor.split('_')
+        return datetime.strptime(departure_ts, '%Y%m%dT%H%M%S'), int(flight_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def day_range(day):
+    """[start, end) datetimes of a calendar day (date or 'YYYY-MM-DD'), for range predicates on a
+    timestamp column; None if `day` is not a valid date."""
+    try:
+        start = datetime.combine(day if isinstance(day, date) else date.fromisoformat(day), datetime.min.time())
+    except (TypeError, ValueError):
+        return None
+    return start, start + timedelta(days=1)
+
+
+def page_size_arg(value):
+    """Rows per page from a request argument, clamped to 1..FLIGHT_PAGE_SIZE_MAX."""
+    try:
+        return max(1, min(int(value), FLIGHT_PAGE_SIZE_MAX))
+    except (TypeError, ValueError):
+        return FLIGHT_PAGE_SIZE
+
+
+def fetch_flight_page(conditions, params, after=None, page_size=None, descending=False, having=''):
+    """
+    One page of the flight list, using keyset pagination on (departure_ts, flight_id).
+
+    - conditions / params: extra WHERE clauses (AND-ed) and their parameters.
+    - after: cursor of the last row of the previous page (None = first page).
+    - having: optional HAVING clause on the selected columns (e.g. available_seats > 0).
+
+    Instead of OFFSET, each page continues strictly after the previous page's last row, so with
+    idx_flight_departure_ts / idx_flight_status_departure_ts every page costs the same as the first one.
+    Returns (flights, next_cursor); next_cursor is None on the last page.
+    """
+    page_size = page_size or FLIGHT_PAGE_SIZE
+    conditions = list(conditions)
+    params = list(params)
+    op = '<' if descending else '>'
+    direction = 'DESC' if descending else 'ASC'
+
+    key = decode_flight_cursor(after) if after else None
+    if key:
+        departure_ts, flight_id = key
+        # Expanded row comparison; the leading bound on departure_ts keeps it an index range scan.
+        conditions.append(f"""f.departure_ts {op}= %s AND (
+            f.departure_ts {op} %s OR (f.departure_ts = %s AND f.flight_id {op} %s))""")
+        params += [departure_ts, departure_ts, departure_ts, flight_id]
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    having = f"HAVING {having}" if having else ''
+    # One extra row tells whether there is a next page.
+    flights = db_manager.fetch_all(f"""
+        SELECT f.*, r.origin, r.destination, r.duration,
+        {AVAILABLE_SEATS_SQL} as available_seats
+        FROM Flight f
+        JOIN Route r ON f.route_id = r.route_id
+        {where}
+        {having}
+        ORDER BY f.departure_ts {direction}, f.flight_id {direction}
+        LIMIT %s
+    """, tuple(params) + (page_size + 1,), row_factory='record') or []
+
+    if len(flights) > page_size:
+        flights = flights[:page_size]
+        return flights, encode_flight_cursor(flights[-1])
+    return flights, None
+
+
+def estimate_flight_count(conditions, params):
+    """
+    Approximate number of flights matching `conditions`, from the optimizer's row estimates (EXPLAIN),
+    so showing a total never costs a COUNT(*) over the whole history. HAVING filters are not included.
+    """
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    plan = db_manager.fetch_all(f"""
+        EXPLAIN SELECT f.flight_id
+        FROM Flight f
+        JOIN Route r ON f.route_id = r.route_id
+        {where}
+    """, tuple(params)) or []
+    estimate = 1.0
+    for step in plan:
+        estimate *= float(step.get('rows') or 0) * float(step.get('filtered') or 100) / 100
+    return int(round(estimate)) if plan else None
+
+
+def flight_list(conditions, params, after=None, page_size=None, descending=False, having=''):
+    """
+    One page of the flight list plus its total estimate (fetch_flight_page + estimate_flight_count),
+    coalesced through SingleFlight: identical lists requested at the same moment (e.g. everyone opening the
+    same promotion search) share one execution. Returns (flights, next_cursor, total_estimate).
+    The flights may be shared with concurrent requests: read them, do not modify them.
+    """
+    def load():
+        flights, next_cursor = fetch_flight_page(conditions, params, after, page_size, descending, having)
+        return flights, next_cursor, estimate_flight_count(conditions, params)
+
+    if not SINGLEFLIGHT_ENABLED:
+        return load()
+    # Replica and primary reads are not shared (read-your-writes, see DBManager.use_replicas).
+    key = ('flight_list', tuple(conditions), tuple(params), after, page_size, descending, having,
+           db_manager.reads_replica())
+    return flight_coalescer.do(key, load)
+
+
+def reconcile_inventory(fix=False):
+    """
+    Compares Flight_Inventory with the counts derived from Seat / Reserved_Seat.
+    Returns the list of mismatching (flight_id, seat_class) rows; with fix=True they are repaired.
+    """
+    expected_query = """
+        SELECT t.flight_id, t.seat_class, t.total_seats, COALESCE(b.booked_seats, 0) AS booked_seats
+        FROM (
+            SELECT f.flight_id, s.class AS seat_class, COUNT(*) AS total_seats
+            FROM Flight f
+            JOIN Seat s ON s.aircraft_id = f.aircraft_id
+            GROUP BY f.flight_id, s.class
+        ) t
+        LEFT JOIN (
+            SELECT b.flight_id, s.class AS seat_class, COUNT(*) AS booked_seats
+            FROM Reserved_Seat rs
+            JOIN Booking b ON rs.booking_id = b.booking_id
+            JOIN Seat s ON s.aircraft_id = rs.aircraft_id
+                       AND s.row_num = rs.row_num
+                       AND s.col_num = rs.col_num
+            GROUP BY b.flight_id, s.class
+        ) b ON b.flight_id = t.flight_id AND b.seat_class = t.seat_class
+    """
+    expected = db_manager.fetch_all(expected_query) or []
+    actual = {
+        (row['flight_id'], row['seat_class']): row
+        for row in db_manager.fetch_all("SELECT * FROM Flight_Inventory") or []
+    }
+
+    mismatches = []
+    for row in expected:
+        current = actual.get((row['flight_id'], row['seat_class']))
+        if (not current
+                or current['total_seats'] != row['total_seats']
+                or current['booked_seats'] != row['booked_seats']):
+            mismatches.append({
+                'flight_id': row['flight_id'],
+                'seat_class': row['seat_class'],
+                'expected_total': row['total_seats'],
+                'expected_booked': row['booked_seats'],
+                'actual_total': current['total_seats'] if current else None,
+                'actual_booked': current['booked_seats'] if current else None,
+            })
+
+    if fix and mismatches:
+        with db_manager.transaction() as cursor:
+            cursor.executemany("""
+                INSERT INTO Flight_Inventory (flight_id, seat_class, total_seats, booked_seats)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE total_seats = VALUES(total_seats),
+                                        booked_seats = VALUES(booked_seats)
+            """, [(m['flight_id'], m['seat_class'], m['expected_total'], m['expected_booked'])
+                  for m in mismatches])
+            for flight_id in {m['flight_id'] for m in mismatches}:
+                sync_flight_occupancy(cursor, flight_id)
+    return mismatches
+
+
+@app.cli.command('inventory-reconcile')
+@click.option('--verify', is_flag=True, help="Only report mismatches, do not repair them.")
+def inventory_reconcile_command(verify):
+    """Verify (and by default repair) Flight_Inventory against Seat / Reserved_Seat."""
+    mismatches = reconcile_inventory(fix=not verify)
+    for m in mismatches:
+        click.echo(
+            f"flight {m['flight_id']} {m['seat_class']}: "
+            f"total {m['actual_total']} -> {m['expected_total']}, "
+            f"booked {m['actual_booked']} -> {m['expected_booked']}"
+        )
+    if not mismatches:
+        click.echo("Flight inventory is consistent.")
+    elif verify:
+        raise SystemExit(1)
+    else:
+        click.echo(f"Repaired {len(mismatches)} inventory row(s).")
+
+
+class SeatHoldStats:
+    """In-process counters for the seat-hold subsystem (acquisition latency, hold -> booking conversion)."""
+
+    def __init__(self, samples=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=samples)  # recent acquisition latencies (seconds)
+        self.acquired = 0
+        self.conflicts = 0
+        self.converted = 0
+        self.reaped = 0
+
+    def record_acquire(self, seconds, ok):
+        with self._lock:
+            self._latencies.append(seconds)
+            if ok:
+                self.acquired += 1
+            else:
+                self.conflicts += 1
+
+    def record_conversion(self):
+        with self._lock:
+            self.converted += 1
+
+    def record_reaped(self, count):
+        with self._lock:
+            self.reaped += count
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            acquired, conflicts, converted, reaped = self.acquired, self.conflicts, self.converted, self.reaped
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3) if latencies else None
+
+        return {
+            'holds_acquired': acquired,
+            'hold_conflicts': conflicts,
+            'holds_converted': converted,
+            'holds_reaped': reaped,
+            'conversion_rate': round(converted / acquired, 4) if acquired else None,
+            'acquire_latency_ms_p50': pct(0.50),
+            'acquire_latency_ms_p95': pct(0.95),
+            'acquire_latency_ms_max': round(latencies[-1] * 1000, 3) if latencies else None,
+        }
+
+
+seat_hold_stats = SeatHoldStats()
+
+
+def acquire_seat_holds(flight_id, seats, hold_token, ttl=None):
+    """
+    Holds the given seats of a flight for `ttl` seconds (SEAT_HOLD_TTL by default).
+
+    All-or-nothing, in one transaction: the token's previous holds are released, expired holds on
+    the requested seats are dropped, and the new holds are inserted. The primary key
+    (flight_id, row_num, col_num) makes a seat holdable by one token at a time.
+    Returns True on success, False if any seat is reserved or held by someone else.
+    """
+    ttl = SEAT_HOLD_TTL if ttl is None else ttl
+    started = time.perf_counter()
+    seat_filter, seat_params = _seat_filter_sql(seats)
+    ok = False
+    try:
+        with db_manager.transaction() as cursor:
+            cursor.execute("DELETE FROM Seat_Hold WHERE hold_token = %s", (hold_token,))
+            cursor.execute(f"""
+                DELETE FROM Seat_Hold
+                WHERE flight_id = %s AND {seat_filter} AND expires_at < NOW()
+            """, (flight_id, *seat_params))
+            cursor.execute(f"""
+                SELECT 1 FROM Reserved_Seat
+                WHERE flight_id = %s AND {seat_filter}
+                LIMIT 1
+            """, (flight_id, *seat_params))
+            if cursor.fetchone():
+                raise SeatConflictError("Seat already reserved")
+            cursor.executemany("""
+                INSERT INTO Seat_Hold (flight_id, row_num, col_num, hold_token, expires_at)
+                VALUES (%s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+            """, [(flight_id, r, c, hold_token, ttl) for r, c in seats])
+        ok = True
+    except SeatConflictError:
+        pass
+    except mysql.connector.IntegrityError as e:
+        if e.errno != errorcode.ER_DUP_ENTRY:
+            raise
+    finally:
+        seat_hold_stats.record_acquire(time.perf_counter() - started, ok)
+    return ok
+
+
+def release_seat_holds(hold_token):
+    """Drops every hold of a token (e.g. the user went back to seat selection)."""
+    db_manager.execute_query("DELETE FROM Seat_Hold WHERE hold_token = %s", (hold_token,))
+
+
+def held_seats(flight_id, exclude_token=None):
+    """Seats of a flight currently held by other users, as a set of (row_num, col_num)."""
+    rows = db_manager.fetch_all("""
+        SELECT row_num, col_num FROM Seat_Hold
+        WHERE flight_id = %s AND expires_at >= NOW() AND hold_token <> %s
+    """, (flight_id, exclude_token or '')) or []
+    return {(r['row_num'], r['col_num']) for r in rows}
+
+
+def reap_expired_holds(batch_size=5000):
+    """Deletes expired holds in bulk (batches keep each DELETE short). Returns how many were removed."""
+    total = 0
+    while True:
+        with db_manager.transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM Seat_Hold WHERE expires_at < NOW() LIMIT %s",
+                (batch_size,)
+            )
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < batch_size:
+            break
+    seat_hold_stats.record_reaped(total)
+    return total
+
+
+def record_seat_sales(cursor, booking_id, flight, seats, seat_prices=None):
+    """
+    Appends one 'sale' row per booked seat to Revenue_Ledger (the append-only revenue ledger).
+
+    - seat_prices: optional {(row_num, col_num): price paid}; seats not in it are priced
+      from the flight by their class.
+    Returns {seat_class: count} for the seats, for the flight inventory.
+    """
+    seat_filter, seat_params = _seat_filter_sql(seats)
+    cursor.execute(f"""
+        SELECT s.row_num, s.col_num, s.class, a.size, a.manufacturer
+        FROM Seat s
+        JOIN Aircraft a ON a.aircraft_id = s.aircraft_id
+        WHERE s.aircraft_id = %s AND {seat_filter}
+    """, (flight['aircraft_id'], *seat_params))
+
+    entries = []
+    seats_by_class = {}
+    for seat in cursor.fetchall():
+        key = (seat['row_num'], seat['col_num'])
+        if seat_prices and key in seat_prices:
+            price = seat_prices[key]
+        else:
+            price = flight['price_business'] if seat['class'] == 'Business' else flight['price_economy']
+        entries.append((booking_id, flight['flight_id'], flight['departure_date'], seat['size'],
+                        seat['manufacturer'], seat['class'], seat['row_num'], seat['col_num'], price or 0))
+        seats_by_class[seat['class']] = seats_by_class.get(seat['class'], 0) + 1
+
+    cursor.executemany("""
+        INSERT INTO Revenue_Ledger (booking_id, flight_id, departure_date, aircraft_size, manufacturer,
+                                    seat_class, row_num, col_num, entry_type, amount)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'sale', %s)
+    """, entries)
+    return seats_by_class
+
+
+def record_refunds(cursor, condition, params, retained_share=0):
+    """
+    Appends a reversing 'refund' row for every sale of the bookings matching `condition`
+    (a WHERE clause on Booking b); `retained_share` of each seat's price is kept (the cancellation fee).
+    Call it before the status UPDATE with the same condition; cancelled bookings are not refunded twice.
+    """
+    cursor.execute(f"""
+        INSERT INTO Revenue_Ledger (booking_id, flight_id, departure_date, aircraft_size, manufacturer,
+                                    seat_class, row_num, col_num, entry_type, amount)
+        SELECT l.booking_id, l.flight_id, l.departure_date, l.aircraft_size, l.manufacturer,
+               l.seat_class, l.row_num, l.col_num, 'refund', -ROUND(l.amount * (1 - %s), 2)
+        FROM Revenue_Ledger l
+        JOIN Booking b ON b.booking_id = l.booking_id
+        WHERE l.entry_type = 'sale'
+          AND ({condition})
+          AND b.booking_status NOT LIKE 'Cancel%'
+    """, (retained_share, *params))
+
+
+def revenue_by_aircraft_class(date_from=None, date_to=None):
+    """
+    Revenue (sales minus refunds) by aircraft size, manufacturer and seat class for flights departing
+    in [date_from, date_to] (both optional). Reads only idx_revenue_ledger_report (covering index).
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append("departure_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("departure_date <= %s")
+        params.append(date_to)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return db_manager.fetch_all(f"""
+        SELECT aircraft_size AS Size, manufacturer AS Manufacturer, seat_class AS Class,
+               COALESCE(SUM(amount), 0) AS Total_Revenue
+        FROM Revenue_Ledger
+        {where}
+        GROUP BY aircraft_size, manufacturer, seat_class
+        ORDER BY Total_Revenue DESC
+    """, tuple(params), row_factory='record')
+
+
+class SeatConflictError(Exception):
+    """Raised by create_booking when a seat was taken concurrently (or the flight is no longer bookable)."""
+
+
+def generate_booking_id():
+    """Human-friendly booking identifier (8 uppercase letters / digits)."""
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+def create_booking(flight, email, seats, total_price, first_name='', last_name='', phones=(),
+                   create_customer=False, hold_token=None, seat_prices=None):
+    """
+    Writes a complete booking in ONE transaction and returns its booking_id:
+    (guest) Customer + phones, Booking, all Reserved_Seat rows (one executemany batch),
+    the seats' Revenue_Ledger sales (priced from `seat_prices`, see record_seat_sales)
+    and the flight's seat inventory / Active-Full status.
+
+    `seats` is a list of (row_num, col_num). The flight row is locked first, so bookings for the
+    same flight are serialized; the unique key (flight_id, row_num, col_num) on Reserved_Seat
+    guarantees a seat is never sold twice. A losing racer gets SeatConflictError and nothing is written.
+
+    Seats held by someone else (Seat_Hold, see acquire_seat_holds) are a conflict as well; the caller's
+    own holds (`hold_token`) are converted into the reservation in the same transaction.
+    """
+    flight_id = flight['flight_id']
+    for _ in range(3):
+        booking_id = generate_booking_id()
+        try:
+            with db_manager.transaction() as cursor:
+                cursor.execute(
+                    "SELECT flight_status FROM Flight WHERE flight_id = %s FOR UPDATE",
+                    (flight_id,)
+                )
+                row = cursor.fetchone()
+                if not row or row['flight_status'] != 'Active':
+                    raise SeatConflictError(f"Flight {flight_id} is not open for booking")
+
+                # Seats still held by another user cannot be booked.
+                seat_filter, seat_params = _seat_filter_sql(seats)
+                cursor.execute(f"""
+                    SELECT 1 FROM Seat_Hold
+                    WHERE flight_id = %s AND {seat_filter}
+                      AND expires_at >= NOW()
+                      AND hold_token <> %s
+                    LIMIT 1
+                """, (flight_id, *seat_params, hold_token or ''))
+                if cursor.fetchone():
+                    raise SeatConflictError("Seat is held by another user")
+
+                if create_customer:
+                    # Ensure Customer exists for the guest (base customer record), store phones.
+                    cursor.execute(
+                        "INSERT IGNORE INTO Customer (email, first_name, last_name) VALUES (%s, %s, %s)",
+                        (email, first_name, last_name)
+                    )
+                    if phones:
+                        cursor.executemany(
+                            "INSERT IGNORE INTO Customer_Phone (email, phone_num) VALUES (%s, %s)",
+                            [(email, p) for p in phones]
+                        )
+
+                # Create the booking (starts as Active).
+                cursor.execute("""
+                    INSERT INTO Booking (booking_id, email, flight_id, total_price, booking_status)
+                    VALUES (%s, %s, %s, %s, 'Active')
+                """, (booking_id, email, flight_id, total_price))
+
+                # Reserve all selected seats in a single batch.
+                cursor.executemany("""
+                    INSERT INTO Reserved_Seat (booking_id, flight_id, aircraft_id, row_num, col_num)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, [(booking_id, flight_id, flight['aircraft_id'], r, c) for r, c in seats])
+
+                # Record the sale per seat; count the seats in the inventory and flip the flight to Full
+                # if these were the last ones.
+                seats_by_class = record_seat_sales(cursor, booking_id, flight, seats, seat_prices)
+                adjust_flight_inventory(cursor, flight_id, seats_by_class)
+                sync_flight_occupancy(cursor, flight_id)
+
+                # The holds became a reservation.
+                if hold_token:
+                    cursor.execute("DELETE FROM Seat_Hold WHERE hold_token = %s", (hold_token,))
+
+                record_booking_created(cursor)
+            if hold_token:
+                seat_hold_stats.record_conversion()
+            metrics.inc('flytau_bookings_created_total')
+            metrics.inc('flytau_seats_reserved_total', len(seats))
+            return booking_id
+        except mysql.connector.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+            if 'reserved_seat' in str(e).lower():
+                raise SeatConflictError("Seat already reserved") from e
+            # Booking id collision -> retry with a fresh id.
+    raise SeatConflictError("Could not allocate a booking id")
+
+
+
+class _Schedule:
+    """
+    Sorted, non-cancelled flight intervals of ONE resource.
+    starts/ends/flights/destinations are parallel lists ordered by departure;
+    max_ends[i] = max(ends[0..i]), which lets is_free() answer with one bisect;
+    tail = (destination, arrival, flight_id) of the latest-arriving flight.
+    """
+
+    __slots__ = ('starts', 'ends', 'max_ends', 'flights', 'destinations', 'tail')
+
+    def __init__(self, rows=()):
+        rows = sorted(rows)  # (start, end, flight_id, destination)
+        self.starts = [r[0] for r in rows]
+        self.ends = [r[1] for r in rows]
+        self.flights = [r[2] for r in rows]
+        self.destinations = [r[3] for r in rows]
+        self.max_ends = []
+        self._recompute_from(0)
+        self._recompute_tail()
+
+    def _recompute_from(self, i):
+        del self.max_ends[i:]
+        running = self.max_ends[i - 1] if i > 0 else None
+        for end in self.ends[i:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def _recompute_tail(self):
+        # Chain tail = latest-arriving flight.
+        self.tail = None
+        if self.ends:
+            k = max(range(len(self.ends)), key=self.ends.__getitem__)
+            self.tail = (self.destinations[k], self.ends[k], self.flights[k])
+
+    def insert(self, start, end, flight_id, destination):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.flights.insert(i, flight_id)
+        self.destinations.insert(i, destination)
+        self._recompute_from(i)
+        if self.tail is None or end > self.tail[1]:
+            self.tail = (destination, end, flight_id)
+
+    def remove(self, flight_id):
+        if flight_id not in self.flights:
+            return
+        i = self.flights.index(flight_id)
+        for column in (self.starts, self.ends, self.flights, self.destinations):
+            del column[i]
+        self._recompute_from(i)
+        if self.tail and self.tail[2] == flight_id:
+            self._recompute_tail()
+
+    def is_free(self, start, end):
+        """True if no interval overlaps [start, end)."""
+        i = bisect.bisect_left(self.starts, end)  # intervals [0, i) start before `end`
+        return i == 0 or self.max_ends[i - 1] <= start
+
+
+class ResourceTimeline:
+    """
+    Process-local index of every aircraft / pilot / attendant schedule, built from Flight,
+    Pilots_on_Flights and Flight_Attendant_on_Flights (non-cancelled flights only).
+
+    - is_free(kind, id, start, end): no overlapping flight, O(log n) per resource.
+    - tail(kind, id): (destination, arrival) of the latest-arriving flight (append-only chain end).
+    - add_flight / remove_flight keep it current for flights created / cancelled in this process.
+    - reserve() holds resources for a flight that is not committed yet under a negative provisional id,
+      unique in the process (so concurrent schedules never share one); reservations survive rebuild()
+      until they are removed with remove_flight().
+    - refresh() re-reads the flights created or cancelled by other workers: every Flight row whose
+      updated_at is at or after the server time of the previous read minus `refresh_overlap` seconds
+      (commit order is not flight_id order, and updated_at is set when the row is written, not when its
+      transaction commits). Everything is rebuilt after `max_age` seconds.
+    The index only proposes resources; flight creation re-checks them against the database inside its
+    transaction (see add_flight and schedule_recurring), so a transaction that commits more than
+    `refresh_overlap` seconds after writing its flight can make a proposal fail, never double-book.
+    """
+
+    KINDS = ('aircraft', 'pilot', 'attendant')
+
+    def __init__(self, db, max_age=300, min_refresh_interval=1.0, refresh_overlap=60):
+        self.db = db
+        self.max_age = max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.refresh_overlap = timedelta(seconds=refresh_overlap)
+        self._lock = threading.RLock()
+        self._schedules = {kind: {} for kind in self.KINDS}
+        self._flights = {}  # flight_id -> [(kind, entity_id), ...]
+        self._provisional = {}  # provisional id (< 0) -> (entities, start, end, destination)
+        self._provisional_ids = itertools.count(1)
+        self._changed_since = None  # server time of the last read (refresh marker)
+        self._built_at = None
+        self._refreshed_at = 0
+        self.last_build_seconds = None
+
+    def _load(self, changed_since=None):
+        """
+        Reads flights and their crews (plain tuples): every non-cancelled flight, or with `changed_since`
+        every flight whose row was written since then (cancelled ones included, so they can be dropped).
+        Also returns the server time at the start of the read, the marker for the next refresh.
+        """
+        if changed_since is None:
+            where, params = "f.flight_status != 'Cancelled'", ()
+        else:
+            where, params = "f.updated_at >= %s", (changed_since,)
+        with self.db._cursor(dictionary=False) as (conn, cursor):
+            cursor.execute("SELECT NOW(6)")
+            marker = cursor.fetchone()[0]
+            cursor.execute(f"""
+                SELECT f.flight_id, f.aircraft_id, f.departure_ts, f.arrival_datetime, r.destination,
+                       f.flight_status = 'Cancelled'
+                FROM Flight f
+                JOIN Route r ON f.route_id = r.route_id
+                WHERE {where}
+            """, params)
+            flights = {row[0]: row[1:] for row in cursor.fetchall()}
+            crews = []
+            for kind, table in (('pilot', 'Pilots_on_Flights'), ('attendant', 'Flight_Attendant_on_Flights')):
+                if changed_since is None:
+                    cursor.execute(f"SELECT flight_id, employee_id FROM {table}")
+                else:
+                    cursor.execute(f"""
+                        SELECT c.flight_id, c.employee_id
+                        FROM {table} c
+                        JOIN Flight f ON c.flight_id = f.flight_id
+                        WHERE {where}
+                    """, params)
+                crews.append((kind, cursor.fetchall()))
+
+        assignments = {}  # flight_id -> [(kind, entity_id)]
+        for flight_id, (aircraft_id, _, _, _, _) in flights.items():
+            assignments[flight_id] = [('aircraft', str(aircraft_id))]
+        for kind, rows in crews:
+            for flight_id, employee_id in rows:
+                if flight_id in assignments:
+                    assignments[flight_id].append((kind, str(employee_id)))
+        return flights, assignments, marker
+
+    def rebuild(self):
+        """Full rebuild from the database (also used after a restart)."""
+        started = time.perf_counter()
+        flights, assignments, marker = self._load()
+        rows = {kind: {} for kind in self.KINDS}
+        for flight_id, entities in assignments.items():
+            _, start, end, destination, _ = flights[flight_id]
+            for kind, entity_id in entities:
+                rows[kind].setdefault(entity_id, []).append((start, end, flight_id, destination))
+        with self._lock:
+            # Reservations of schedules still in progress are not in the database yet: keep them.
+            for temp_id, (entities, start, end, destination) in self._provisional.items():
+                assignments[temp_id] = entities
+                for kind, entity_id in entities:
+                    rows[kind].setdefault(entity_id, []).append((start, end, temp_id, destination))
+            self._schedules = {kind: {eid: _Schedule(r) for eid, r in rows[kind].items()} for kind in self.KINDS}
+            self._flights = assignments
+            self._changed_since = marker
+            self._built_at = self._refreshed_at = time.monotonic()
+            self.last_build_seconds = time.perf_counter() - started
+
+    def refresh(self):
+        """Brings the index up to date (cheap updated_at range read most of the time)."""
+        now = time.monotonic()
+        if self._built_at is None or now - self._built_at > self.max_age:
+            self.rebuild()
+            return
+        if now - self._refreshed_at < self.min_refresh_interval:
+            return
+        flights, assignments, marker = self._load(self._changed_since - self.refresh_overlap)
+        with self._lock:
+            for flight_id, entities in assignments.items():
+                _, start, end, destination, cancelled = flights[flight_id]
+                # Changed rows replace what is loaded (flights re-read inside the overlap are unchanged).
+                self._remove(flight_id)
+                if not cancelled:
+                    self._add(flight_id, entities, start, end, destination)
+            self._changed_since = max(self._changed_since, marker)
+            self._refreshed_at = now
+
+    def _add(self, flight_id, entities, start, end, destination):
+        self._flights[flight_id] = entities
+        for kind, entity_id in entities:
+            self._schedules[kind].setdefault(entity_id, _Schedule()).insert(start, end, flight_id, destination)
+
+    def _remove(self, flight_id):
+        for kind, entity_id in self._flights.pop(flight_id, []):
+            schedule = self._schedules[kind].get(entity_id)
+            if schedule:
+                schedule.remove(flight_id)
+
+    @staticmethod
+    def _entities(aircraft_id, pilot_ids, attendant_ids):
+        return ([('aircraft', str(aircraft_id))]
+                + [('pilot', str(p)) for p in pilot_ids]
+                + [('attendant', str(a)) for a in attendant_ids])
+
+    def add_flight(self, flight_id, aircraft_id, pilot_ids, attendant_ids, start, end, destination):
+        """Registers a flight created in this process (call after the transaction committed)."""
+        entities = self._entities(aircraft_id, pilot_ids, attendant_ids)
+        with self._lock:
+            if self._built_at is not None and flight_id not in self._flights:
+                self._add(flight_id, entities, start, end, destination)
+
+    def reserve(self, aircraft_id, pilot_ids, attendant_ids, start, end, destination):
+        """Holds the resources of a planned, uncommitted flight; returns its provisional id (remove_flight frees it)."""
+        entities = self._entities(aircraft_id, pilot_ids, attendant_ids)
+        with self._lock:
+            temp_id = -next(self._provisional_ids)
+            self._provisional[temp_id] = (entities, start, end, destination)
+            self._add(temp_id, entities, start, end, destination)
+        return temp_id
+
+    def remove_flight(self, flight_id):
+        """Drops a cancelled flight (or a provisional reservation) from every resource schedule."""
+        with self._lock:
+            self._provisional.pop(flight_id, None)
+            self._remove(flight_id)
+
+    def is_free(self, kind, entity_id, start, end):
+        with self._lock:
+            schedule = self._schedules[kind].get(str(entity_id))
+            return schedule is None or schedule.is_free(start, end)
+
+    def tail(self, kind, entity_id):
+        with self._lock:
+            schedule = self._schedules[kind].get(str(entity_id))
+            return schedule.tail[:2] if schedule and schedule.tail else None
+
+    def can_take(self, kind, entity_id, origin, start, end):
+        """Free during [start, end) AND the append-only chain ends at `origin` by `start` (TLV if empty)."""
+        if not self.is_free(kind, entity_id, start, end):
+            return False
+        tail = self.tail(kind, entity_id)
+        if not tail:
+            return origin == 'TLV'
+        destination, arrival = tail
+        return origin == destination and start >= arrival
+
+    def stats(self):
+        with self._lock:
+            return {
+                'flights': len(self._flights),
+                'resources': {kind: len(self._schedules[kind]) for kind in self.KINDS},
+                'last_build_seconds': self.last_build_seconds,
+                'age_seconds': (time.monotonic() - self._built_at) if self._built_at else None,
+            }
+
+
+resource_timeline = ResourceTimeline(db_manager, max_age=RESOURCE_TIMELINE_MAX_AGE)
+
+
+# Where each schedulable entity type lives and how its assignments join to Flight.
+RESOURCE_SOURCES = {
+    'aircraft': {
+        'table': 'Aircraft',
+        'key': 'aircraft_id',
+        'assignments': "SELECT f.aircraft_id AS entity_id, f.* FROM Flight f",
+    },
+    'pilot': {
+        'table': 'Pilot',
+        'key': 'employee_id',
+        'assignments': "SELECT pf.employee_id AS entity_id, f.* FROM Pilots_on_Flights pf "
+                       "JOIN Flight f ON pf.flight_id = f.flight_id",
+    },
+    'attendant': {
+        'table': 'Flight_Attendant',
+        'key': 'employee_id',
+        'assignments': "SELECT af.employee_id AS entity_id, f.* FROM Flight_Attendant_on_Flights af "
+                       "JOIN Flight f ON af.flight_id = f.flight_id",
+    },
+}
+
+
+def _eligible_entities(entity_type, origin, start_dt, end_dt, extra_filter="", ids=None, cursor=None):
+    """
+    One set-based query returning every entity of `entity_type` that can take a flight
+    departing `origin` during [start_dt, end_dt):
+    - no overlapping non-cancelled flight, and
+    - chain tail (latest-arriving non-cancelled flight) ends at `origin` no later than start_dt,
+      or no flights at all and origin is TLV (same rules as ResourceTimeline.can_take).
+    `extra_filter` is an SQL condition on alias `e` (size / qualification); `ids` limits the check to
+    the given entities, and `cursor` runs it inside the caller's transaction.
+    """
+    source = RESOURCE_SOURCES[entity_type]
+    id_params = tuple(ids or ())
+    if ids is not None:
+        extra_filter += f" AND e.{source['key']} IN ({','.join(['%s'] * len(id_params)) or 'NULL'})"
+    # Chain tail: per entity, its latest arrival (backward range on arrival_datetime, e.g. idx_flight_aircraft_arrival).
+    # Overlap: plain range predicates on the stored departure_ts / arrival_datetime.
+    query = f"""
+        SELECT e.*
+        FROM {source['table']} e
+        LEFT JOIN LATERAL (
+            SELECT r.destination, f.arrival_datetime AS arrival_dt
+            FROM ({source['assignments']}) f
+            JOIN Route r ON f.route_id = r.route_id
+            WHERE f.entity_id = e.{source['key']}
+              AND f.flight_status != 'Cancelled'
+            ORDER BY f.arrival_datetime DESC
+            LIMIT 1
+        ) tail ON TRUE
+        WHERE 1=1
+          {extra_filter}
+          AND NOT EXISTS (
+              SELECT 1
+              FROM ({source['assignments']}) f
+              WHERE f.entity_id = e.{source['key']}
+                AND f.flight_status != 'Cancelled'
+                AND f.arrival_datetime > %s
+                AND f.departure_ts < %s
+          )
+          AND (
+              (tail.destination IS NULL AND %s = 'TLV')
+              OR (tail.destination = %s AND tail.arrival_dt <= %s)
+          )
+    """
+    params = (*id_params, start_dt, end_dt, origin, origin, start_dt)
+    if cursor is not None:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    return db_manager.fetch_all(query, params) or []
+
+
+def find_available_resources(route, start_dt, kinds=('aircraft', 'pilots', 'attendants')):
+    """
+    Availability engine for add_flight: eligible aircraft, pilots and attendants for a route
+    departing at start_dt, in a constant number of queries (one per requested resource kind).
+
+    Rules (same as the per-entity checks):
+    - Long flight (> 360 minutes): only Big aircraft and only qualified crew.
+    - No time overlap with the entity's non-cancelled flights.
+    - Append-only location continuity: an entity is only scheduled at the end of its chain, departing
+      from the destination of its latest non-cancelled flight after that flight arrives (TLV if it has none).
+    Overlap and continuity are answered by the ResourceTimeline index, or by one set-based
+    SQL query per kind (_eligible_entities) when RESOURCE_TIMELINE=0.
+    Returns {kind: [rows]} for the requested kinds.
+    """
+    duration_minutes = int(route['duration'])
+    is_long_flight = duration_minutes > 360
+    end_dt = start_dt + timedelta(minutes=duration_minutes)
+    origin = route['origin']
+
+    size_filter = "AND e.size = 'Big'" if is_long_flight else ""
+    qual_filter = "AND e.is_qualified = 1" if is_long_flight else ""
+    lookups = {
+        'aircraft': ('aircraft', size_filter),
+        'pilots': ('pilot', qual_filter),
+        'attendants': ('attendant', qual_filter),
+    }
+    if not RESOURCE_TIMELINE_ENABLED:
+        return {
+            kind: _eligible_entities(lookups[kind][0], origin, start_dt, end_dt, lookups[kind][1])
+            for kind in kinds
+        }
+
+    # Timeline path: one candidate query per kind (size / qualification),
+    # overlap + chain tail answered by the in-memory ResourceTimeline.
+    resource_timeline.refresh()
+    result = {}
+    for kind in kinds:
+        entity_type, extra_filter = lookups[kind]
+        source = RESOURCE_SOURCES[entity_type]
+        candidates = db_manager.fetch_all(
+            f"SELECT e.* FROM {source['table']} e WHERE 1=1 {extra_filter}"
+        ) or []
+        result[kind] = [
+            c for c in candidates
+            if resource_timeline.can_take(entity_type, c[source['key']], origin, start_dt, end_dt)
+        ]
+    return result
+
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+MAX_OCCURRENCES = 5000
+
+
+def parse_recurrence(rule, start_date):
+    """
+    Expands a recurrence rule (iCalendar RRULE subset) into a list of dates starting at start_date.
+
+    Supported parts: FREQ=DAILY|WEEKLY, INTERVAL=n, BYDAY=MO,TU,... (weekly), COUNT=n, UNTIL=YYYYMMDD.
+    COUNT or UNTIL is required. Example: "FREQ=DAILY;UNTIL=20260831" or "FREQ=WEEKLY;BYDAY=MO,TH;COUNT=40".
+    Raises ValueError on an invalid rule.
+    """
+    parts = {}
+    for item in rule.upper().replace('RRULE:', '').split(';'):
+        if item.strip():
+            key, _, value = item.partition('=')
+            parts[key.strip()] = value.strip()
+
+    freq = parts.get('FREQ')
+    if freq not in ('DAILY', 'WEEKLY'):
+        raise ValueError("FREQ must be DAILY or WEEKLY")
+    interval = int(parts.get('INTERVAL', '1'))
+    count = int(parts['COUNT']) if 'COUNT' in parts else None
+    until = datetime.strptime(parts['UNTIL'][:8], '%Y%m%d').date() if 'UNTIL' in parts else None
+    if count is None and until is None:
+        raise ValueError("COUNT or UNTIL is required")
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be positive")
+    try:
+        weekdays = {WEEKDAYS[d] for d in parts['BYDAY'].split(',')} if 'BYDAY' in parts else None
+    except KeyError:
+        raise ValueError("BYDAY must use MO,TU,WE,TH,FR,SA,SU")
+
+    dates = []
+    day = start_date
+    while len(dates) < MAX_OCCURRENCES:
+        if until and day > until:
+            break
+        if freq == 'DAILY':
+            if (day - start_date).days % interval == 0 and (weekdays is None or day.weekday() in weekdays):
+                dates.append(day)
+        else:
+            week = (day - start_date).days // 7
+            allowed = weekdays if weekdays is not None else {start_date.weekday()}
+            if week % interval == 0 and day.weekday() in allowed:
+                dates.append(day)
+        if count is not None and len(dates) >= count:
+            break
+        day += timedelta(days=1)
+    return dates
+
+
+def busy_intervals(cursor, kind, entity_ids, start_dt, end_dt):
+    """
+    {entity_id (str): [(departure, arrival), ...]}: non-cancelled flights of the given aircraft / pilots /
+    attendants overlapping [start_dt, end_dt), read through `cursor` (inside the caller's transaction).
+    """
+    if not entity_ids:
+        return {}
+    source = RESOURCE_SOURCES[kind]
+    placeholders = ','.join(['%s'] * len(entity_ids))
+    cursor.execute(f"""
+        SELECT f.entity_id, f.departure_ts, f.arrival_datetime
+        FROM ({source['assignments']}) f
+        WHERE f.entity_id IN ({placeholders})
+          AND f.flight_status != 'Cancelled'
+          AND f.arrival_datetime > %s
+          AND f.departure_ts < %s
+    """, (*entity_ids, start_dt, end_dt))
+    busy = {}
+    for row in cursor.fetchall():
+        busy.setdefault(str(row['entity_id']), []).append((row['departure_ts'], row['arrival_datetime']))
+    return busy
+
+
+class SchedulingBusyError(Exception):
+    """Raised by scheduling_lock when other flights are still being created."""
+
+
+SCHEDULING_LOCK_NAME = 'flytau_schedule'
+
+
+@contextmanager
+def scheduling_lock(timeout=30):
+    """
+    Serializes flight creation (add_flight and schedule_recurring) across threads and workers
+    (MySQL named lock, held on its own pooled connection for the whole block).
+    Raises SchedulingBusyError if the lock is not free within `timeout` seconds.
+    """
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (SCHEDULING_LOCK_NAME, timeout))
+            if cursor.fetchone()[0] != 1:
+                raise SchedulingBusyError("Another schedule is being created, try again shortly")
+            try:
+                yield
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (SCHEDULING_LOCK_NAME,))
+                cursor.fetchone()
+        finally:
+            cursor.close()
+
+
+def _pick_resources(kind, candidates, count, legs):
+    """
+    First `count` candidates of `kind` that can take every leg of a rotation:
+    the first leg must satisfy overlap + continuity, later legs only need to be free
+    (they continue the same chain).
+    Always answered by the ResourceTimeline, independent of RESOURCE_TIMELINE (see schedule_recurring).
+    """
+    key = 'aircraft_id' if kind == 'aircraft' else 'employee_id'
+    first_route, start, end = legs[0]
+    picked = []
+    for c in candidates:
+        if not resource_timeline.can_take(kind, c[key], first_route['origin'], start, end):
+            continue
+        if all(resource_timeline.is_free(kind, c[key], leg_start, leg_end) for _, leg_start, leg_end in legs[1:]):
+            picked.append(c)
+            if len(picked) == count:
+                break
+    return picked
+
+
+def schedule_recurring(route_id, rule, start_date, departure_time, price_economy, price_business=0,
+                       return_route_id=None, turnaround_minutes=90, batch_size=50):
+    """
+    Creates every flight of a recurring schedule and assigns aircraft and crew automatically.
+
+    Each occurrence is one rotation: the outbound flight on `route_id` and, if given, a return
+    flight on `return_route_id` departing `turnaround_minutes` after arrival with the SAME aircraft
+    and crew (so the resources are back at the origin for the next occurrence).
+
+    Assignment follows the add_flight rules: long flights (> 360 minutes) need a Big aircraft and
+    qualified crew; Big aircraft need 3 pilots + 6 attendants, Small ones 2 + 3; no time overlap;
+    append-only location continuity (checked against the ResourceTimeline).
+
+    Bulk scheduling always plans with the in-memory ResourceTimeline, also with RESOURCE_TIMELINE=0:
+    rotations planned earlier in the same run exist only as provisional timeline entries until their
+    batch commits, so the SQL checks could not see them. The per-batch database re-check below keeps
+    the result correct either way.
+
+    Flights are written in batched transactions of `batch_size` occurrences. Schedules run one at a time
+    (scheduling_lock, SchedulingBusyError if another one does not finish in time); planned rotations hold
+    their resources in the timeline under provisional ids until their batch commits, and each batch
+    re-checks overlap against the database before inserting (rotations that lost a resource are skipped).
+    Returns {'occurrences', 'created_flights', 'unstaffed': [{'date', 'reason'}]}.
+    """
+    with scheduling_lock():
+        return _schedule_recurring(route_id, rule, start_date, departure_time, price_economy, price_business,
+                                   return_route_id, turnaround_minutes, batch_size)
+
+
+def _schedule_recurring(route_id, rule, start_date, departure_time, price_economy, price_business,
+                        return_route_id, turnaround_minutes, batch_size):
+    route = db_manager.fetch_one("SELECT * FROM Route WHERE route_id = %s", (route_id,))
+    if not route:
+        raise ValueError(f"Route {route_id} not found")
+    routes = [route]
+    if return_route_id:
+        back = db_manager.fetch_one("SELECT * FROM Route WHERE route_id = %s", (return_route_id,))
+        if not back or back['origin'] != route['destination'] or back['destination'] != route['origin']:
+            raise ValueError("Return route must fly back from the destination to the origin")
+        routes.append(back)
+
+    dep_time = datetime.strptime(departure_time, '%H:%M').time()
+    is_long = any(int(r['duration']) > 360 for r in routes)
+    qual_filter = " WHERE is_qualified = 1" if is_long else ""
+
+    aircraft = db_manager.fetch_all(
+        "SELECT * FROM Aircraft" + (" WHERE size = 'Big'" if is_long else "") + " ORDER BY aircraft_id"
+    ) or []
+    pilots = db_manager.fetch_all("SELECT * FROM Pilot" + qual_filter + " ORDER BY employee_id") or []
+    attendants = db_manager.fetch_all(
+        "SELECT * FROM Flight_Attendant" + qual_filter + " ORDER BY employee_id"
+    ) or []
+
+    resource_timeline.refresh()
+    report = {'occurrences': 0, 'created_flights': 0, 'unstaffed': []}
+    pending = []            # planned rotations not yet committed (resources reserved in the timeline)
+
+    def drop(plan, reason):
+        for leg in plan['legs']:
+            resource_timeline.remove_flight(leg[3])
+        report['unstaffed'].append({'date': str(plan['date']), 'reason': reason})
+
+    def conflicting(cursor):
+        """Planned rotations whose aircraft or crew got a flight in the database since the timeline was read."""
+        ids = {'aircraft': set(), 'pilot': set(), 'attendant': set()}
+        for plan in pending:
+            ids['aircraft'].add(str(plan['aircraft']['aircraft_id']))
+            ids['pilot'].update(str(p['employee_id']) for p in plan['pilots'])
+            ids['attendant'].update(str(a['employee_id']) for a in plan['attendants'])
+        window_start = min(leg[1] for plan in pending for leg in plan['legs'])
+        window_end = max(leg[2] for plan in pending for leg in plan['legs'])
+        busy = {kind: busy_intervals(cursor, kind, sorted(entity_ids), window_start, window_end)
+                for kind, entity_ids in ids.items()}
+        conflicts = []
+        for plan in pending:
+            entities = ResourceTimeline._entities(plan['aircraft']['aircraft_id'],
+                                                  [p['employee_id'] for p in plan['pilots']],
+                                                  [a['employee_id'] for a in plan['attendants']])
+            if any(dep < leg_end and arr > leg_start
+                   for _, leg_start, leg_end, _ in plan['legs']
+                   for kind, entity_id in entities
+                   for dep, arr in busy[kind].get(entity_id, ())):
+                conflicts.append(plan)
+        return conflicts
+
+    def flush():
+        if not pending:
+            return
         try:
-            with self._cursor(dictionary=True) as (conn, cursor):
-                cursor.execute(query, params or ())
-                return cursor.fetchall()
-        except mysql.connector.Error:
-            return None
+            with db_manager.transaction() as cursor:
+                for plan in conflicting(cursor):
+                    pending.remove(plan)
+                    drop(plan, "aircraft or crew was assigned to another flight meanwhile")
+                if not pending:
+                    return
+                created = []
+                for plan in pending:
+                    for leg in plan['legs']:
+                        leg_route, leg_start, leg_end, temp_id = leg
+                        cursor.execute("""
+                            INSERT INTO Flight (route_id, aircraft_id, departure_date, departure_time, arrival_datetime, flight_status, price_economy, price_business)
+                            VALUES (%s, %s, %s, %s, %s, 'Active', %s, %s)
+                        """, (leg_route['route_id'], plan['aircraft']['aircraft_id'], leg_start.date(),
+                              leg_start.time(), leg_end, price_economy, price_business))
+                        created.append((cursor.lastrowid, temp_id, plan, leg))
+
+                flight_ids = [c[0] for c in created]
+                placeholders = ','.join(['%s'] * len(flight_ids))
+                cursor.execute(f"""
+                    INSERT INTO Flight_Inventory (flight_id, seat_class, total_seats, booked_seats)
+                    SELECT f.flight_id, s.class, COUNT(*), 0
+                    FROM Flight f
+                    JOIN Seat s ON s.aircraft_id = f.aircraft_id
+                    WHERE f.flight_id IN ({placeholders})
+                    GROUP BY f.flight_id, s.class
+                """, tuple(flight_ids))
+                cursor.executemany(
+                    "INSERT INTO Pilots_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
+                    [(fid, p['employee_id']) for fid, _, plan, _ in created for p in plan['pilots']]
+                )
+                cursor.executemany(
+                    "INSERT INTO Flight_Attendant_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
+                    [(fid, a['employee_id']) for fid, _, plan, _ in created for a in plan['attendants']]
+                )
+        except mysql.connector.Error as e:
+            for plan in pending:
+                drop(plan, f"database error: {e}")
+            pending.clear()
+            return
+
+        # Swap the provisional timeline entries for the real flight ids.
+        for flight_id, temp_id, plan, (leg_route, leg_start, leg_end, _) in created:
+            resource_timeline.remove_flight(temp_id)
+            resource_timeline.add_flight(
+                flight_id, plan['aircraft']['aircraft_id'],
+                [p['employee_id'] for p in plan['pilots']], [a['employee_id'] for a in plan['attendants']],
+                leg_start, leg_end, leg_route['destination']
+            )
+        report['created_flights'] += len(created)
+        pending.clear()
+
+    for day in parse_recurrence(rule, start_date):
+        report['occurrences'] += 1
+        start_dt = datetime.combine(day, dep_time)
+        if start_dt <= datetime.now():
+            report['unstaffed'].append({'date': str(day), 'reason': "departure is in the past"})
+            continue
+
+        legs = []
+        leg_start = start_dt
+        for leg_route in routes:
+            leg_end = leg_start + timedelta(minutes=int(leg_route['duration']))
+            legs.append((leg_route, leg_start, leg_end))
+            leg_start = leg_end + timedelta(minutes=turnaround_minutes)
+
+        picked_aircraft = _pick_resources('aircraft', aircraft, 1, legs)
+        if not picked_aircraft:
+            report['unstaffed'].append({'date': str(day), 'reason': "no aircraft available"})
+            continue
+        size = picked_aircraft[0]['size']
+        req_pilots = 3 if size == 'Big' else 2
+        req_attendants = 6 if size == 'Big' else 3
+        picked_pilots = _pick_resources('pilot', pilots, req_pilots, legs)
+        picked_attendants = _pick_resources('attendant', attendants, req_attendants, legs)
+        if len(picked_pilots) < req_pilots or len(picked_attendants) < req_attendants:
+            report['unstaffed'].append({
+                'date': str(day),
+                'reason': f"not enough crew (pilots {len(picked_pilots)}/{req_pilots}, "
+                          f"attendants {len(picked_attendants)}/{req_attendants})",
+            })
+            continue
+
+        plan = {'date': day, 'aircraft': picked_aircraft[0], 'pilots': picked_pilots,
+                'attendants': picked_attendants, 'legs': []}
+        for leg_route, leg_start, leg_end in legs:
+            temp_id = resource_timeline.reserve(
+                picked_aircraft[0]['aircraft_id'],
+                [p['employee_id'] for p in picked_pilots], [a['employee_id'] for a in picked_attendants],
+                leg_start, leg_end, leg_route['destination']
+            )
+            plan['legs'].append((leg_route, leg_start, leg_end, temp_id))
+        pending.append(plan)
+        if len(pending) >= batch_size:
+            flush()
+
+    flush()
+    status_scheduler.wake()
+    return report
 
 
-# Global DB access object used across the app.
-db_manager = DBManager(DB_CONFIG)
+# Report summary tables (migrations/005_report_summaries.sql), maintained in the same transaction as
+# the status change they count, so /manager/reports never has to scan the raw history.
 
+def record_flights_performed(cursor, flight_ids):
+    """Adds flights that just became Performed to the aircraft-month, route and occupancy summaries."""
+    placeholders = ','.join(['%s'] * len(flight_ids))
+    cursor.execute(f"""
+        INSERT INTO Report_Aircraft_Month (aircraft_id, month, flights_performed, performed_minutes)
+        SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), COUNT(*), SUM(r.duration)
+        FROM Flight f
+        JOIN Route r ON f.route_id = r.route_id
+        WHERE f.flight_id IN ({placeholders})
+        GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m')
+        ON DUPLICATE KEY UPDATE flights_performed = flights_performed + VALUES(flights_performed),
+                                performed_minutes = performed_minutes + VALUES(performed_minutes)
+    """, tuple(flight_ids))
+    cursor.execute(f"""
+        INSERT INTO Report_Aircraft_Month_Route (aircraft_id, month, origin, destination, flights)
+        SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination, COUNT(*)
+        FROM Flight f
+        JOIN Route r ON f.route_id = r.route_id
+        WHERE f.flight_id IN ({placeholders})
+        GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination
+        ON DUPLICATE KEY UPDATE flights = flights + VALUES(flights)
+    """, tuple(flight_ids))
+    # Final occupancy: the booked seats in the inventory are exactly the seats of the bookings being performed.
+    cursor.execute(f"""
+        INSERT INTO Report_Flight_Occupancy (flight_id, total_seats, occupied_seats)
+        SELECT flight_id, SUM(total_seats), SUM(booked_seats)
+        FROM Flight_Inventory
+        WHERE flight_id IN ({placeholders})
+        GROUP BY flight_id
+        ON DUPLICATE KEY UPDATE total_seats = VALUES(total_seats), occupied_seats = VALUES(occupied_seats)
+    """, tuple(flight_ids))
+
+
+def record_flight_cancelled(cursor, flight_id):
+    """Counts a flight cancellation (call before the status update; already-cancelled flights are ignored)."""
+    cursor.execute("""
+        INSERT INTO Report_Aircraft_Month (aircraft_id, month, flights_cancelled)
+        SELECT aircraft_id, DATE_FORMAT(departure_date, '%Y-%m'), 1
+        FROM Flight
+        WHERE flight_id = %s AND flight_status NOT LIKE 'Cancel%'
+        ON DUPLICATE KEY UPDATE flights_cancelled = flights_cancelled + 1
+    """, (flight_id,))
+
+
+def record_booking_created(cursor):
+    """Counts a new booking in the current month (booking_datetime defaults to now)."""
+    # Last statement of the booking transaction: keeps the month row locked as briefly as possible.
+    cursor.execute("""
+        INSERT INTO Report_Booking_Month (booking_month, total_bookings)
+        VALUES (DATE_FORMAT(NOW(), '%Y-%m'), 1)
+        ON DUPLICATE KEY UPDATE total_bookings = total_bookings + 1
+    """)
 
 
-def _flight_arrival_expr():
+def record_bookings_cancelled(cursor, condition, params):
     """
-    SQL expression for computing an effective arrival timestamp.
-    If Flight.arrival_datetime exists -> use it, otherwise calculate:
-    departure_date + departure_time + Route.duration minutes.
+    Counts the bookings matching `condition` (a WHERE clause on Booking b) as cancelled in their booking month.
+    Call it before the status UPDATE with the same condition; bookings already cancelled are not counted again.
     """
-    return "COALESCE(f.arrival_datetime, DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE))"
+    cursor.execute(f"""
+        INSERT INTO Report_Booking_Month (booking_month, cancelled_bookings)
+        SELECT DATE_FORMAT(b.booking_datetime, '%Y-%m') AS booking_month, COUNT(*) AS cancelled
+        FROM Booking b
+        WHERE ({condition}) AND b.booking_status NOT LIKE 'Cancel%'
+        GROUP BY DATE_FORMAT(b.booking_datetime, '%Y-%m')
+        ON DUPLICATE KEY UPDATE cancelled_bookings = cancelled_bookings + VALUES(cancelled_bookings)
+    """, tuple(params))
 
 
-def check_location_continuity(entity_id, entity_type, new_origin, check_time):
+# Full rebuild of the report summaries from history (reports-backfill).
+REPORT_BACKFILL_SQL = [
     """
-    Enforces "append-only" location continuity for scheduling.
-
-    Meaning:
-    - An entity (aircraft / pilot / attendant) can only be scheduled at the END of its chain
-      (i.e., after its latest non-cancelled assigned flight, including future flights).
-    - The next scheduled flight must depart from the destination of that latest flight.
-    - The next scheduled flight must depart at/after that latest flight's arrival time.
-    - If the entity has no flights in its chain -> it is assumed to be located at TLV.
+    INSERT INTO Report_Aircraft_Month (aircraft_id, month, flights_performed, flights_cancelled, performed_minutes)
+    SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'),
+           SUM(f.flight_status = 'Performed'),
+           SUM(f.flight_status LIKE 'Cancel%'),
+           COALESCE(SUM(CASE WHEN f.flight_status = 'Performed' THEN r.duration ELSE 0 END), 0)
+    FROM Flight f
+    JOIN Route r ON f.route_id = r.route_id
+    WHERE f.flight_status = 'Performed' OR f.flight_status LIKE 'Cancel%'
+    GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m')
+    """,
+    """
+    INSERT INTO Report_Aircraft_Month_Route (aircraft_id, month, origin, destination, flights)
+    SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination, COUNT(*)
+    FROM Flight f
+    JOIN Route r ON f.route_id = r.route_id
+    WHERE f.flight_status = 'Performed'
+    GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination
+    """,
+    """
+    INSERT INTO Report_Booking_Month (booking_month, total_bookings, cancelled_bookings)
+    SELECT DATE_FORMAT(booking_datetime, '%Y-%m'), COUNT(*), SUM(booking_status LIKE 'Cancel%')
+    FROM Booking
+    GROUP BY DATE_FORMAT(booking_datetime, '%Y-%m')
+    """,
     """
-    arrival_expr = _flight_arrival_expr()
+    INSERT INTO Report_Flight_Occupancy (flight_id, total_seats, occupied_seats)
+    SELECT f.flight_id,
+           (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id),
+           (SELECT COUNT(*)
+            FROM Reserved_Seat rs
+            JOIN Booking b ON rs.booking_id = b.booking_id
+            WHERE b.flight_id = f.flight_id AND b.booking_status = 'Performed')
+    FROM Flight f
+    WHERE f.flight_status = 'Performed'
+    """,
+]
+
+
+def rebuild_report_summaries():
+    """Recomputes all report summary tables from the raw history, in one transaction."""
+    with db_manager.transaction() as cursor:
+        for table in ('Report_Aircraft_Month', 'Report_Aircraft_Month_Route',
+                      'Report_Booking_Month', 'Report_Flight_Occupancy'):
+            cursor.execute(f"DELETE FROM {table}")
+        for statement in REPORT_BACKFILL_SQL:
+            cursor.execute(statement)
+
+
+@app.cli.command('replicas-check')
+def replicas_check_command():
+    """Show the primary and read replicas (server id, replication lag) and where reads are routed."""
+    endpoints = [('primary', db_manager.pool)] + [('replica', replica) for replica in db_manager.replicas]
+    for role, pool in endpoints:
+        label = f"{role} {pool.config['host']}:{pool.config.get('port', 3306)}"
+        try:
+            conn = pool.acquire()
+        except mysql.connector.Error as e:
+            click.echo(f"{label}: unreachable ({e})")
+            continue
+        try:
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            cursor.execute("SELECT @@server_id AS server_id, @@read_only AS read_only")
+            server = cursor.fetchone()
+            lag = ''
+            if role == 'replica':
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                    status = cursor.fetchone() or {}
+                    lag = f", lag {status.get('Seconds_Behind_Source', 'n/a')}s" if status else ", not replicating"
+                except mysql.connector.Error:
+                    lag = ''
+            cursor.close()
+        finally:
+            pool.release(conn)
+        click.echo(f"{label}: server_id {server['server_id']}, read_only {server['read_only']}{lag}")
+    if not db_manager.replicas:
+        click.echo("No replicas configured (DB_REPLICAS): every read goes to the primary.")
+        return
+
+    query = "SELECT @@server_id AS server_id"
+    db_manager.use_replicas(True)
+    replica_reads = [(db_manager.fetch_one(query) or {}).get('server_id') for _ in db_manager.replicas]
+    db_manager.use_replicas(False)
+    primary_read = (db_manager.fetch_one(query) or {}).get('server_id')
+    click.echo(f"GET request reads -> server_id {', '.join(map(str, replica_reads))}; "
+               f"after a write / background work -> server_id {primary_read}")
 
-    if entity_type == 'aircraft':
-        # Get the most recent (latest-arriving) non-cancelled flight for this aircraft.
-        query = f"""
-            SELECT r.destination, {arrival_expr} AS arrival_dt
-            FROM Flight f
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE f.aircraft_id = %s
-              AND f.flight_status != 'Cancelled'
-            ORDER BY arrival_dt DESC
-            LIMIT 1
-        """
-        last_flight = db_manager.fetch_one(query, (entity_id,))
-        if not last_flight:
-            # No flights -> default starting location is TLV.
-            return new_origin == 'TLV'
-        # Allowed only if departing from last destination AND after last arrival.
-        return (new_origin == last_flight['destination']) and (check_time >= last_flight['arrival_dt'])
-
-    if entity_type == 'pilot':
-        # Get the most recent (latest-arriving) non-cancelled flight for this pilot.
-        query = f"""
-            SELECT r.destination, {arrival_expr} AS arrival_dt
-            FROM Pilots_on_Flights pf
-            JOIN Flight f ON pf.flight_id = f.flight_id
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE pf.employee_id = %s
-              AND f.flight_status != 'Cancelled'
-            ORDER BY arrival_dt DESC
-            LIMIT 1
-        """
-        last_flight = db_manager.fetch_one(query, (entity_id,))
-        if not last_flight:
-            return new_origin == 'TLV'
-        return (new_origin == last_flight['destination']) and (check_time >= last_flight['arrival_dt'])
-
-    if entity_type == 'attendant':
-        # Get the most recent (latest-arriving) non-cancelled flight for this flight attendant.
-        query = f"""
-            SELECT r.destination, {arrival_expr} AS arrival_dt
-            FROM Flight_Attendant_on_Flights af
-            JOIN Flight f ON af.flight_id = f.flight_id
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE af.employee_id = %s
-              AND f.flight_status != 'Cancelled'
-            ORDER BY arrival_dt DESC
-            LIMIT 1
-        """
-        last_flight = db_manager.fetch_one(query, (entity_id,))
-        if not last_flight:
-            return new_origin == 'TLV'
-        return (new_origin == last_flight['destination']) and (check_time >= last_flight['arrival_dt'])
 
-    # Unknown entity type -> reject by default.
-    return False
+@app.cli.command('reports-backfill')
+def reports_backfill_command():
+    """Rebuild the /manager/reports summary tables from history."""
+    rebuild_report_summaries()
+    click.echo("Report summaries rebuilt.")
 
 
 def update_statuses():
     """
     Keeps flight and booking statuses consistent with real time and seat occupancy.
 
+    Full-table sweep: no longer runs per request. StatusScheduler runs it when a worker becomes
+    the scheduler leader and every STATUS_SCHEDULER_CATCH_UP seconds after that (catch-up), and
+    flips individual flights as they depart in between.
+
     Runs 3 maintenance updates:
     1) Flight status: when departure time has passed -> mark Active/Full flights as Performed.
     2) Booking status: when a flight becomes Performed -> mark its Active bookings as Performed.
     3) Flight occupancy: recalculate whether each Active/Full flight should be Active or Full
        based on the number of reserved seats in Active bookings.
+
+    Its duration is observed in the flytau_update_statuses_duration_seconds histogram.
     """
+    started = time.perf_counter()
+    try:
+        # 1) Flights: once departure datetime is in the past -> Performed (only for Active/Full flights).
+        #    Goes through mark_flights_performed() in batches so the report summaries are updated too.
+        departed = db_manager.fetch_all("""
+            SELECT flight_id FROM Flight
+            WHERE flight_status IN ('Active', 'Full')
+              AND departure_ts <= NOW()
+        """) or []
+        departed_ids = [row['flight_id'] for row in departed]
+        for i in range(0, len(departed_ids), 500):
+            mark_flights_performed(departed_ids[i:i + 500])
+
+        # 2) Bookings: once the flight is Performed -> the booking becomes Performed (only if it was Active).
+        db_manager.execute_query("""
+            UPDATE Booking b
+            JOIN Flight f ON b.flight_id = f.flight_id
+            SET b.booking_status = 'Performed'
+            WHERE f.flight_status = 'Performed'
+              AND b.booking_status = 'Active'
+        """)
 
-    # 1) Flights: once departure datetime is in the past -> Performed (only for Active/Full flights).
-    db_manager.execute_query("""
-        UPDATE Flight
-        SET flight_status = 'Performed'
-        WHERE TIMESTAMP(departure_date, departure_time) <= NOW()
-          AND flight_status IN ('Active', 'Full')
-    """)
+        # 3) Flights: update Active/Full based on seat occupancy (do not touch Performed/Cancelled).
+        db_manager.execute_query("""
+            UPDATE Flight f
+            JOIN (
+                SELECT flight_id, SUM(total_seats - booked_seats) AS free_seats
+                FROM Flight_Inventory
+                GROUP BY flight_id
+            ) as calc ON f.flight_id = calc.flight_id
+            SET f.flight_status = CASE
+                WHEN calc.free_seats <= 0 THEN 'Full'
+                ELSE 'Active'
+            END
+            WHERE f.flight_status IN ('Active', 'Full')
+        """)
+    finally:
+        metrics.observe('flytau_update_statuses_duration_seconds', time.perf_counter() - started)
 
-    # 2) Bookings: once the flight is Performed -> the booking becomes Performed (only if it was Active).
-    db_manager.execute_query("""
-        UPDATE Booking b
-        JOIN Flight f ON b.flight_id = f.flight_id
-        SET b.booking_status = 'Performed'
-        WHERE f.flight_status = 'Performed'
-          AND b.booking_status = 'Active'
-    """)
 
-    # 3) Flights: update Active/Full based on seat occupancy (do not touch Performed/Cancelled).
-    db_manager.execute_query("""
-        UPDATE Flight f
-        JOIN (
-            SELECT f.flight_id,
-                   (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id) as total_seats,
-                   (SELECT COUNT(*) FROM Reserved_Seat rs
-                    JOIN Booking b ON rs.booking_id = b.booking_id
-                    WHERE b.flight_id = f.flight_id AND b.booking_status = 'Active') as occupied_seats
-            FROM Flight f
-            WHERE f.flight_status IN ('Active', 'Full')
-        ) as calc ON f.flight_id = calc.flight_id
-        SET f.flight_status = CASE
-            WHEN calc.occupied_seats >= calc.total_seats THEN 'Full'
-            ELSE 'Active'
-        END
-        WHERE f.flight_status IN ('Active', 'Full')
-    """)
+class StatusScheduler:
+    """
+    Background thread that marks flights (and their Active bookings) as Performed
+    at the moment their departure time passes.
+
+    - Keeps a time-ordered heap of (departure datetime, flight_id) for upcoming Active/Full flights
+      and sleeps until the next one is due.
+    - The heap is reloaded every `refresh_interval` seconds (flights created by other workers
+      are picked up there), or immediately after wake().
+    - On every reload it also reaps expired seat holds (reap_expired_holds), and every
+      `catch_up_interval` seconds it runs a full update_statuses() sweep, so flights the queue no
+      longer covers (a failed transition older than a day) are still transitioned while the leader stays.
+    - Only one process runs transitions: the one holding the MySQL named lock LOCK_NAME.
+      The lock lives on a dedicated (non-pooled) connection, so it is released automatically
+      if the worker dies; the other workers keep retrying to take over.
+    """
+
+    LOCK_NAME = 'flytau_status_scheduler'
+
+    def __init__(self, db, config, refresh_interval=60, catch_up_interval=900):
+        self.db = db
+        self.config = config
+        self.refresh_interval = refresh_interval
+        self.catch_up_interval = catch_up_interval
+
+        self._heap = []
+        self._queued = set()
+        self._lock_conn = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._caught_up_at = 0
+
+    def start(self):
+        """Start the background thread once per process (safe to call on every request)."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='status-scheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def wake(self):
+        """Ask the scheduler to reload its queue now (e.g. after a flight was created)."""
+        self._wakeup.set()
+
+    def is_leader(self):
+        return self._lock_conn is not None
+
+    # --- cross-worker leadership -------------------------------------------------
+
+    def _try_acquire_leadership(self):
+        """Returns True if this process holds (or just acquired) the scheduler lock."""
+        if self._lock_conn is not None:
+            try:
+                cursor = self._lock_conn.cursor()
+                cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (self.LOCK_NAME,))
+                still_ours = cursor.fetchone()[0] == 1
+                cursor.close()
+                if still_ours:
+                    return True
+            except mysql.connector.Error:
+                pass
+            self._release_leadership()
+
+        conn = None
+        try:
+            conn = mysql.connector.connect(**self.config)
+            cursor = conn.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (self.LOCK_NAME,))
+            acquired = cursor.fetchone()[0] == 1
+            cursor.close()
+        except mysql.connector.Error:
+            acquired = False
+        if not acquired:
+            if conn is not None:
+                conn.close()
+            return False
+
+        self._lock_conn = conn
+        # New leader: catch up on everything missed while nobody was leading.
+        update_statuses()
+        self._caught_up_at = time.monotonic()
+        return True
+
+    def _release_leadership(self):
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.close()
+            except mysql.connector.Error:
+                pass
+        self._lock_conn = None
+        self._heap = []
+        self._queued = set()
+
+    # --- queue ----------------------------------------------------------------
+
+    def _reload_queue(self):
+        """Load upcoming Active/Full departures (plus overdue ones from yesterday/today)."""
+        horizon = datetime.now() + timedelta(seconds=self.refresh_interval * 2)
+        rows = self.db.fetch_all("""
+            SELECT flight_id, departure_ts AS departure_dt
+            FROM Flight
+            WHERE flight_status IN ('Active', 'Full')
+              AND departure_ts BETWEEN %s AND %s
+        """, (day_range(date.today() - timedelta(days=1))[0], horizon)) or []
+        for row in rows:
+            if row['flight_id'] not in self._queued:
+                heapq.heappush(self._heap, (row['departure_dt'], row['flight_id']))
+                self._queued.add(row['flight_id'])
+
+    def _run_due(self):
+        """Transition every queued flight whose departure has passed."""
+        now = datetime.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, flight_id = heapq.heappop(self._heap)
+            self._queued.discard(flight_id)
+            due.append(flight_id)
+        if due:
+            mark_flights_performed(due)
+
+    def _seconds_until_next(self, next_refresh):
+        timeout = next_refresh - time.monotonic()
+        if self._heap:
+            timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+        return max(timeout, 0)
+
+    def _run(self):
+        next_refresh = 0
+        while not self._stop.is_set():
+            try:
+                if not self._try_acquire_leadership():
+                    self._stop.wait(self.refresh_interval)
+                    continue
+                if self._wakeup.is_set() or time.monotonic() >= next_refresh:
+                    self._wakeup.clear()
+                    self._reload_queue()
+                    reap_expired_holds()
+                    if time.monotonic() - self._caught_up_at >= self.catch_up_interval:
+                        update_statuses()
+                        self._caught_up_at = time.monotonic()
+                    next_refresh = time.monotonic() + self.refresh_interval
+                self._run_due()
+                self._wakeup.wait(self._seconds_until_next(next_refresh))
+            except Exception:
+                app.logger.exception("Status scheduler iteration failed")
+                self._stop.wait(5)
+        self._release_leadership()
+
+
+def mark_flights_performed(flight_ids):
+    """
+    Marks the given flights as Performed (only if still Active/Full and actually departed),
+    then marks their Active bookings as Performed and adds the flights to the report summaries.
+    Returns the ids that were actually transitioned.
+    """
+    placeholders = ','.join(['%s'] * len(flight_ids))
+    with db_manager.transaction() as cursor:
+        cursor.execute(f"""
+            SELECT flight_id FROM Flight
+            WHERE flight_id IN ({placeholders})
+              AND flight_status IN ('Active', 'Full')
+              AND departure_ts <= NOW()
+            FOR UPDATE
+        """, tuple(flight_ids))
+        due = [row['flight_id'] for row in cursor.fetchall()]
+        if not due:
+            return []
+        placeholders = ','.join(['%s'] * len(due))
+        cursor.execute(f"""
+            UPDATE Flight
+            SET flight_status = 'Performed'
+            WHERE flight_id IN ({placeholders})
+        """, tuple(due))
+        cursor.execute(f"""
+            UPDATE Booking
+            SET booking_status = 'Performed'
+            WHERE flight_id IN ({placeholders})
+              AND booking_status = 'Active'
+        """, tuple(due))
+        record_flights_performed(cursor, due)
+    metrics.inc('flytau_flights_performed_total', len(due))
+    return due
+
+
+# One scheduler per process; only the lock holder actually runs transitions.
+status_scheduler = StatusScheduler(db_manager, DB_CONFIG, refresh_interval=STATUS_SCHEDULER_REFRESH,
+                                   catch_up_interval=STATUS_SCHEDULER_CATCH_UP)
+
+
+# GET endpoints that read from the primary, never a replica: the ones that check data and then write
+# (cancellations), and the seat map, which must show the holds and bookings other users just placed.
+PRIMARY_READ_ENDPOINTS = {'cancel_booking', 'cancel_flight', 'book_flight'}
 
 
 @app.before_request
@@ -231,18 +3059,75 @@ def before_request():
     """
     Flask hook that runs before every request.
 
-    - Calls update_statuses() so the UI always reflects up-to-date statuses.
+    - Makes sure the background StatusScheduler is running (statuses are no longer
+      recalculated on the request path).
     - Enables "permanent" sessions and sets the session lifetime to 30 minutes.
+    - Starts the per-request query accounting (see QueryInstrumentation), keyed by route rule,
+      and the request latency timer (see after_request).
+    - Read/write splitting (only with DB_REPLICAS): reads of GET requests go to a replica, except for
+      PRIMARY_READ_ENDPOINTS and for a session still inside its read-your-writes window (see after_request).
     """
-    update_statuses()
+    g.request_started = time.perf_counter()
+    db_manager.instrumentation.begin_request(request.url_rule.rule if request.url_rule else '<unmatched>')
+    db_manager.use_replicas(request.method == 'GET' and request.endpoint not in PRIMARY_READ_ENDPOINTS
+                            and session.get('db_primary_until', 0) <= time.time())
+    if STATUS_SCHEDULER_ENABLED:
+        status_scheduler.start()
     session.permanent = True
     app.permanent_session_lifetime = timedelta(minutes=30)
 
 
+@app.after_request
+def after_request(response):
+    """
+    Closes the request's query accounting; with DB_QUERY_HEADERS=1 reports it in the
+    X-DB-Queries / X-DB-Time (milliseconds) response headers.
+    Queries run while a streamed body is sent happen after this point and are not included.
+
+    Also observes the request latency per endpoint (add_flight per wizard step) for /metrics.
+
+    A request that wrote (e.g. booking_summary, cancel_booking) keeps its session reading from the primary
+    for DB_READ_YOUR_WRITES seconds, so the user sees their own booking before the replicas catch up.
+    """
+    summary = db_manager.instrumentation.end_request()
+    if db_manager.replicas and db_manager.wrote():
+        session['db_primary_until'] = time.time() + DB_READ_YOUR_WRITES
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe('flytau_http_request_duration_seconds', time.perf_counter() - started,
+                        endpoint=request.endpoint or '<unmatched>', step=_request_step())
+    if DB_QUERY_HEADERS and summary is not None:
+        response.headers['X-DB-Queries'] = str(summary['queries'])
+        response.headers['X-DB-Time'] = f"{summary['db_ms']:.1f}"
+    return response
+
+
+# add_flight wizard steps, used as the `step` label of the request latency histogram.
+ADD_FLIGHT_STEPS = ('1', 'check_availability', 'assign_crew', 'create')
+
+
+def _request_step():
+    """The add_flight step of the current request ('' for other endpoints; unknown values are not labels)."""
+    if request.endpoint != 'add_flight':
+        return ''
+    step = request.form.get('step', '1') if request.method == 'POST' else '1'
+    return step if step in ADD_FLIGHT_STEPS else 'other'
+
+
+@app.teardown_request
+def teardown_request(exc):
+    """
+    Requests that failed before after_request still close their query accounting.
+    The worker thread reads from the primary again (background work and CLI commands never use replicas).
+    """
+    db_manager.instrumentation.end_request()
+    db_manager.use_replicas(False)
+
+
 @app.route('/')
 def index():
     """
-    Home page: displays flights.
+    Home page: displays flights, one page at a time (see fetch_flight_page).
 
     Manager view:
     - Shows all flights (any status), ordered by latest first.
@@ -250,42 +3135,26 @@ def index():
     Customer view:
     - Shows only future flights that are Active and have at least 1 available seat.
 
+    Query args: after (cursor of the previous page's last flight), per_page.
     Also loads distinct origins/destinations for the search filters on the page.
     """
+    after = request.args.get('after')
+    page_size = page_size_arg(request.args.get('per_page'))
+
+    # available_seats = free seats from the maintained per-flight inventory.
     if session.get('role') == 'manager':
-        # available_seats = total seats in the aircraft - seats reserved by Active bookings.
-        query = """
-            SELECT f.*, r.origin, r.destination, r.duration,
-            (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id) -
-            (SELECT COUNT(*) FROM Reserved_Seat rs WHERE rs.booking_id IN (SELECT booking_id FROM Booking WHERE flight_id = f.flight_id AND booking_status = 'Active'))
-            as available_seats
-            FROM Flight f
-            JOIN Route r ON f.route_id = r.route_id
-            ORDER BY f.departure_date DESC, f.departure_time DESC
-        """
-        flights = db_manager.fetch_all(query)
+        flights, next_cursor = fetch_flight_page([], [], after, page_size, descending=True)
+        total_estimate = estimate_flight_count([], [])
     else:
         # Customers can only see bookable flights: future + Active + seats available.
-        query = """
-            SELECT f.*, r.origin, r.destination, r.duration,
-            (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id) -
-            (SELECT COUNT(*) FROM Reserved_Seat rs WHERE rs.booking_id IN (SELECT booking_id FROM Booking WHERE flight_id = f.flight_id AND booking_status = 'Active'))
-            as available_seats
-            FROM Flight f
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE f.departure_date >= %s AND f.flight_status = 'Active'
-            HAVING available_seats > 0
-            ORDER BY f.departure_date, f.departure_time
-        """
-        flights = db_manager.fetch_all(query, (date.today(),))
-
-    # Ensure the template always receives a list.
-    if not flights:
-        flights = []
+        # Every customer sees the same list, so concurrent requests share one query (see flight_list).
+        conditions = ["f.flight_status = 'Active'", "f.departure_ts >= %s"]
+        flights, next_cursor, total_estimate = flight_list(
+            conditions, [day_range(date.today())[0]], after, page_size, having='available_seats > 0')
 
     # Used to populate search dropdowns.
-    destinations = db_manager.fetch_all("SELECT DISTINCT destination FROM Route") or []
-    origins = db_manager.fetch_all("SELECT DISTINCT origin FROM Route") or []
+    destinations = db_manager.fetch_all_cached("SELECT DISTINCT destination FROM Route") or []
+    origins = db_manager.fetch_all_cached("SELECT DISTINCT origin FROM Route") or []
     origins = origins or []  # ONE LINE FIX
     destinations = destinations or []
 
@@ -295,90 +3164,85 @@ def index():
         flights=flights,
         destinations=destinations,
         origins=origins,
-        date_today=date.today()
+        date_today=date.today(),
+        next_url=url_for('index', after=next_cursor, per_page=page_size) if next_cursor else None,
+        first_url=url_for('index', per_page=page_size) if after else None,
+        total_estimate=total_estimate
     )
 
 
-@app.route('/search', methods=['POST'])
+@app.route('/search', methods=['GET', 'POST'])
 def search_flights():
     """
-    Search endpoint for filtering flights.
+    Search endpoint for filtering flights, paginated like index() (see fetch_flight_page).
 
-    Inputs (from form):
+    Inputs (form on the first page, query string on the following pages):
     - origin, destination, date_from
     - status (only for managers)
+    - after, per_page (pagination)
 
     Behavior:
     - Manager: can filter by origin/destination/date/status across all flights.
     - Customer: can filter only Active flights, and always requires available seats > 0.
     """
-    origin = request.form.get('origin')
-    destination = request.form.get('destination')
-    date_from = request.form.get('date_from')
-    status_filter = request.form.get('status')
-
-    # Query parameters are built dynamically based on which filters were provided.
+    origin = request.values.get('origin')
+    destination = request.values.get('destination')
+    date_from = request.values.get('date_from')
+    status_filter = request.values.get('status')
+    after = request.values.get('after')
+    page_size = page_size_arg(request.values.get('per_page'))
+
+    # WHERE clauses and their parameters are built dynamically based on which filters were provided.
+    conditions = []
     params = []
 
-    if session.get('role') == 'manager':
-        query = """
-            SELECT f.*, r.origin, r.destination, r.duration,
-            (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id) -
-            (SELECT COUNT(*) FROM Reserved_Seat rs WHERE rs.booking_id IN (SELECT booking_id FROM Booking WHERE flight_id = f.flight_id AND booking_status = 'Active'))
-            as available_seats
-            FROM Flight f
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE 1=1
-        """
-    else:
-        query = """
-            SELECT f.*, r.origin, r.destination, r.duration,
-            (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id) -
-            (SELECT COUNT(*) FROM Reserved_Seat rs WHERE rs.booking_id IN (SELECT booking_id FROM Booking WHERE flight_id = f.flight_id AND booking_status = 'Active'))
-            as available_seats
-            FROM Flight f
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE f.flight_status = 'Active'
-        """
+    if session.get('role') != 'manager':
+        conditions.append("f.flight_status = 'Active'")
 
     # Optional filters (added only if provided).
     if origin:
-        query += " AND r.origin = %s"
+        conditions.append("r.origin = %s")
         params.append(origin)
     if destination:
-        query += " AND r.destination = %s"
+        conditions.append("r.destination = %s")
         params.append(destination)
-    if date_from:
-        query += " AND f.departure_date = %s"
-        params.append(date_from)
+    day = day_range(date_from) if date_from else None
+    if day:
+        # Flights of that day, as a range on the stored departure timestamp.
+        conditions.append("f.departure_ts >= %s AND f.departure_ts < %s")
+        params += list(day)
     elif session.get('role') != 'manager':
-        # Customers default to showing from today forward if no date selected.
-        query += " AND f.departure_date >= %s"
-        params.append(date.today())
+        # Customers default to showing from today forward if no (valid) date selected.
+        conditions.append("f.departure_ts >= %s")
+        params.append(day_range(date.today())[0])
 
     # Managers can filter by status; customers cannot.
     if session.get('role') == 'manager' and status_filter:
-        query += " AND f.flight_status = %s"
+        conditions.append("f.flight_status = %s")
         params.append(status_filter)
 
     # Customers must have at least one available seat.
-    if session.get('role') != 'manager':
-        query += " HAVING available_seats > 0"
-
-    query += " ORDER BY f.departure_date, f.departure_time"
+    having = 'available_seats > 0' if session.get('role') != 'manager' else ''
 
-    flights = db_manager.fetch_all(query, tuple(params))
+    # Identical concurrent searches share one query (see flight_list).
+    flights, next_cursor, total_estimate = flight_list(conditions, params, after, page_size, having=having)
 
     # Reload dropdown values for the page.
-    destinations = db_manager.fetch_all("SELECT DISTINCT destination FROM Route")
-    origins = db_manager.fetch_all("SELECT DISTINCT origin FROM Route")
+    destinations = db_manager.fetch_all_cached("SELECT DISTINCT destination FROM Route")
+    origins = db_manager.fetch_all_cached("SELECT DISTINCT origin FROM Route")
 
+    # Next / first page links repeat the filters in the query string.
+    filters = {'origin': origin, 'destination': destination, 'date_from': date_from,
+               'status': status_filter, 'per_page': page_size}
     return render_template(
         'index.html',
         flights=flights,
         destinations=destinations,
         origins=origins,
-        date_today=date.today()
+        date_today=date.today(),
+        next_url=url_for('search_flights', after=next_cursor, **filters) if next_cursor else None,
+        first_url=url_for('search_flights', **filters) if after else None,
+        total_estimate=total_estimate
     )
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -507,6 +3371,19 @@ def logout():
     return redirect(url_for('index'))
 
 
+# Flight + route + aircraft row shown on the booking pages (served from the query cache).
+FLIGHT_DETAILS_SQL = """
+    SELECT f.*, r.origin, r.destination, r.duration AS route_duration, a.manufacturer, a.size
+    FROM Flight f
+    JOIN Route r ON f.route_id = r.route_id
+    JOIN Aircraft a ON f.aircraft_id = a.aircraft_id
+    WHERE f.flight_id = %s
+"""
+# Short TTL: writes from other workers (e.g. a status change) are not seen by this process's cache
+# until then. Status and seats are re-checked under lock by create_booking() anyway.
+FLIGHT_DETAILS_TTL = 10
+
+
 @app.route('/book/<int:flight_id>', methods=['GET', 'POST'])
 def book_flight(flight_id):
     """
@@ -514,38 +3391,31 @@ def book_flight(flight_id):
 
     - Loads flight + route + aircraft details.
     - Loads all seats for the aircraft and marks seats reserved by Active bookings.
-    - POST: collects selected seats, calculates total price by seat class,
-      and stores a temporary booking payload in the session (booking_temp).
+    - Seats held by other users (Seat_Hold) are shown as taken as well.
+    - POST: collects selected seats, calculates total price by seat class, holds the seats for
+      SEAT_HOLD_TTL seconds and stores a temporary booking payload in the session (booking_temp).
     """
     # Load flight details (including route and aircraft metadata).
-    flight = db_manager.fetch_one("""
-        SELECT f.*, r.origin, r.destination, r.duration AS route_duration, a.manufacturer, a.size
-        FROM Flight f
-        JOIN Route r ON f.route_id = r.route_id
-        JOIN Aircraft a ON f.aircraft_id = a.aircraft_id
-        WHERE f.flight_id = %s
-    """, (flight_id,))
+    flight = db_manager.fetch_one_cached(FLIGHT_DETAILS_SQL, (flight_id,), ttl=FLIGHT_DETAILS_TTL)
 
     # Invalid flight id -> go back home.
     if not flight:
         return redirect(url_for('index'))
 
     # All seats for the aircraft, ordered by class then seat position.
-    all_seats = db_manager.fetch_all(
-        "SELECT * FROM Seat WHERE aircraft_id = %s ORDER BY class DESC, row_num, col_num",
-        (flight['aircraft_id'],)
-    )
+    all_seats = db_manager.fetch_all_prepared('seat_map', (flight['aircraft_id'],), row_factory='record')
 
     # Seats currently reserved by Active bookings for this flight.
-    reserved = db_manager.fetch_all("""
-        SELECT rs.row_num, rs.col_num
-        FROM Reserved_Seat rs
-        JOIN Booking b ON rs.booking_id = b.booking_id
-        WHERE b.flight_id = %s AND b.booking_status = 'Active'
-    """, (flight_id,))
+    reserved = db_manager.fetch_all_prepared('reserved_seats', (flight_id,), row_factory='tuple')
 
-    # Quick lookup structure for the template to mark seats as unavailable.
-    reserved_set = {(r['row_num'], r['col_num']) for r in (reserved or [])}
+    # Every session gets a token that owns its seat holds.
+    if 'hold_token' not in session:
+        session['hold_token'] = secrets.token_hex(16)
+
+    # Quick lookup structure for the template to mark seats as unavailable
+    # (reserved seats + seats currently held by other users).
+    reserved_set = set(reserved or [])  # (row_num, col_num) tuples
+    reserved_set |= held_seats(flight_id, exclude_token=session['hold_token'])
 
     if request.method == 'POST':
         # Seat ids encoded as "row-col-class" (e.g., "12-A-Economy").
@@ -564,6 +3434,12 @@ def book_flight(flight_id):
             total_price += float(price)
             seats_info.append({'row': row, 'col': col, 'seat_class': cls, 'price': price})
 
+        # Hold the seats until the booking is confirmed (or the hold expires).
+        seats = [(int(info['row']), info['col']) for info in seats_info]
+        if not acquire_seat_holds(flight_id, seats, session['hold_token']):
+            flash('חלק מהמושבים שבחרת כבר נתפסו. אנא בחר מושבים אחרים.', 'danger')
+            return redirect(request.url)
+
         # Temporary booking payload (used by booking_summary to actually create the Booking/Reserved_Seat rows).
         session['booking_temp'] = {
             'flight_id': flight_id,
@@ -582,8 +3458,9 @@ def booking_summary():
 
     Uses the temporary booking payload stored in session['booking_temp'] (selected seats + total price).
     - GET: shows a summary page before confirming.
-    - POST: creates the Booking row + Reserved_Seat rows, then clears the temp session data.
-      Supports both logged-in customers and guest bookings.
+    - POST: creates the Booking row + Reserved_Seat rows in one transaction (create_booking),
+      then clears the temp session data. Supports both logged-in customers and guest bookings.
+      If another booking took one of the seats meanwhile, the user is sent back to seat selection.
     """
     # Temporary booking data from the seat selection step.
     data = session.get('booking_temp')
@@ -592,13 +3469,7 @@ def booking_summary():
         return redirect(url_for('index'))
 
     # Load flight details for display and for aircraft_id when reserving seats.
-    flight = db_manager.fetch_one("""
-        SELECT f.*, r.origin, r.destination, r.duration AS route_duration, a.manufacturer, a.size
-        FROM Flight f
-        JOIN Route r ON f.route_id = r.route_id
-        JOIN Aircraft a ON f.aircraft_id = a.aircraft_id
-        WHERE f.flight_id = %s
-    """, (data['flight_id'],))
+    flight = db_manager.fetch_one_cached(FLIGHT_DETAILS_SQL, (data['flight_id'],), ttl=FLIGHT_DETAILS_TTL)
 
     if not flight:
         return redirect(url_for('index'))
@@ -627,36 +3498,21 @@ def booking_summary():
                 flash("חובה להזין לפחות מספר טלפון אחד.", "danger")
                 return redirect(url_for('booking_summary'))
 
-            # Ensure Customer exists for the guest (base customer record).
-            existing_cust = db_manager.fetch_one("SELECT * FROM Customer WHERE email=%s", (email,))
-            if not existing_cust:
-                db_manager.execute_query(
-                    "INSERT INTO Customer (email, first_name, last_name) VALUES (%s, %s, %s)",
-                    (email, first_name, last_name)
-                )
-
-            # Store guest phone numbers (ignore duplicates).
-            for p in phones:
-                db_manager.execute_query(
-                    "INSERT IGNORE INTO Customer_Phone (email, phone_num) VALUES (%s, %s)",
-                    (email, p)
-                )
+        seats = [(int(seat['row']), seat['col']) for seat in data['seats_info']]
 
-        # Generate a human-friendly booking identifier.
-        booking_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-
-        # Create the booking (starts as Active).
-        db_manager.execute_query("""
-            INSERT INTO Booking (booking_id, email, flight_id, total_price, booking_status)
-            VALUES (%s, %s, %s, %s, 'Active')
-        """, (booking_id, email, data['flight_id'], data['total_price']))
-
-        # Reserve each selected seat for this booking.
-        for seat in data['seats_info']:
-            db_manager.execute_query("""
-                INSERT INTO Reserved_Seat (booking_id, aircraft_id, row_num, col_num)
-                VALUES (%s, %s, %s, %s)
-            """, (booking_id, flight['aircraft_id'], seat['row'], seat['col']))
+        try:
+            booking_id = create_booking(
+                flight, email, seats, data['total_price'],
+                first_name=first_name, last_name=last_name, phones=phones,
+                create_customer=not session.get('user_id'),
+                hold_token=session.get('hold_token'),
+                seat_prices={(int(seat['row']), seat['col']): float(seat['price']) for seat in data['seats_info']}
+            )
+        except SeatConflictError:
+            # Someone else got (some of) these seats first: back to seat selection.
+            session.pop('booking_temp', None)
+            flash('חלק מהמושבים שבחרת כבר נתפסו. אנא בחר מושבים אחרים.', 'danger')
+            return redirect(url_for('book_flight', flight_id=data['flight_id']))
 
         # Clear the temp data so it cannot be submitted twice.
         session.pop('booking_temp', None)
@@ -682,6 +3538,7 @@ def my_bookings():
     - Requires login.
     - Supports an optional status filter via query string (?status=Active/Performed/...).
     - Returns bookings with route info and a readable seats list (GROUP_CONCAT).
+    - The history is streamed: rows are read with fetch_iter() while the template renders.
     """
     if not session.get('user_id'):
         return redirect(url_for('login'))
@@ -723,12 +3580,13 @@ def my_bookings():
 
     query += " ORDER BY b.booking_datetime DESC"
 
-    bookings = db_manager.fetch_all(query, tuple(params))
+    bookings = db_manager.fetch_iter(query, tuple(params))
 
     # Status values used by the UI filter dropdown.
     statuses = ['Active', 'Performed', 'Cancelled by Customer', 'Cancelled by System']
 
-    return render_template(
+    # Streamed rendering: the page is sent while the rows are read, none of them are kept.
+    return stream_template(
         'my_bookings.html',
         bookings=bookings,
         statuses=statuses,
@@ -747,13 +3605,7 @@ def cancel_booking(booking_id):
       as "Cancelled by Customer" with a 5% cancellation fee.
     """
     # Fetch booking with its flight date/time and route for validation and display.
-    booking = db_manager.fetch_one("""
-        SELECT b.*, f.departure_date, f.departure_time, r.origin, r.destination
-        FROM Booking b
-        JOIN Flight f ON b.flight_id = f.flight_id
-        JOIN Route r ON f.route_id = r.route_id
-        WHERE b.booking_id = %s
-    """, (booking_id,))
+    booking = db_manager.fetch_one_prepared('booking_details', (booking_id,))
 
     if not booking:
         return redirect(url_for('index'))
@@ -762,9 +3614,8 @@ def cancel_booking(booking_id):
     if session.get('user_id') and session['user_id'] != booking['email']:
         return redirect(url_for('my_bookings'))
 
-    # Build a full departure datetime to compute the remaining time until departure.
-    departure_dt = datetime.combine(booking['departure_date'], (datetime.min + booking['departure_time']).time())
-    time_diff = departure_dt - datetime.now()
+    # Remaining time until departure (stored Flight.departure_ts).
+    time_diff = booking['departure_ts'] - datetime.now()
 
     # Cancellation policy: disallow cancellation within 36 hours of departure.
     if time_diff < timedelta(hours=36):
@@ -775,32 +3626,59 @@ def cancel_booking(booking_id):
             return redirect(request.referrer or url_for('my_bookings'))
 
         # Guests see the booking dashboard with their current seats.
-        seats_query = """
-            SELECT rs.row_num, rs.col_num, s.class
+        seats = db_manager.fetch_all_prepared('booking_seats', (booking_id,))
+        return render_template('booking_dashboard.html', booking=booking, seats=seats)
+
+    with db_manager.transaction() as cursor:
+        # Lock the booking and re-check that it is still Active: a concurrent cancel of the same booking
+        # waits here, then finds nothing to do (no second inventory release, no fee charged on the fee).
+        cursor.execute("""
+            SELECT total_price FROM Booking
+            WHERE booking_id = %s AND booking_status = 'Active'
+            FOR UPDATE
+        """, (booking_id,))
+        locked = cursor.fetchone()
+        if not locked:
+            flash("ההזמנה כבר בוטלה.", "info")
+            return redirect(url_for('my_bookings') if session.get('user_id') else url_for('index'))
+
+        # Calculate cancellation fee (5% of the original booking price).
+        original_price = float(locked['total_price'])
+        cancellation_fee = original_price * CANCELLATION_FEE_RATE
+
+        # Seats being released, per class, for the flight's seat inventory (rows locked until the DELETE).
+        cursor.execute("""
+            SELECT s.class
             FROM Reserved_Seat rs
             JOIN Seat s ON rs.aircraft_id = s.aircraft_id
-            AND rs.row_num = s.row_num
-            AND rs.col_num = s.col_num
+                       AND rs.row_num = s.row_num
+                       AND rs.col_num = s.col_num
             WHERE rs.booking_id = %s
-            ORDER BY rs.row_num, rs.col_num
-        """
-        seats = db_manager.fetch_all(seats_query, (booking_id,))
-        return render_template('booking_dashboard.html', booking=booking, seats=seats)
-
-    # Calculate cancellation fee (5% of the original booking price).
-    original_price = float(booking['total_price'])
-    cancellation_fee = original_price * 0.05
-
-    # Release all reserved seats for this booking (free them for other customers).
-    db_manager.execute_query("DELETE FROM Reserved_Seat WHERE booking_id = %s", (booking_id,))
-
-    # Update booking status and price (fee remains as the charged amount).
-    db_manager.execute_query("""
-        UPDATE Booking
-        SET booking_status = 'Cancelled by Customer',
-            total_price = %s
-        WHERE booking_id = %s
-    """, (cancellation_fee, booking_id))
+            FOR UPDATE OF rs
+        """, (booking_id,))
+        released = {}
+        for row in cursor.fetchall():
+            released[row['class']] = released.get(row['class'], 0) + 1
+
+        # Release all reserved seats for this booking (free them for other customers).
+        cursor.execute("DELETE FROM Reserved_Seat WHERE booking_id = %s", (booking_id,))
+
+        record_bookings_cancelled(cursor, "b.booking_id = %s", (booking_id,))
+        # The customer keeps paying the cancellation fee: refund the rest of every seat.
+        record_refunds(cursor, "b.booking_id = %s", (booking_id,), retained_share=CANCELLATION_FEE_RATE)
+
+        # Update booking status and price (fee remains as the charged amount).
+        cursor.execute("""
+            UPDATE Booking
+            SET booking_status = 'Cancelled by Customer',
+                total_price = %s
+            WHERE booking_id = %s
+        """, (cancellation_fee, booking_id))
+
+        # A Full flight becomes Active again once seats are released.
+        adjust_flight_inventory(cursor, booking['flight_id'], released, sign=-1)
+        sync_flight_occupancy(cursor, booking['flight_id'])
+    metrics.inc('flytau_cancellations_total', kind='booking')
 
     flash(f"ההזמנה בוטלה. חויבת בדמי ביטול של 5% ({cancellation_fee:.2f}₪).", "info")
 
@@ -809,13 +3687,7 @@ def cancel_booking(booking_id):
         return redirect(url_for('my_bookings'))
     else:
         # For guests, re-fetch the updated booking to reflect the new status/price in the UI.
-        updated_booking = db_manager.fetch_one("""
-            SELECT b.*, f.departure_date, f.departure_time, r.origin, r.destination
-            FROM Booking b
-            JOIN Flight f ON b.flight_id = f.flight_id
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE b.booking_id = %s
-        """, (booking_id,))
+        updated_booking = db_manager.fetch_one_prepared('booking_details', (booking_id,))
         return render_template('booking_dashboard.html', booking=updated_booking, seats=[])
 
 
@@ -838,7 +3710,7 @@ def add_flight():
 
     # Step 1: choose route + date/time
     if request.method == 'GET' or step == 1 or step == '1':
-        routes = db_manager.fetch_all("SELECT * FROM Route")
+        routes = db_manager.fetch_all_cached("SELECT * FROM Route")
         return render_template('manage_flights.html', step=1, routes=routes, min_date=today)
 
     # Step 2: check aircraft availability
@@ -852,40 +3724,10 @@ def add_flight():
             flash("שגיאה: מסלול לא נמצא", "error")
             return redirect(url_for('add_flight'))
 
-        duration_minutes = int(route['duration'])
-        flight_origin = route['origin']
-        is_long_flight = duration_minutes > 360
-
-        # Long flight -> only Big aircraft
-        size_filter = " AND a.size = 'Big' " if is_long_flight else ""
-
         new_start_dt = datetime.strptime(f"{flight_date} {flight_time}", '%Y-%m-%d %H:%M')
-        new_end_dt = new_start_dt + timedelta(minutes=duration_minutes)
-
-        time_query = f"""
-            SELECT a.* FROM Aircraft a
-            WHERE 1=1
-            {size_filter}
-            AND a.aircraft_id NOT IN (
-                SELECT f.aircraft_id FROM Flight f
-                JOIN Route r ON f.route_id = r.route_id
-                WHERE f.flight_status != 'Cancelled'
-                AND (
-                    TIMESTAMP(f.departure_date, f.departure_time) < %s
-                    AND
-                    ADDTIME(TIMESTAMP(f.departure_date, f.departure_time), SEC_TO_TIME(r.duration * 60)) > %s
-                )
-            )
-        """
 
-        all_time_available_aircrafts = db_manager.fetch_all(time_query, (new_end_dt, new_start_dt))
-
-        # Enforce location continuity for aircraft
-        final_aircrafts = []
-        if all_time_available_aircrafts:
-            for a in all_time_available_aircrafts:
-                if check_location_continuity(a['aircraft_id'], 'aircraft', flight_origin, new_start_dt):
-                    final_aircrafts.append(a)
+        # Size (long flight -> Big only), time overlap and location continuity in one query.
+        final_aircrafts = find_available_resources(route, new_start_dt, kinds=('aircraft',))['aircraft']
 
         return render_template(
             'manage_flights.html',
@@ -917,9 +3759,7 @@ def add_flight():
             flash("שגיאה: מסלול לא נמצא", "error")
             return redirect(url_for('add_flight'))
 
-        duration_minutes = int(route['duration'])
-        flight_origin = route['origin']
-        is_long_flight = duration_minutes > 360
+        is_long_flight = int(route['duration']) > 360
 
         # Long flight -> Big aircraft only (extra safety in case someone bypassed step 2)
         if is_long_flight and aircraft.get('size') != 'Big':
@@ -931,69 +3771,12 @@ def add_flight():
         req_attendants = 6 if aircraft['size'] == 'Big' else 3
 
         new_start_dt = datetime.strptime(f"{flight_date} {flight_time}", '%Y-%m-%d %H:%M')
-        new_end_dt = new_start_dt + timedelta(minutes=duration_minutes)
-
-        # Qualification filter:
-        # - Long flight: only qualified crew
-        # - Short flight: everyone
-        pilot_qual_filter = "AND p.is_qualified = 1" if is_long_flight else ""
-        attendant_qual_filter = "AND a.is_qualified = 1" if is_long_flight else ""
-
-        pilots_time_query = f"""
-            SELECT p.*
-            FROM Pilot p
-            WHERE 1=1
-              {pilot_qual_filter}
-              AND p.employee_id NOT IN (
-                  SELECT pf.employee_id
-                  FROM Pilots_on_Flights pf
-                  JOIN Flight f ON pf.flight_id = f.flight_id
-                  JOIN Route r ON f.route_id = r.route_id
-                  WHERE f.flight_status != 'Cancelled'
-                    AND (
-                        TIMESTAMP(f.departure_date, f.departure_time) < %s
-                        AND COALESCE(f.arrival_datetime,
-                            DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE)
-                        ) > %s
-                    )
-              )
-        """
-
-        attendants_time_query = f"""
-            SELECT a.*
-            FROM Flight_Attendant a
-            WHERE 1=1
-              {attendant_qual_filter}
-              AND a.employee_id NOT IN (
-                  SELECT af.employee_id
-                  FROM Flight_Attendant_on_Flights af
-                  JOIN Flight f ON af.flight_id = f.flight_id
-                  JOIN Route r ON f.route_id = r.route_id
-                  WHERE f.flight_status != 'Cancelled'
-                    AND (
-                        TIMESTAMP(f.departure_date, f.departure_time) < %s
-                        AND COALESCE(f.arrival_datetime,
-                            DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE)
-                        ) > %s
-                    )
-              )
-        """
 
-        pilots_time_ok = db_manager.fetch_all(pilots_time_query, (new_end_dt, new_start_dt))
-        attendants_time_ok = db_manager.fetch_all(attendants_time_query, (new_end_dt, new_start_dt))
-
-        # Enforce location continuity for crew
-        final_pilots = []
-        if pilots_time_ok:
-            for p in pilots_time_ok:
-                if check_location_continuity(p['employee_id'], 'pilot', flight_origin, new_start_dt):
-                    final_pilots.append(p)
-
-        final_attendants = []
-        if attendants_time_ok:
-            for a in attendants_time_ok:
-                if check_location_continuity(a['employee_id'], 'attendant', flight_origin, new_start_dt):
-                    final_attendants.append(a)
+        # Qualification (long flight -> qualified crew only), time overlap and location continuity,
+        # one query per crew type.
+        available = find_available_resources(route, new_start_dt, kinds=('pilots', 'attendants'))
+        final_pilots = available['pilots']
+        final_attendants = available['attendants']
 
         # Warn if not enough crew is available
         if len(final_pilots) < req_pilots or len(final_attendants) < req_attendants:
@@ -1030,7 +3813,7 @@ def add_flight():
                 return redirect(url_for('add_flight'))
 
             aircraft = db_manager.fetch_one("SELECT * FROM Aircraft WHERE aircraft_id = %s", (aircraft_id,))
-            route = db_manager.fetch_one("SELECT origin, duration FROM Route WHERE route_id = %s", (route_id,))
+            route = db_manager.fetch_one("SELECT origin, destination, duration FROM Route WHERE route_id = %s", (route_id,))
             if not aircraft or not route:
                 flash("שגיאה: נתוני מטוס/מסלול לא תקינים", "error")
                 return redirect(url_for('add_flight'))
@@ -1067,30 +3850,53 @@ def add_flight():
             new_start_dt = datetime.strptime(f"{flight_date} {flight_time}", '%Y-%m-%d %H:%M')
             new_end_dt = new_start_dt + timedelta(minutes=duration_minutes)
 
-            new_flight_id = db_manager.execute_query("""
-                INSERT INTO Flight (route_id, aircraft_id, departure_date, departure_time, arrival_datetime, flight_status, price_economy, price_business)
-                VALUES (%s, %s, %s, %s, %s, 'Active', %s, %s)
-            """, (route_id, aircraft_id, flight_date, flight_time, new_end_dt, price_eco, price_bus))
-
-            if not new_flight_id:
-                flash("שגיאה: לא נוצר flight_id לטיסה החדשה", "error")
-                return redirect(url_for('add_flight'))
+            # Flight, its seat inventory and crew assignments are created in one transaction.
+            # The resources were proposed by the (possibly stale) timeline: re-check them against the
+            # database first, serialized with other flight creation (scheduling_lock).
+            with scheduling_lock(), db_manager.transaction() as cursor:
+                for entity_type, ids in (('aircraft', [aircraft_id]), ('pilot', selected_pilots),
+                                         ('attendant', selected_attendants)):
+                    ids = set(ids)
+                    if len(_eligible_entities(entity_type, route['origin'], new_start_dt, new_end_dt,
+                                              ids=ids, cursor=cursor)) != len(ids):
+                        flash("שגיאה: המטוס או חלק מאנשי הצוות שובצו בינתיים לטיסה אחרת. אנא בחר שוב.", "error")
+                        return redirect(url_for('add_flight'))
+
+                cursor.execute("""
+                    INSERT INTO Flight (route_id, aircraft_id, departure_date, departure_time, arrival_datetime, flight_status, price_economy, price_business)
+                    VALUES (%s, %s, %s, %s, %s, 'Active', %s, %s)
+                """, (route_id, aircraft_id, flight_date, flight_time, new_end_dt, price_eco, price_bus))
+                new_flight_id = cursor.lastrowid
+
+                if not new_flight_id:
+                    raise mysql.connector.Error("לא נוצר flight_id לטיסה החדשה")
+
+                create_flight_inventory(cursor, new_flight_id, aircraft_id)
+
+                for pid in selected_pilots:
+                    cursor.execute(
+                        "INSERT INTO Pilots_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
+                        (new_flight_id, pid)
+                    )
 
-            for pid in selected_pilots:
-                db_manager.execute_query(
-                    "INSERT INTO Pilots_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
-                    (new_flight_id, pid)
-                )
+                for aid in selected_attendants:
+                    cursor.execute(
+                        "INSERT INTO Flight_Attendant_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
+                        (new_flight_id, aid)
+                    )
 
-            for aid in selected_attendants:
-                db_manager.execute_query(
-                    "INSERT INTO Flight_Attendant_on_Flights (flight_id, employee_id) VALUES (%s, %s)",
-                    (new_flight_id, aid)
-                )
+            # Keep the in-memory resource timeline current, and let the status scheduler
+            # queue the new departure right away.
+            resource_timeline.add_flight(new_flight_id, aircraft_id, selected_pilots, selected_attendants,
+                                         new_start_dt, new_end_dt, route['destination'])
+            status_scheduler.wake()
 
             flash("הטיסה נוצרה בהצלחה!", "success")
             return redirect(url_for('index'))
 
+        except SchedulingBusyError:
+            flash("מערכת השיבוץ עסוקה כרגע ביצירת טיסות, אנא נסה שוב בעוד מספר שניות.", "error")
+            return redirect(url_for('add_flight'))
         except Exception as e:
             flash(f"שגיאה ביצירת הטיסה: {str(e)}", "error")
             return redirect(url_for('add_flight'))
@@ -1099,6 +3905,64 @@ def add_flight():
 
 
 
+@app.route('/manager/bulk_schedule', methods=['POST'])
+def bulk_schedule():
+    """
+    Creates a recurring schedule in one request (see schedule_recurring) and returns a JSON report.
+
+    Inputs (form fields or JSON body):
+    - route_id, rule (e.g. "FREQ=DAILY;UNTIL=20260831"), start_date (YYYY-MM-DD), time (HH:MM)
+    - price_eco, price_bus (optional)
+    - return_route_id, turnaround_minutes (optional, schedule the way back with the same aircraft/crew)
+    """
+    if session.get('role') != 'manager':
+        return redirect(url_for('index'))
+
+    data = request.get_json(silent=True) or request.form
+    try:
+        report = schedule_recurring(
+            route_id=int(data.get('route_id')),
+            rule=data.get('rule', ''),
+            start_date=datetime.strptime(data.get('start_date'), '%Y-%m-%d').date(),
+            departure_time=data.get('time'),
+            price_economy=data.get('price_eco'),
+            price_business=data.get('price_bus', 0),
+            return_route_id=int(data['return_route_id']) if data.get('return_route_id') else None,
+            turnaround_minutes=int(data.get('turnaround_minutes', 90)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except SchedulingBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(report)
+
+
+@app.cli.command('bulk-schedule')
+@click.option('--route', 'route_id', type=int, required=True, help="Outbound route id")
+@click.option('--rule', required=True, help='Recurrence, e.g. "FREQ=DAILY;UNTIL=20260831"')
+@click.option('--start', 'start_date', required=True, help="First date (YYYY-MM-DD)")
+@click.option('--time', 'departure_time', required=True, help="Departure time (HH:MM)")
+@click.option('--price-eco', required=True, type=float)
+@click.option('--price-bus', default=0, type=float)
+@click.option('--return-route', 'return_route_id', type=int, default=None, help="Return route id (optional)")
+@click.option('--turnaround', 'turnaround_minutes', type=int, default=90, help="Minutes between legs")
+@click.option('--batch-size', type=int, default=50, help="Occurrences per transaction")
+def bulk_schedule_command(route_id, rule, start_date, departure_time, price_eco, price_bus,
+                          return_route_id, turnaround_minutes, batch_size):
+    """Create a recurring schedule with automatic aircraft and crew assignment."""
+    try:
+        report = schedule_recurring(
+            route_id, rule, datetime.strptime(start_date, '%Y-%m-%d').date(), departure_time,
+            price_eco, price_bus, return_route_id=return_route_id,
+            turnaround_minutes=turnaround_minutes, batch_size=batch_size,
+        )
+    except SchedulingBusyError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{report['occurrences']} occurrences, {report['created_flights']} flights created.")
+    for item in report['unstaffed']:
+        click.echo(f"  not scheduled {item['date']}: {item['reason']}")
+
+
 @app.route('/manager/add_aircraft', methods=['GET', 'POST'])
 def add_aircraft():
     """
@@ -1297,37 +4161,49 @@ def cancel_flight(flight_id):
         flash('טיסה לא נמצאה', 'danger')
         return redirect(url_for('index'))
 
-    # Calculate time until departure
-    flight_dt = datetime.combine(
-        flight['departure_date'],
-        (datetime.min + flight['departure_time']).time()
-    )
+    # Departure datetime (stored Flight.departure_ts)
+    flight_dt = flight['departure_ts']
 
     # Enforce 72-hour cancellation policy
     if flight_dt - datetime.now() < timedelta(hours=72):
         flash('לא ניתן לבטל טיסה פחות מ-72 שעות לפני ההמראה.', 'danger')
         return redirect(url_for('index'))
 
-    # Cancel the flight
-    db_manager.execute_query(
-        "UPDATE Flight SET flight_status = 'Cancelled' WHERE flight_id = %s",
-        (flight_id,)
-    )
+    with db_manager.transaction() as cursor:
+        # Report summaries first: they only count flights / bookings not cancelled yet.
+        record_flight_cancelled(cursor, flight_id)
+        record_bookings_cancelled(cursor, "b.flight_id = %s AND b.booking_status = 'Active'", (flight_id,))
+        record_refunds(cursor, "b.flight_id = %s AND b.booking_status = 'Active'", (flight_id,))
 
-    # Cancel all active bookings related to this flight
-    db_manager.execute_query("""
-        UPDATE Booking
-        SET booking_status = 'Cancelled by System',
-            total_price = 0
-        WHERE flight_id = %s AND booking_status = 'Active'
-    """, (flight_id,))
+        # Cancel the flight
+        cursor.execute(
+            "UPDATE Flight SET flight_status = 'Cancelled' WHERE flight_id = %s",
+            (flight_id,)
+        )
 
-    # Remove all reserved seats for the cancelled flight
-    db_manager.execute_query("""
-        DELETE rs FROM Reserved_Seat rs
-        INNER JOIN Booking b ON rs.booking_id = b.booking_id
-        WHERE b.flight_id = %s
-    """, (flight_id,))
+        # Cancel all active bookings related to this flight
+        cursor.execute("""
+            UPDATE Booking
+            SET booking_status = 'Cancelled by System',
+                total_price = 0
+            WHERE flight_id = %s AND booking_status = 'Active'
+        """, (flight_id,))
+        cancelled_bookings = cursor.rowcount
+
+        # Remove all reserved seats for the cancelled flight
+        cursor.execute("""
+            DELETE rs FROM Reserved_Seat rs
+            INNER JOIN Booking b ON rs.booking_id = b.booking_id
+            WHERE b.flight_id = %s
+        """, (flight_id,))
+
+        # All seats are free again in the inventory.
+        cursor.execute("UPDATE Flight_Inventory SET booked_seats = 0 WHERE flight_id = %s", (flight_id,))
+    metrics.inc('flytau_cancellations_total', kind='flight')
+    metrics.inc('flytau_cancellations_total', cancelled_bookings, kind='flight_booking')
+
+    # The aircraft and crew of this flight are free again.
+    resource_timeline.remove_flight(flight_id)
 
     flash('הטיסה בוטלה וכל ההזמנות בוטלו ללא חיוב.', 'success')
     return redirect(url_for('index'))
@@ -1341,107 +4217,99 @@ def reports():
     Reports included:
     1. Monthly aircraft utilization and dominant route
     2. Monthly booking cancellation rate
-    3. Revenue by aircraft size, manufacturer and seat class
+    3. Revenue by aircraft size, manufacturer and seat class (query args revenue_from / revenue_to)
     4. Average occupancy rate for performed flights
+
+    Reports 1, 2 and 4 come from the incrementally maintained Report_* summary tables (report 1's
+    current month from Flight), report 3 from the Revenue_Ledger.
     """
     # Access control: only managers can view reports
     if session.get('role') != 'manager':
         return redirect(url_for('index'))
 
-    # Report 1: Monthly summary per aircraft
+    # Reports 1, 2 and 4 read the summary tables maintained on every status change
+    # (see record_flights_performed & co.; rebuilt with `flask reports-backfill`).
+
+    # Report 1: Monthly summary per aircraft, with the most frequent performed route of the month,
+    # over the flights departing up to today (every flight of an aircraft-month counts, so months
+    # with only active flights still show). Past months read the summary tables; the current month
+    # is aggregated from Flight (a range on idx_flight_departure_ts), because its summary row also
+    # holds cancellations of flights departing later this month.
     query1 = """
+        SELECT
+            m.aircraft_id,
+            m.month AS Month,
+            m.flights_performed AS Flights_Performed,
+            m.flights_cancelled AS Flights_Cancelled,
+            ROUND((m.performed_minutes / 60.0) / (30 * 24) * 100, 2) AS Utilization_Pct,
+            dr.route AS Dominant_Route
+        FROM Report_Aircraft_Month m
+        LEFT JOIN (
+            SELECT aircraft_id, month, CONCAT(origin, '-', destination) AS route,
+                   ROW_NUMBER() OVER (PARTITION BY aircraft_id, month
+                                      ORDER BY flights DESC, origin, destination) AS rn
+            FROM Report_Aircraft_Month_Route
+        ) dr ON dr.aircraft_id = m.aircraft_id AND dr.month = m.month AND dr.rn = 1
+        WHERE m.month < DATE_FORMAT(CURRENT_DATE(), '%Y-%m')
+
+        UNION ALL
+
         SELECT
             Stats.aircraft_id,
             Stats.Month,
             Stats.Flights_Performed,
             Stats.Flights_Cancelled,
-            ROUND((Stats.performed_minutes / 60.0) / (30 * 24) * 100, 2) AS Utilization_Pct,
+            ROUND((Stats.performed_minutes / 60.0) / (30 * 24) * 100, 2),
             (SELECT CONCAT(r.origin, '-', r.destination)
-             FROM Flight as f
-             JOIN Route as r ON f.route_id = r.route_id
+             FROM Flight f
+             JOIN Route r ON f.route_id = r.route_id
              WHERE f.aircraft_id = Stats.aircraft_id
-               AND DATE_FORMAT(f.departure_date, '%Y-%m') = Stats.Month
+               AND f.departure_ts >= DATE_FORMAT(CURRENT_DATE(), '%Y-%m-01')
+               AND f.departure_ts < CURRENT_DATE() + INTERVAL 1 DAY
                AND f.flight_status = 'Performed'
              GROUP BY r.origin, r.destination
-             ORDER BY COUNT(*) DESC
-             LIMIT 1) AS Dominant_Route
+             ORDER BY COUNT(*) DESC, r.origin, r.destination
+             LIMIT 1)
         FROM (
             SELECT
                 f.aircraft_id,
-                DATE_FORMAT(f.departure_date, '%Y-%m') AS Month,
-                SUM(CASE WHEN f.flight_status = 'Performed' THEN 1 ELSE 0 END) AS Flights_Performed,
-                SUM(CASE WHEN f.flight_status LIKE 'Cancel%' THEN 1 ELSE 0 END) AS Flights_Cancelled,
+                DATE_FORMAT(CURRENT_DATE(), '%Y-%m') AS Month,
+                SUM(f.flight_status = 'Performed') AS Flights_Performed,
+                SUM(f.flight_status LIKE 'Cancel%') AS Flights_Cancelled,
                 COALESCE(SUM(CASE WHEN f.flight_status = 'Performed' THEN r.duration ELSE 0 END), 0) AS performed_minutes
-            FROM Flight as f
-            JOIN Route as r ON f.route_id = r.route_id
-            WHERE f.departure_date <= CURRENT_DATE()
-            GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m')
+            FROM Flight f
+            JOIN Route r ON f.route_id = r.route_id
+            WHERE f.departure_ts >= DATE_FORMAT(CURRENT_DATE(), '%Y-%m-01')
+              AND f.departure_ts < CURRENT_DATE() + INTERVAL 1 DAY
+            GROUP BY f.aircraft_id
         ) Stats
-        ORDER BY Stats.Month DESC, Stats.aircraft_id
+
+        ORDER BY Month DESC, aircraft_id
     """
-    report1_data = db_manager.fetch_all(query1) or []
+    report1_data = db_manager.fetch_all(query1, row_factory='record') or []
 
     # Report 2: Monthly booking cancellation rate
     query2 = """
         SELECT
-            DATE_FORMAT(booking_datetime, '%Y-%m') AS Booking_Month,
-            COUNT(*) AS Total_Bookings,
-            SUM(CASE WHEN booking_status LIKE 'Cancel%' THEN 1 ELSE 0 END) AS Cancelled_Count,
-            ROUND(
-                (SUM(CASE WHEN booking_status LIKE 'Cancel%' THEN 1 ELSE 0 END) / COUNT(*)) * 100,
-                2
-            ) AS Cancellation_Rate
-        FROM Booking
-        GROUP BY DATE_FORMAT(booking_datetime, '%Y-%m')
-        ORDER BY Booking_Month DESC
-    """
-    report2_data = db_manager.fetch_all(query2) or []
-
-    # Report 3: Revenue by aircraft and seat class
-    query3 = """
-        SELECT
-            A.size AS Size,
-            A.manufacturer AS Manufacturer,
-            S.class AS Class,
-            COALESCE(SUM(
-                CASE
-                    WHEN S.class = 'Economy' THEN F.price_economy
-                    WHEN S.class = 'Business' THEN F.price_business
-                    ELSE 0
-                END
-            ), 0) AS Total_Revenue
-        FROM Aircraft AS A
-        JOIN Seat AS S ON A.aircraft_id = S.aircraft_id
-        LEFT JOIN Reserved_Seat RS
-               ON S.aircraft_id = RS.aircraft_id
-              AND S.row_num = RS.row_num
-              AND S.col_num = RS.col_num
-        LEFT JOIN Booking AS B
-               ON RS.booking_id = B.booking_id
-              AND B.booking_status IN ('Active', 'Performed', 'Cancelled by Customer')
-        LEFT JOIN Flight AS F ON B.flight_id = F.flight_id
-        GROUP BY A.size, A.manufacturer, S.class
-        ORDER BY Total_Revenue DESC
+            booking_month AS Booking_Month,
+            total_bookings AS Total_Bookings,
+            cancelled_bookings AS Cancelled_Count,
+            ROUND((cancelled_bookings / total_bookings) * 100, 2) AS Cancellation_Rate
+        FROM Report_Booking_Month
+        ORDER BY booking_month DESC
     """
-    report3_data = db_manager.fetch_all(query3) or []
+    report2_data = db_manager.fetch_all(query2, row_factory='record') or []
+
+    # Report 3: Revenue by aircraft and seat class, from the revenue ledger (prices actually paid),
+    # optionally limited to flights departing in a date range.
+    revenue_from = request.args.get('revenue_from') or None
+    revenue_to = request.args.get('revenue_to') or None
+    report3_data = revenue_by_aircraft_class(revenue_from, revenue_to) or []
 
     # Report 4: Average occupancy rate for performed flights
     query4 = """
         SELECT AVG((occupied_seats * 100.0) / total_seats) AS average_occupancy
-        FROM (
-            SELECT
-                f.flight_id,
-                (SELECT COUNT(*)
-                 FROM Seat AS s
-                 WHERE s.aircraft_id = f.aircraft_id) AS total_seats,
-                (SELECT COUNT(*)
-                 FROM Reserved_Seat rs
-                 JOIN Booking b ON rs.booking_id = b.booking_id
-                 WHERE b.flight_id = f.flight_id
-                   AND b.booking_status = 'Performed') AS occupied_seats
-            FROM Flight f
-            WHERE f.flight_status = 'Performed'
-        ) AS calc_table
+        FROM Report_Flight_Occupancy
     """
     report4_row = db_manager.fetch_one(query4) or {}
     average_occupancy = report4_row.get('average_occupancy')
@@ -1451,10 +4319,279 @@ def reports():
         report1=report1_data,
         report2=report2_data,
         report3=report3_data,
+        revenue_from=revenue_from,
+        revenue_to=revenue_to,
         average_occupancy=average_occupancy
     )
 
 
+# Streamed exports (see export_rows / manager_export). Each SQL has a {where} slot filled from the
+# request's date_from / date_to / status filters, applied to the `date` / `status` columns
+# (`month`: the date column holds 'YYYY-MM' strings; `timestamp`: it is a DATETIME, filtered by whole days).
+EXPORTS = {
+    'aircraft_monthly': {
+        'sql': """
+            SELECT m.aircraft_id, m.month, m.flights_performed, m.flights_cancelled,
+                   ROUND((m.performed_minutes / 60.0) / (30 * 24) * 100, 2) AS utilization_pct,
+                   (SELECT CONCAT(mr.origin, '-', mr.destination)
+                    FROM Report_Aircraft_Month_Route mr
+                    WHERE mr.aircraft_id = m.aircraft_id AND mr.month = m.month
+                    ORDER BY mr.flights DESC, mr.origin, mr.destination
+                    LIMIT 1) AS dominant_route
+            FROM Report_Aircraft_Month m
+            {where}
+            ORDER BY m.month DESC, m.aircraft_id
+        """,
+        'date': 'm.month', 'month': True, 'timestamp': False, 'status': None,
+    },
+    'booking_cancellations': {
+        'sql': """
+            SELECT booking_month, total_bookings, cancelled_bookings,
+                   ROUND((cancelled_bookings / total_bookings) * 100, 2) AS cancellation_rate
+            FROM Report_Booking_Month
+            {where}
+            ORDER BY booking_month DESC
+        """,
+        'date': 'booking_month', 'month': True, 'timestamp': False, 'status': None,
+    },
+    'revenue': {
+        'sql': """
+            SELECT aircraft_size, manufacturer, seat_class, COALESCE(SUM(amount), 0) AS total_revenue
+            FROM Revenue_Ledger
+            {where}
+            GROUP BY aircraft_size, manufacturer, seat_class
+            ORDER BY total_revenue DESC
+        """,
+        'date': 'departure_date', 'month': False, 'timestamp': False, 'status': None,
+    },
+    'occupancy': {
+        'sql': """
+            SELECT o.flight_id, f.departure_date, r.origin, r.destination, o.total_seats, o.occupied_seats,
+                   ROUND(o.occupied_seats * 100.0 / o.total_seats, 2) AS occupancy_pct
+            FROM Report_Flight_Occupancy o
+            JOIN Flight f ON o.flight_id = f.flight_id
+            JOIN Route r ON f.route_id = r.route_id
+            {where}
+            ORDER BY f.departure_ts DESC, o.flight_id DESC
+        """,
+        'date': 'f.departure_ts', 'month': False, 'timestamp': True, 'status': None,
+    },
+    'flights': {
+        'sql': f"""
+            SELECT f.flight_id, f.departure_date, f.departure_time, f.arrival_datetime, f.flight_status,
+                   r.origin, r.destination, r.duration, f.aircraft_id, f.price_economy, f.price_business,
+                   {AVAILABLE_SEATS_SQL} AS available_seats
+            FROM Flight f
+            JOIN Route r ON f.route_id = r.route_id
+            {{where}}
+            ORDER BY f.departure_ts DESC, f.flight_id DESC
+        """,
+        'date': 'f.departure_ts', 'month': False, 'timestamp': True, 'status': 'f.flight_status',
+    },
+    'bookings': {
+        'sql': """
+            SELECT b.booking_id, b.email, b.booking_datetime, b.booking_status, b.total_price,
+                   f.flight_id, f.departure_date, f.departure_time, r.origin, r.destination,
+                   (SELECT GROUP_CONCAT(CONCAT(rs.row_num, rs.col_num) ORDER BY rs.row_num, rs.col_num SEPARATOR ' ')
+                    FROM Reserved_Seat rs
+                    WHERE rs.booking_id = b.booking_id) AS seats
+            FROM Booking b
+            JOIN Flight f ON b.flight_id = f.flight_id
+            JOIN Route r ON f.route_id = r.route_id
+            {where}
+            ORDER BY b.booking_datetime DESC
+        """,
+        'date': 'f.departure_ts', 'month': False, 'timestamp': True, 'status': 'b.booking_status',
+    },
+}
+
+
+def _export_value(value):
+    """Plain CSV/JSON value for a DB column (dates as ISO strings, TIME as HH:MM:SS, decimals as numbers)."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if value is not None and not isinstance(value, (int, float, str)):
+        return float(value)  # Decimal
+    return value
+
+
+def export_rows(name, args, extra_conditions=(), extra_params=()):
+    """Row generator for an EXPORTS entry, filtered by args date_from / date_to / status."""
+    export = EXPORTS[name]
+    conditions, params = list(extra_conditions), list(extra_params)
+    for arg, op in (('date_from', '>='), ('date_to', '<=')):
+        if not args.get(arg):
+            continue
+        if export['timestamp']:
+            # Timestamp column: whole days as a range (date_to includes that day); invalid dates are ignored.
+            day = day_range(args[arg])
+            if day:
+                conditions.append(f"{export['date']} {'>=' if arg == 'date_from' else '<'} %s")
+                params.append(day[0] if arg == 'date_from' else day[1])
+            continue
+        value = "DATE_FORMAT(%s, '%Y-%m')" if export['month'] else "%s"
+        conditions.append(f"{export['date']} {op} {value}")
+        params.append(args[arg])
+    if export['status'] and args.get('status'):
+        conditions.append(f"{export['status']} = %s")
+        params.append(args['status'])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return db_manager.fetch_iter(export['sql'].format(where=where), tuple(params))
+
+
+def stream_export(rows, fmt, filename, chunk_rows=500):
+    """
+    Chunked HTTP response for a row generator, as CSV (header from the first row) or a JSON array.
+    Rows are serialized chunk_rows at a time, so neither the rows nor the body are ever held in memory.
+    """
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = None
+        for i, row in enumerate(rows, 1):
+            if writer is None:
+                writer = csv.writer(buffer)
+                writer.writerow(row.keys())
+            writer.writerow([_export_value(v) for v in row.values()])
+            if i % chunk_rows == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def generate_json():
+        yield '['
+        parts = []
+        for i, row in enumerate(rows):
+            parts.append(('\n' if i == 0 else ',\n') +
+                         json.dumps({k: _export_value(v) for k, v in row.items()}, ensure_ascii=False))
+            if len(parts) >= chunk_rows:
+                yield ''.join(parts)
+                parts = []
+        yield ''.join(parts) + '\n]\n'
+
+    if fmt == 'json':
+        body, mimetype = generate_json(), 'application/json'
+    else:
+        fmt, body, mimetype = 'csv', generate_csv(), 'text/csv'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
+
+@app.route('/manager/export/<name>')
+def manager_export(name):
+    """
+    Streams a report or the flight / booking history as CSV or JSON (?format=csv|json).
+
+    - name: aircraft_monthly, booking_cancellations, revenue, occupancy (the reports page),
+      flights (the manager flight list) or bookings (?email= for one customer's history).
+    - Filters: date_from / date_to (departure date, or month for the monthly reports), status.
+    """
+    if session.get('role') != 'manager':
+        return redirect(url_for('index'))
+    if name not in EXPORTS:
+        return render_template('404.html'), 404
+
+    conditions, params = [], []
+    if name == 'bookings' and request.args.get('email'):
+        conditions.append("b.email = %s")
+        params.append(request.args['email'])
+    rows = export_rows(name, request.args, conditions, params)
+    return stream_export(rows, request.args.get('format', 'csv'), f"flytau_{name}")
+
+
+@app.route('/my_bookings/export')
+def my_bookings_export():
+    """Streams the logged-in customer's booking history as CSV or JSON (same filters as manager_export)."""
+    if not session.get('user_id'):
+        return redirect(url_for('login'))
+    rows = export_rows('bookings', request.args, ["b.email = %s"], [session['user_id']])
+    return stream_export(rows, request.args.get('format', 'csv'), "flytau_my_bookings")
+
+
+@app.route('/manager/stats')
+def manager_stats():
+    """
+    Operational counters for managers, as JSON:
+    - db_pool: connection pool usage (see ConnectionPool.stats)
+    - db_routing: reads served by the primary / replicas and per replica its state and pool usage
+    - seat_holds: hold acquisition latency and hold -> booking conversion (see SeatHoldStats)
+    - resource_timeline: size / age / last build time of the scheduling index (see ResourceTimeline)
+    - query_cache: hit / miss / eviction / invalidation counters (see QueryCache)
+    - prepared_statements: prepares / executions of the registered statements (see DBManager.register_statement)
+    - singleflight: flight list executions and requests coalesced onto them (see SingleFlight)
+    - queries: per-route query counts / DB time and the recent slow queries (see QueryInstrumentation)
+    """
+    if session.get('role') != 'manager':
+        return redirect(url_for('index'))
+
+    return jsonify({
+        'db_pool': db_manager.pool.stats(),
+        'db_routing': db_manager.routing_stats(),
+        'seat_holds': seat_hold_stats.snapshot(),
+        'resource_timeline': resource_timeline.stats(),
+        'query_cache': db_manager.cache.stats(),
+        'prepared_statements': db_manager.prepared_stats(),
+        'singleflight': flight_coalescer.stats(),
+        'queries': db_manager.instrumentation.stats(),
+    })
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint (text exposition format, see Metrics):
+    - flytau_http_request_duration_seconds{endpoint, step}: request latency histograms
+    - flytau_db_query_duration_seconds{statement}: statement latency per query fingerprint
+    - flytau_update_statuses_duration_seconds, flytau_flights_performed_total: status maintenance
+    - flytau_bookings_created_total, flytau_seats_reserved_total, flytau_cancellations_total{kind}
+    - flytau_db_pool_*, flytau_db_reads_total{target}, flytau_query_cache_*, flytau_seat_hold_*,
+      flytau_singleflight_requests_total{outcome}: sampled from the components' stats()
+
+    Not tied to a manager session (scrapers have none); protected by METRICS_TOKEN when it is set.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(request.headers.get('Authorization', ''),
+                                                    f"Bearer {METRICS_TOKEN}"):
+        return Response("unauthorized\n", status=401, mimetype='text/plain')
+
+    pool = db_manager.pool.stats()
+    routing = db_manager.routing_stats()
+    cache = db_manager.cache.stats()
+    holds = seat_hold_stats.snapshot()
+    coalescing = flight_coalescer.stats()
+    sampled = [
+        ('flytau_db_pool_connections', 'gauge', "Pooled connections by state",
+         [({'state': state}, pool[state]) for state in ('open', 'idle', 'in_use')]),
+        ('flytau_db_pool_size', 'gauge', "Maximum pooled connections", [({}, pool['size'])]),
+        ('flytau_db_pool_utilization', 'gauge', "Borrowed connections / pool size",
+         [({}, round(pool['in_use'] / pool['size'], 4) if pool['size'] else 0)]),
+        ('flytau_db_pool_events_total', 'counter', "Pool events (borrows, waits, timeouts, reconnects...)",
+         [({'event': event}, pool[event]) for event in
+          ('created', 'closed', 'borrowed', 'waits', 'timeouts', 'health_check_failures', 'expired')]),
+        ('flytau_db_reads_total', 'counter', "Reads by target (primary / replica, see DB_REPLICAS)",
+         [({'target': 'primary'}, routing['primary_reads']), ({'target': 'replica'}, routing['replica_reads'])]),
+        ('flytau_db_replica_failures_total', 'counter', "Replica connection failures (replica skipped for a while)",
+         [({}, routing['replica_failures'])]),
+        ('flytau_query_cache_entries', 'gauge', "Entries in the query cache", [({}, cache['entries'])]),
+        ('flytau_query_cache_events_total', 'counter', "Query cache lookups and removals",
+         [({'event': event}, cache[event]) for event in
+          ('hits', 'misses', 'evictions', 'expirations', 'invalidations')]),
+        ('flytau_seat_hold_events_total', 'counter', "Seat hold outcomes (see SeatHoldStats)",
+         [({'event': event}, holds[event]) for event in
+          ('holds_acquired', 'hold_conflicts', 'holds_converted', 'holds_reaped')]),
+        ('flytau_singleflight_requests_total', 'counter',
+         "Flight list requests (index / search) by outcome: executed, or coalesced onto another execution",
+         [({'outcome': outcome}, coalescing[outcome]) for outcome in
+          ('executions', 'coalesced', 'coalesced_shared', 'timeouts')]),
+    ]
+    return Response(metrics.render(sampled), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/manage_booking_guest', methods=['GET', 'POST'])
 def manage_booking_guest():
     """
@@ -1470,31 +4607,12 @@ def manage_booking_guest():
         booking_id = request.form.get('booking_id')
         email = request.form.get('email')
 
-        # Fetch active booking matching booking ID and email
-        query = """
-            SELECT b.*, f.departure_date, f.departure_time, r.origin, r.destination
-            FROM Booking b
-            JOIN Flight f ON b.flight_id = f.flight_id
-            JOIN Route r ON f.route_id = r.route_id
-            WHERE b.booking_id = %s
-              AND b.email = %s
-              AND b.booking_status = 'Active'
-        """
-        booking = db_manager.fetch_one(query, (booking_id, email))
+        # Fetch active booking matching booking ID and email (prepared statement 'guest_booking').
+        booking = db_manager.fetch_one_prepared('guest_booking', (booking_id, email))
 
         if booking:
             # Retrieve reserved seats for the booking
-            seats_query = """
-                SELECT rs.row_num, rs.col_num, s.class
-                FROM Reserved_Seat rs
-                JOIN Seat s
-                  ON rs.aircraft_id = s.aircraft_id
-                 AND rs.row_num = s.row_num
-                 AND rs.col_num = s.col_num
-                WHERE rs.booking_id = %s
-                ORDER BY rs.row_num, rs.col_num
-            """
-            seats = db_manager.fetch_all(seats_query, (booking_id,))
+            seats = db_manager.fetch_all_prepared('booking_seats', (booking_id,))
             return render_template('booking_dashboard.html', booking=booking, seats=seats)
         else:
             flash('פרטי ההזמנה שגויים או לא נמצאו.', 'danger')
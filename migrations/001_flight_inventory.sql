@@ -0,0 +1,30 @@
+-- Per-flight seat inventory, maintained by booking_summary / cancel_booking / cancel_flight.
+-- booked_seats counts the Reserved_Seat rows of the flight (cancelled bookings release theirs).
+
+CREATE TABLE `Flight_Inventory` (
+  `flight_id` int NOT NULL,
+  `seat_class` varchar(20) NOT NULL,
+  `total_seats` int NOT NULL,
+  `booked_seats` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`flight_id`,`seat_class`),
+  CONSTRAINT `flight_inventory_ibfk_1` FOREIGN KEY (`flight_id`) REFERENCES `Flight` (`flight_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Backfill from the existing seat maps and reservations.
+INSERT INTO Flight_Inventory (flight_id, seat_class, total_seats, booked_seats)
+SELECT f.flight_id, s.class, COUNT(*), 0
+FROM Flight f
+JOIN Seat s ON s.aircraft_id = f.aircraft_id
+GROUP BY f.flight_id, s.class;
+
+UPDATE Flight_Inventory fi
+JOIN (
+    SELECT b.flight_id, s.class AS seat_class, COUNT(*) AS booked_seats
+    FROM Reserved_Seat rs
+    JOIN Booking b ON rs.booking_id = b.booking_id
+    JOIN Seat s ON s.aircraft_id = rs.aircraft_id
+               AND s.row_num = rs.row_num
+               AND s.col_num = rs.col_num
+    GROUP BY b.flight_id, s.class
+) calc ON calc.flight_id = fi.flight_id AND calc.seat_class = fi.seat_class
+SET fi.booked_seats = calc.booked_seats;
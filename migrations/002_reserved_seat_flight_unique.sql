@@ -0,0 +1,14 @@
+-- Reserved_Seat gets the flight it belongs to, so a seat can be unique per flight.
+-- Two concurrent bookings for the same (flight, row, col) now fail with a duplicate-key error.
+-- (If historical data already contains a double-sold seat, the unique key below fails: fix those rows first.)
+
+ALTER TABLE Reserved_Seat ADD COLUMN `flight_id` int NULL AFTER `booking_id`;
+
+UPDATE Reserved_Seat rs
+JOIN Booking b ON rs.booking_id = b.booking_id
+SET rs.flight_id = b.flight_id;
+
+ALTER TABLE Reserved_Seat
+  MODIFY `flight_id` int NOT NULL,
+  ADD UNIQUE KEY `uq_reserved_seat_flight` (`flight_id`,`row_num`,`col_num`),
+  ADD CONSTRAINT `reserved_seat_ibfk_3` FOREIGN KEY (`flight_id`) REFERENCES `Flight` (`flight_id`);
@@ -0,0 +1,15 @@
+-- Short-lived seat holds between seat selection (book_flight) and confirmation (booking_summary).
+-- One row per held seat; the primary key lets a seat be held by one session token at a time.
+
+CREATE TABLE `Seat_Hold` (
+  `flight_id` int NOT NULL,
+  `row_num` int NOT NULL,
+  `col_num` varchar(1) NOT NULL,
+  `hold_token` varchar(32) NOT NULL,
+  `expires_at` datetime NOT NULL,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`flight_id`,`row_num`,`col_num`),
+  KEY `hold_token` (`hold_token`),
+  KEY `expires_at` (`expires_at`),
+  CONSTRAINT `seat_hold_ibfk_1` FOREIGN KEY (`flight_id`) REFERENCES `Flight` (`flight_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
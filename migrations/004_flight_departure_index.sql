@@ -0,0 +1,17 @@
+-- Indexes for keyset pagination of the flight lists (index / search).
+-- Pages are ordered by the departure timestamp and flight_id and continue from the last row seen,
+-- so every page is a short range scan on one of these indexes regardless of table size.
+--
+-- departure_ts is generated from departure_date + departure_time (so it can never drift), which keeps
+-- time predicates plain ranges on an indexed column (see also 007_flight_timestamps.sql).
+
+ALTER TABLE Flight
+  ADD COLUMN `departure_ts` datetime GENERATED ALWAYS AS (TIMESTAMP(`departure_date`, `departure_time`)) STORED NOT NULL AFTER `departure_time`;
+
+-- Flight lists (keyset pagination on (departure_ts, flight_id)), search by day, exports.
+CREATE INDEX `idx_flight_departure_ts` ON `Flight` (`departure_ts`, `flight_id`);
+
+-- Status maintenance (flight_status IN ('Active', 'Full') AND departure_ts <= NOW()), the scheduler's
+-- departure queue and the customer lists (flight_status = 'Active' AND departure_ts >= today):
+-- equality on status, then the same ordering.
+CREATE INDEX `idx_flight_status_departure_ts` ON `Flight` (`flight_status`, `departure_ts`, `flight_id`);
@@ -0,0 +1,75 @@
+-- Summary tables behind /manager/reports, maintained incrementally:
+-- - flights becoming Performed / Cancelled (mark_flights_performed, cancel_flight)
+-- - bookings created / cancelled (create_booking, cancel_booking, cancel_flight)
+-- `flask --app main reports-backfill` rebuilds them from history.
+
+-- Report 1: per aircraft and departure month.
+CREATE TABLE `Report_Aircraft_Month` (
+  `aircraft_id` int NOT NULL,
+  `month` char(7) NOT NULL,
+  `flights_performed` int NOT NULL DEFAULT '0',
+  `flights_cancelled` int NOT NULL DEFAULT '0',
+  `performed_minutes` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`aircraft_id`,`month`),
+  KEY `month` (`month`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Report 1 (dominant route): performed flights per aircraft, month and route.
+CREATE TABLE `Report_Aircraft_Month_Route` (
+  `aircraft_id` int NOT NULL,
+  `month` char(7) NOT NULL,
+  `origin` varchar(3) NOT NULL,
+  `destination` varchar(3) NOT NULL,
+  `flights` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`aircraft_id`,`month`,`origin`,`destination`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Report 2: per booking month.
+CREATE TABLE `Report_Booking_Month` (
+  `booking_month` char(7) NOT NULL,
+  `total_bookings` int NOT NULL DEFAULT '0',
+  `cancelled_bookings` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`booking_month`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Report 4: final occupancy of every performed flight.
+CREATE TABLE `Report_Flight_Occupancy` (
+  `flight_id` int NOT NULL,
+  `total_seats` int NOT NULL,
+  `occupied_seats` int NOT NULL,
+  PRIMARY KEY (`flight_id`),
+  CONSTRAINT `report_flight_occupancy_ibfk_1` FOREIGN KEY (`flight_id`) REFERENCES `Flight` (`flight_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Backfill from history.
+INSERT INTO Report_Aircraft_Month (aircraft_id, month, flights_performed, flights_cancelled, performed_minutes)
+SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'),
+       SUM(f.flight_status = 'Performed'),
+       SUM(f.flight_status LIKE 'Cancel%'),
+       COALESCE(SUM(CASE WHEN f.flight_status = 'Performed' THEN r.duration ELSE 0 END), 0)
+FROM Flight f
+JOIN Route r ON f.route_id = r.route_id
+WHERE f.flight_status = 'Performed' OR f.flight_status LIKE 'Cancel%'
+GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m');
+
+INSERT INTO Report_Aircraft_Month_Route (aircraft_id, month, origin, destination, flights)
+SELECT f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination, COUNT(*)
+FROM Flight f
+JOIN Route r ON f.route_id = r.route_id
+WHERE f.flight_status = 'Performed'
+GROUP BY f.aircraft_id, DATE_FORMAT(f.departure_date, '%Y-%m'), r.origin, r.destination;
+
+INSERT INTO Report_Booking_Month (booking_month, total_bookings, cancelled_bookings)
+SELECT DATE_FORMAT(booking_datetime, '%Y-%m'), COUNT(*), SUM(booking_status LIKE 'Cancel%')
+FROM Booking
+GROUP BY DATE_FORMAT(booking_datetime, '%Y-%m');
+
+INSERT INTO Report_Flight_Occupancy (flight_id, total_seats, occupied_seats)
+SELECT f.flight_id,
+       (SELECT COUNT(*) FROM Seat s WHERE s.aircraft_id = f.aircraft_id),
+       (SELECT COUNT(*)
+        FROM Reserved_Seat rs
+        JOIN Booking b ON rs.booking_id = b.booking_id
+        WHERE b.flight_id = f.flight_id AND b.booking_status = 'Performed')
+FROM Flight f
+WHERE f.flight_status = 'Performed';
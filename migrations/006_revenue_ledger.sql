@@ -0,0 +1,39 @@
+-- Append-only revenue ledger: one row per reserved seat at booking time ('sale', the price paid),
+-- plus one reversing row per seat when the booking is cancelled ('refund', minus the refunded part).
+-- Aircraft size / manufacturer and the flight's departure date are copied in, so revenue reports
+-- read only this table. Rows are never updated or deleted.
+
+CREATE TABLE `Revenue_Ledger` (
+  `entry_id` bigint NOT NULL AUTO_INCREMENT,
+  `booking_id` varchar(10) NOT NULL,
+  `flight_id` int NOT NULL,
+  `departure_date` date NOT NULL,
+  `aircraft_size` varchar(20) NOT NULL,
+  `manufacturer` varchar(50) NOT NULL,
+  `seat_class` varchar(20) NOT NULL,
+  `row_num` int NOT NULL,
+  `col_num` varchar(1) NOT NULL,
+  `entry_type` varchar(10) NOT NULL,
+  `amount` decimal(10,2) NOT NULL,
+  `recorded_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`entry_id`),
+  KEY `booking_id` (`booking_id`, `entry_type`),
+  -- Covering index for revenue by size / manufacturer / class over a date range (index-only scan).
+  KEY `idx_revenue_ledger_report` (`departure_date`, `aircraft_size`, `manufacturer`, `seat_class`, `amount`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Backfill: seats of Active / Performed bookings at the flight's price (the price paid was not recorded).
+-- Bookings cancelled before the ledger existed have no seats left and contribute no revenue rows.
+INSERT INTO Revenue_Ledger (booking_id, flight_id, departure_date, aircraft_size, manufacturer,
+                            seat_class, row_num, col_num, entry_type, amount)
+SELECT b.booking_id, f.flight_id, f.departure_date, a.size, a.manufacturer,
+       s.class, rs.row_num, rs.col_num, 'sale',
+       CASE WHEN s.class = 'Business' THEN COALESCE(f.price_business, 0) ELSE COALESCE(f.price_economy, 0) END
+FROM Reserved_Seat rs
+JOIN Booking b ON rs.booking_id = b.booking_id
+JOIN Flight f ON b.flight_id = f.flight_id
+JOIN Aircraft a ON rs.aircraft_id = a.aircraft_id
+JOIN Seat s ON s.aircraft_id = rs.aircraft_id
+           AND s.row_num = rs.row_num
+           AND s.col_num = rs.col_num
+WHERE b.booking_status IN ('Active', 'Performed');
@@ -0,0 +1,17 @@
+-- Stored arrival timestamps for Flight, so time predicates are plain ranges on indexed columns instead
+-- of expressions (COALESCE(arrival_datetime, DATE_ADD(..., INTERVAL r.duration MINUTE)) > ...) that force
+-- a full scan. The departure side (departure_ts and its indexes) is created in 004_flight_departure_index.sql.
+--
+-- arrival_datetime is backfilled from the route duration where missing and becomes NOT NULL
+-- (both flight-creation paths already set it); it is indexed as it is.
+
+UPDATE Flight f
+JOIN Route r ON f.route_id = r.route_id
+SET f.arrival_datetime = DATE_ADD(TIMESTAMP(f.departure_date, f.departure_time), INTERVAL r.duration MINUTE)
+WHERE f.arrival_datetime IS NULL;
+
+ALTER TABLE Flight
+  MODIFY `arrival_datetime` datetime NOT NULL;
+
+-- Scheduling: an aircraft's overlapping flights (arrival_datetime > start) and its latest arrival (chain tail).
+CREATE INDEX `idx_flight_aircraft_arrival` ON `Flight` (`aircraft_id`, `arrival_datetime`);
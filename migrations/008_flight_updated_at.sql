@@ -0,0 +1,10 @@
+-- Last-change marker for Flight, so the resource timeline can pick up flights created or cancelled by
+-- other workers regardless of the order their transactions commit in (flight_id order is allocation
+-- order, not commit order). Set by the server on every insert / update; existing rows get the
+-- migration time. Crew rows are only ever inserted together with their flight.
+
+ALTER TABLE Flight
+  ADD COLUMN `updated_at` timestamp(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+-- ResourceTimeline.refresh(): flights changed since the last marker.
+CREATE INDEX `idx_flight_updated_at` ON `Flight` (`updated_at`);
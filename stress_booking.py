@@ -0,0 +1,175 @@
+"""
+FLYTAU booking concurrency stress test.
+
+Fires many parallel bookers at ONE flight, all competing for the same seats through
+create_booking(), then checks that no seat was sold twice and that Flight_Inventory
+matches the reserved seats.
+
+Usage:
+    python stress_booking.py --flight-id 12 --bookers 300
+    python stress_booking.py --flight-id 12 --bookers 300 --keep   # keep the test bookings
+
+Run it against a test database: it creates real bookings (removed at the end unless --keep).
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+# Enough pooled connections for the parallel bookers (must be set before importing main).
+os.environ.setdefault('DB_POOL_SIZE', '50')
+
+from main import db_manager, create_booking, sync_flight_occupancy, SeatConflictError
+
+TEST_EMAIL = 'stress-test@flytau.test'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel booking stress test (zero double-sells check).")
+    parser.add_argument('--flight-id', type=int, required=True, help="Active flight to book seats on")
+    parser.add_argument('--bookers', type=int, default=300, help="Number of parallel bookers")
+    parser.add_argument('--max-seats', type=int, default=3, help="Max seats per booking")
+    parser.add_argument('--hot-seats', type=int, default=20,
+                        help="Bookers only pick among this many seats, to force collisions")
+    parser.add_argument('--keep', action='store_true', help="Do not delete the created bookings")
+    return parser.parse_args()
+
+
+def cleanup(flight_id, booking_ids):
+    """Removes the test bookings (also from the bookings-per-month report) and recomputes the flight's inventory."""
+    if not booking_ids:
+        return
+    placeholders = ','.join(['%s'] * len(booking_ids))
+    with db_manager.transaction() as cursor:
+        # create_booking counted every test booking in Report_Booking_Month (record_booking_created).
+        cursor.execute(f"""
+            UPDATE Report_Booking_Month m
+            JOIN (
+                SELECT DATE_FORMAT(booking_datetime, '%Y-%m') AS booking_month, COUNT(*) AS cnt,
+                       SUM(booking_status LIKE 'Cancel%') AS cancelled
+                FROM Booking
+                WHERE booking_id IN ({placeholders})
+                GROUP BY DATE_FORMAT(booking_datetime, '%Y-%m')
+            ) b ON b.booking_month = m.booking_month
+            SET m.total_bookings = m.total_bookings - b.cnt,
+                m.cancelled_bookings = m.cancelled_bookings - b.cancelled
+        """, tuple(booking_ids))
+        cursor.execute(f"DELETE FROM Reserved_Seat WHERE booking_id IN ({placeholders})", tuple(booking_ids))
+        cursor.execute(f"DELETE FROM Revenue_Ledger WHERE booking_id IN ({placeholders})", tuple(booking_ids))
+        cursor.execute(f"DELETE FROM Booking WHERE booking_id IN ({placeholders})", tuple(booking_ids))
+        cursor.execute("""
+            UPDATE Flight_Inventory fi
+            SET fi.booked_seats = (
+                SELECT COUNT(*)
+                FROM Reserved_Seat rs
+                JOIN Seat s ON s.aircraft_id = rs.aircraft_id
+                           AND s.row_num = rs.row_num
+                           AND s.col_num = rs.col_num
+                WHERE rs.flight_id = fi.flight_id AND s.class = fi.seat_class
+            )
+            WHERE fi.flight_id = %s
+        """, (flight_id,))
+        sync_flight_occupancy(cursor, flight_id)
+
+
+def main():
+    args = parse_args()
+
+    flight = db_manager.fetch_one("SELECT * FROM Flight WHERE flight_id = %s", (args.flight_id,))
+    if not flight or flight['flight_status'] != 'Active':
+        print(f"ERROR: flight {args.flight_id} does not exist or is not Active.")
+        raise SystemExit(1)
+
+    reserved = db_manager.fetch_all(
+        "SELECT row_num, col_num FROM Reserved_Seat WHERE flight_id = %s", (args.flight_id,)
+    ) or []
+    taken = {(r['row_num'], r['col_num']) for r in reserved}
+    free_seats = [
+        (s['row_num'], s['col_num'])
+        for s in db_manager.fetch_all("SELECT row_num, col_num FROM Seat WHERE aircraft_id = %s",
+                                      (flight['aircraft_id'],)) or []
+        if (s['row_num'], s['col_num']) not in taken
+    ]
+    if not free_seats:
+        print("ERROR: flight has no free seats.")
+        raise SystemExit(1)
+    hot_seats = free_seats[:args.hot_seats]
+
+    db_manager.execute_query(
+        "INSERT IGNORE INTO Customer (email, first_name, last_name) VALUES (%s, 'stress', 'test')",
+        (TEST_EMAIL,)
+    )
+
+    results = Counter()
+    booked = {}  # booking_id -> seats
+    lock = threading.Lock()
+    start = threading.Barrier(args.bookers)
+
+    def booker():
+        seats = random.sample(hot_seats, random.randint(1, min(args.max_seats, len(hot_seats))))
+        start.wait()
+        try:
+            booking_id = create_booking(flight, TEST_EMAIL, seats, 0)
+            outcome = 'booked'
+        except SeatConflictError:
+            booking_id, outcome = None, 'conflict'
+        except Exception as e:
+            booking_id, outcome = None, f'error: {type(e).__name__}'
+        with lock:
+            results[outcome] += 1
+            if booking_id:
+                booked[booking_id] = seats
+
+    print(f"Starting {args.bookers} parallel bookers on flight {args.flight_id} "
+          f"({len(hot_seats)} contested seats)...")
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=booker) for _ in range(args.bookers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    print(f"Done in {elapsed:.2f}s: {dict(results)}")
+
+    # 1) No seat appears twice for the flight.
+    doubles = db_manager.fetch_all("""
+        SELECT row_num, col_num, COUNT(*) AS cnt
+        FROM Reserved_Seat
+        WHERE flight_id = %s
+        GROUP BY row_num, col_num
+        HAVING cnt > 1
+    """, (args.flight_id,)) or []
+
+    # 2) Every seat of every successful booking is in Reserved_Seat, and no seat was handed out twice.
+    sold = Counter(seat for seats in booked.values() for seat in seats)
+    oversold = [seat for seat, cnt in sold.items() if cnt > 1]
+
+    # 3) Inventory matches the reserved seats.
+    inventory = db_manager.fetch_one(
+        "SELECT SUM(booked_seats) AS booked FROM Flight_Inventory WHERE flight_id = %s", (args.flight_id,)
+    ) or {}
+    reserved_now = db_manager.fetch_one(
+        "SELECT COUNT(*) AS cnt FROM Reserved_Seat WHERE flight_id = %s", (args.flight_id,)
+    ) or {}
+
+    ok = True
+    if doubles or oversold:
+        ok = False
+        print(f"FAIL: double-sold seats: {doubles or oversold}")
+    if int(inventory.get('booked') or 0) != int(reserved_now.get('cnt') or 0):
+        ok = False
+        print(f"FAIL: inventory booked={inventory.get('booked')} but reserved seats={reserved_now.get('cnt')}")
+    if ok:
+        print(f"OK: zero double-sells, {sum(sold.values())} seats sold in {len(booked)} bookings.")
+
+    if not args.keep:
+        cleanup(args.flight_id, list(booked))
+    db_manager.pool.close_all()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
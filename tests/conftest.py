@@ -0,0 +1,5 @@
+import os
+import sys
+
+# main.py lives in the repository root; importing it does not connect to the database.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+
+import mysql.connector
+import pytest
+from mysql.connector import errorcode
+
+import main
+from main import SeatConflictError, create_booking
+
+FLIGHT = {'flight_id': 7, 'aircraft_id': 3}
+
+
+class FakeTransaction:
+    """Stands in for db_manager.transaction(): status of the locked flight, no holds, scripted batch failures."""
+
+    def __init__(self, status='Active', fail_seat_batch=()):
+        self.status = status
+        self.fail_seat_batch = list(fail_seat_batch)   # one error (or None) per attempt
+        self.attempts = 0
+        self.rows = []
+
+    @contextmanager
+    def __call__(self):
+        self.attempts += 1
+        yield self
+
+    def execute(self, query, params=None):
+        self.rows = [{'flight_status': self.status}] if 'FOR UPDATE' in query else []
+
+    def executemany(self, query, seq_params):
+        if 'Reserved_Seat' in query and self.fail_seat_batch:
+            error = self.fail_seat_batch.pop(0)
+            if error is not None:
+                raise error
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+def duplicate(key):
+    return mysql.connector.IntegrityError(msg=f"Duplicate entry 'x' for key '{key}'", errno=errorcode.ER_DUP_ENTRY)
+
+
+@pytest.fixture
+def booking_db(monkeypatch):
+    def install(transaction):
+        monkeypatch.setattr(main.db_manager, 'transaction', transaction)
+        for name in ('record_seat_sales', 'adjust_flight_inventory', 'sync_flight_occupancy', 'record_booking_created'):
+            monkeypatch.setattr(main, name, lambda *args, **kwargs: {})
+        return transaction
+    return install
+
+
+def test_booking_is_written_in_one_transaction(booking_db):
+    transaction = booking_db(FakeTransaction())
+    booking_id = create_booking(FLIGHT, 'a@b.c', [(1, 'A'), (1, 'B')], 1000)
+    assert len(booking_id) == 8 and transaction.attempts == 1
+
+
+def test_taken_seat_is_a_conflict(booking_db):
+    booking_db(FakeTransaction(fail_seat_batch=[duplicate('reserved_seat.uq_reserved_seat_flight_seat')]))
+    with pytest.raises(SeatConflictError):
+        create_booking(FLIGHT, 'a@b.c', [(1, 'A')], 500)
+
+
+def test_booking_id_collision_is_retried(booking_db):
+    transaction = booking_db(FakeTransaction(fail_seat_batch=[duplicate('booking.PRIMARY'), None]))
+    create_booking(FLIGHT, 'a@b.c', [(1, 'A')], 500)
+    assert transaction.attempts == 2
+
+
+def test_booking_id_collisions_give_up_after_three_attempts(booking_db):
+    booking_db(FakeTransaction(fail_seat_batch=[duplicate('booking.PRIMARY')] * 3))
+    with pytest.raises(SeatConflictError, match="booking id"):
+        create_booking(FLIGHT, 'a@b.c', [(1, 'A')], 500)
+
+
+def test_flight_that_is_no_longer_active_is_a_conflict(booking_db):
+    booking_db(FakeTransaction(status='Full'))
+    with pytest.raises(SeatConflictError):
+        create_booking(FLIGHT, 'a@b.c', [(1, 'A')], 500)
+
+
+def test_other_integrity_errors_propagate(booking_db):
+    error = mysql.connector.IntegrityError(msg="Cannot add or update a child row", errno=errorcode.ER_NO_REFERENCED_ROW_2)
+    booking_db(FakeTransaction(fail_seat_batch=[error]))
+    with pytest.raises(mysql.connector.IntegrityError):
+        create_booking(FLIGHT, 'a@b.c', [(1, 'A')], 500)
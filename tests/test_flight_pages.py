@@ -0,0 +1,33 @@
+from datetime import date, datetime
+
+import pytest
+
+from main import FLIGHT_PAGE_SIZE, FLIGHT_PAGE_SIZE_MAX, day_range, decode_flight_cursor, encode_flight_cursor, \
+    page_size_arg
+
+
+def test_cursor_round_trip():
+    flight = {'departure_ts': datetime(2026, 3, 1, 8, 5, 30), 'flight_id': 4217}
+    cursor = encode_flight_cursor(flight)
+    assert cursor == '20260301T080530_4217'
+    assert decode_flight_cursor(cursor) == (datetime(2026, 3, 1, 8, 5, 30), 4217)
+
+
+@pytest.mark.parametrize("cursor", [None, '', 'garbage', '20260301T080530', '20260301_12',
+                                    '20260301T080530_x', '20260301T080530_1_2', 12])
+def test_malformed_cursor(cursor):
+    assert decode_flight_cursor(cursor) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ('20', 20), ('0', 1), ('-5', 1), ('100000', FLIGHT_PAGE_SIZE_MAX), (None, FLIGHT_PAGE_SIZE), ('abc', FLIGHT_PAGE_SIZE),
+])
+def test_page_size_arg(value, expected):
+    assert page_size_arg(value) == expected
+
+
+def test_day_range():
+    assert day_range('2026-03-01') == (datetime(2026, 3, 1), datetime(2026, 3, 2))
+    assert day_range(date(2026, 12, 31)) == (datetime(2026, 12, 31), datetime(2027, 1, 1))
+    assert day_range('2026-02-30') is None
+    assert day_range(None) is None
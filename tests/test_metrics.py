@@ -0,0 +1,54 @@
+import threading
+
+from main import Metrics
+
+
+def _metrics():
+    metrics = Metrics()
+    metrics.counter('bookings_total', 'Bookings')
+    metrics.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    return metrics
+
+
+def test_counters_merge_across_threads_including_exited_ones():
+    metrics = _metrics()
+
+    def work():
+        for _ in range(1000):
+            metrics.inc('bookings_total', kind='web')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.inc('bookings_total', 2, kind='cli')
+
+    merged = metrics.collect()
+    assert merged[('bookings_total', (('kind', 'web'),))] == 8000
+    assert merged[('bookings_total', (('kind', 'cli'),))] == 2
+    # Exited threads were folded into the retired total; a second collect must not count them twice.
+    assert len(metrics._shards) == 1
+    assert metrics.collect()[('bookings_total', (('kind', 'web'),))] == 8000
+
+
+def test_histogram_render_is_cumulative():
+    metrics = _metrics()
+    for value in (0.05, 0.5, 0.5, 3):
+        metrics.observe('latency_seconds', value, route='/')
+    text = metrics.render()
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/"} 4' in text
+    assert 'latency_seconds_sum{route="/"} 4.050000' in text
+    assert '# TYPE bookings_total counter' in text
+
+
+def test_label_values_are_escaped_and_sampled_values_rendered():
+    metrics = _metrics()
+    metrics.inc('bookings_total', kind='a"b\\c')
+    text = metrics.render(sampled=[('pool_in_use', 'gauge', 'Pool', [({'pool': 'primary'}, 3)])])
+    assert 'bookings_total{kind="a\\"b\\\\c"} 1' in text
+    assert '# TYPE pool_in_use gauge' in text
+    assert 'pool_in_use{pool="primary"} 3' in text
@@ -0,0 +1,56 @@
+from main import QueryCache, tables_in, written_tables
+
+
+def test_tables_in_and_written_tables():
+    query = "SELECT * FROM Flight f JOIN `Route` r ON f.route_id = r.route_id"
+    assert tables_in(query) == {'flight', 'route'}
+    assert written_tables(query) == set()
+    assert written_tables("UPDATE Flight_Inventory SET booked_seats = 1") == {'flight_inventory'}
+    assert written_tables("  insert into Booking (booking_id) VALUES (%s)") == {'booking'}
+
+
+def test_hit_and_miss():
+    cache = QueryCache()
+    assert cache.get('q') == (False, None)
+    cache.set('q', [1, 2], tables=['Flight'])
+    assert cache.get('q') == (True, [1, 2])
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_invalidate_drops_every_entry_tagged_with_the_table():
+    cache = QueryCache()
+    cache.set('flights', 'a', tables=['Flight', 'Route'])
+    cache.set('routes', 'b', tables=['Route'])
+    cache.set('seats', 'c', tables=['Seat'])
+    cache.invalidate('ROUTE')
+    assert cache.get('flights') == (False, None)
+    assert cache.get('routes') == (False, None)
+    assert cache.get('seats') == (True, 'c')
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_replaced_entry_loses_its_old_tags():
+    cache = QueryCache()
+    cache.set('q', 'old', tables=['Flight'])
+    cache.set('q', 'new', tables=['Route'])
+    cache.invalidate('Flight')
+    assert cache.get('q') == (True, 'new')
+
+
+def test_ttl_expiry():
+    cache = QueryCache()
+    cache.set('q', 'v', tables=['Flight'], ttl=-1)
+    assert cache.get('q') == (False, None)
+    assert cache.stats()['expirations'] == 1
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.set('a', 1, tables=['T'])
+    cache.set('b', 2, tables=['T'])
+    cache.get('a')                      # 'b' is now the least recently used
+    cache.set('c', 3, tables=['T'])
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+
+from main import QueryInstrumentation, query_fingerprint, redact_params
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT * FROM Flight WHERE flight_id = 12", "SELECT * FROM Flight WHERE flight_id = %s"),
+    ("SELECT * FROM Customer WHERE email = 'a@b.c'", "SELECT * FROM Customer WHERE email = 'it''s'"),
+    ("SELECT * FROM Flight WHERE flight_id IN (%s, %s)", "SELECT * FROM Flight WHERE flight_id IN (1,2,3,4)"),
+    ("SELECT 1\n  FROM   Flight", "SELECT 1 FROM Flight"),
+    ("DELETE FROM Seat_Hold WHERE (row_num, col_num) IN ((%s, %s), (%s, %s))",
+     "DELETE FROM Seat_Hold WHERE (row_num, col_num) IN ((%s, %s), (%s, %s), (%s, %s))"),
+])
+def test_same_shape_same_fingerprint(a, b):
+    assert query_fingerprint(a) == query_fingerprint(b)
+
+
+def test_different_shapes_differ():
+    assert query_fingerprint("SELECT * FROM Flight WHERE flight_id = %s") != \
+        query_fingerprint("SELECT * FROM Flight WHERE route_id = %s")
+
+
+def test_fingerprint_text():
+    assert query_fingerprint("SELECT *  FROM Flight\nWHERE price > 10.5 AND id IN (%s, %s)") == \
+        "SELECT * FROM Flight WHERE price > ? AND id IN (?+)"
+
+
+def test_table_names_with_digits_are_kept():
+    assert 'Report_Aircraft_Month' in query_fingerprint("SELECT * FROM Report_Aircraft_Month")
+
+
+def test_redact_params_never_logs_values():
+    assert redact_params(None) == []
+    assert redact_params(('secret@example.com', 5, [1, 2], b'xy')) == ['str(18)', 'int', 'list[2]', 'bytes(2)']
+    assert redact_params({'email': 'a@b'}) == {'email': 'str(3)'}
+
+
+def test_instrumentation_warns_once_per_n_plus_one_and_logs_slow_queries(caplog):
+    instrumentation = QueryInstrumentation(logging.getLogger('test'), slow_query_ms=100, n_plus_one_threshold=3)
+    instrumentation.begin_request('/flights')
+    with caplog.at_level(logging.WARNING):
+        for flight_id in range(6):
+            instrumentation.record("SELECT * FROM Seat WHERE aircraft_id = %s", (flight_id,), 1.0, 10)
+        instrumentation.record("SELECT * FROM Booking", (), 250.0, 10 ** 5)
+    summary = instrumentation.end_request()
+    assert summary['queries'] == 7
+    assert sum('Possible N+1' in r.message for r in caplog.records) == 1
+    stats = instrumentation.stats()
+    assert stats['routes']['/flights']['n_plus_one_warnings'] == 1
+    assert [q['query'] for q in stats['slow_queries']] == ['SELECT * FROM Booking']
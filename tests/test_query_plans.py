@@ -0,0 +1,95 @@
+"""
+Query plan regression check (benchmarks.query_plans) as a pytest test, plus unit tests of its comparison.
+
+test_no_plan_regressions drives the app against the configured database (it creates and cancels a
+booking), so it only runs with FLYTAU_QUERY_PLANS=1, a reachable database and a recorded baseline
+(python -m benchmarks.query_plans --update); otherwise it is skipped.
+"""
+import json
+import os
+
+import mysql.connector
+import pytest
+
+from benchmarks import query_plans
+
+
+def _table(name, access_type, key, rows):
+    return {'table': name, 'access_type': access_type, 'key': key, 'rows': rows}
+
+
+def _compare(current, baseline):
+    return query_plans.compare(current, baseline, small_table=1000, rows_factor=10.0, max_rows=None)
+
+
+def test_table_plans_walks_nested_documents():
+    document = {'query_block': {'nested_loop': [
+        {'table': {'table_name': 'f', 'access_type': 'range', 'key': 'idx_flight_departure_ts',
+                   'rows_examined_per_scan': 40}},
+        {'table': {'table_name': 'r', 'access_type': 'eq_ref', 'key': 'PRIMARY', 'rows_examined_per_scan': 1,
+                   'attached_subqueries': [{'query_block': {'table': {
+                       'table_name': 'b', 'access_type': 'ref', 'key': 'flight_id',
+                       'rows_examined_per_scan': 3}}}]}},
+    ]}}
+    assert [t['table'] for t in query_plans.table_plans(document)] == ['f', 'r', 'b']
+
+
+def test_unchanged_plan_is_not_a_regression():
+    plans = {'q': {'tables': [_table('f', 'ref', 'idx', 50)]}}
+    assert _compare(plans, plans) == []
+
+
+def test_full_scan_of_large_table_is_a_regression():
+    baseline = {'q': {'tables': [_table('f', 'ref', 'idx', 50)]}}
+    current = {'q': {'tables': [_table('f', 'ALL', None, 50000)]}}
+    problems = _compare(current, baseline)
+    assert any('full scan' in p for p in problems)
+    assert any('lost index idx' in p for p in problems)
+
+
+def test_full_scan_of_small_table_is_accepted():
+    current = {'q': {'tables': [_table('Route', 'ALL', None, 20)]}}
+    assert _compare(current, {}) == []
+
+
+def test_new_statement_full_scan_is_a_regression():
+    current = {'new': {'tables': [_table('Booking', 'ALL', None, 10 ** 6)]}}
+    assert len(_compare(current, {})) == 1
+
+
+def test_row_estimate_growth_is_a_regression():
+    baseline = {'q': {'tables': [_table('f', 'range', 'idx', 200)]}}
+    current = {'q': {'tables': [_table('f', 'range', 'idx', 5000)]}}
+    assert any('estimated rows 200 -> 5000' in p for p in _compare(current, baseline))
+
+
+def test_new_explain_error_is_a_regression():
+    baseline = {'q': {'tables': []}}
+    assert len(_compare({'q': {'error': 'Unknown column'}}, baseline)) == 1
+
+
+def _database_reachable(config):
+    try:
+        mysql.connector.connect(connection_timeout=3, **config).close()
+        return True
+    except (mysql.connector.Error, TypeError, ValueError):
+        return False
+
+
+@pytest.mark.skipif(os.getenv('FLYTAU_QUERY_PLANS') != '1',
+                    reason="writes to the database; set FLYTAU_QUERY_PLANS=1 against a test database")
+def test_no_plan_regressions(monkeypatch):
+    import main as flytau
+
+    if not os.path.exists(query_plans.DEFAULT_BASELINE):
+        pytest.skip("no baseline; record one with python -m benchmarks.query_plans --update")
+    if not _database_reachable(flytau.DB_CONFIG):
+        pytest.skip("database not reachable")
+    monkeypatch.setattr(flytau, 'STATUS_SCHEDULER_ENABLED', False)
+
+    with open(query_plans.DEFAULT_BASELINE, encoding='utf-8') as f:
+        baseline = json.load(f)['plans']
+    _, plans = query_plans.capture_plans(flytau, seed=1)
+    regressions = query_plans.compare(plans, baseline, query_plans.DEFAULT_SMALL_TABLE,
+                                      query_plans.DEFAULT_ROWS_FACTOR, None)
+    assert not regressions, "\n".join(regressions)
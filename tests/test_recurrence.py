@@ -0,0 +1,43 @@
+from datetime import date
+
+import pytest
+
+from main import MAX_OCCURRENCES, parse_recurrence
+
+
+def test_daily_until_is_inclusive():
+    dates = parse_recurrence("FREQ=DAILY;UNTIL=20260305", date(2026, 3, 1))
+    assert dates == [date(2026, 3, d) for d in range(1, 6)]
+
+
+def test_daily_interval_and_count():
+    dates = parse_recurrence("FREQ=DAILY;INTERVAL=2;COUNT=3", date(2026, 3, 1))
+    assert dates == [date(2026, 3, 1), date(2026, 3, 3), date(2026, 3, 5)]
+
+
+def test_weekly_byday():
+    # 2026-03-02 is a Monday.
+    dates = parse_recurrence("RRULE:FREQ=WEEKLY;BYDAY=MO,TH;COUNT=4", date(2026, 3, 2))
+    assert dates == [date(2026, 3, 2), date(2026, 3, 5), date(2026, 3, 9), date(2026, 3, 12)]
+
+
+def test_weekly_defaults_to_start_weekday():
+    dates = parse_recurrence("FREQ=WEEKLY;INTERVAL=2;COUNT=2", date(2026, 3, 4))
+    assert dates == [date(2026, 3, 4), date(2026, 3, 18)]
+
+
+def test_occurrences_are_capped():
+    assert len(parse_recurrence("FREQ=DAILY;UNTIL=20991231", date(2026, 1, 1))) == MAX_OCCURRENCES
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=MONTHLY;COUNT=3",
+    "FREQ=DAILY",
+    "FREQ=DAILY;COUNT=0",
+    "FREQ=DAILY;COUNT=-3",
+    "FREQ=DAILY;INTERVAL=0;COUNT=3",
+    "FREQ=WEEKLY;BYDAY=XX;COUNT=3",
+])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        parse_recurrence(rule, date(2026, 3, 1))
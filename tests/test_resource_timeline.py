@@ -0,0 +1,173 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import ResourceTimeline, _Schedule
+
+T = datetime(2026, 11, 1, 8, 0)
+
+
+def h(hours):
+    return T + timedelta(hours=hours)
+
+
+class FakeDB:
+    """Just enough of DBManager._cursor() for ResourceTimeline._load(): Flight rows with crews and updated_at."""
+
+    def __init__(self):
+        self.now = datetime(2026, 10, 1, 12, 0)
+        self.flights = {}   # flight_id -> [aircraft_id, start, end, destination, status, updated_at]
+        self.crews = {}     # flight_id -> {'Pilots_on_Flights': [...], 'Flight_Attendant_on_Flights': [...]}
+
+    def write(self, flight_id, aircraft_id, start, end, destination, pilots=(), attendants=(), status='Active'):
+        self.now += timedelta(seconds=1)
+        self.flights[flight_id] = [aircraft_id, start, end, destination, status, self.now]
+        self.crews[flight_id] = {'Pilots_on_Flights': list(pilots), 'Flight_Attendant_on_Flights': list(attendants)}
+
+    def cancel(self, flight_id):
+        self.now += timedelta(seconds=1)
+        self.flights[flight_id][4:] = ['Cancelled', self.now]
+
+    @contextmanager
+    def _cursor(self, dictionary=True, read=False):
+        yield None, _FakeCursor(self)
+
+
+class _FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def _matching(self, params):
+        for flight_id, (_, _, _, _, status, updated_at) in self.db.flights.items():
+            if (updated_at >= params[0]) if params else status != 'Cancelled':
+                yield flight_id
+
+    def execute(self, query, params=()):
+        if 'NOW(6)' in query:
+            self.rows = [(self.db.now,)]
+        elif 'r.destination' in query:
+            self.rows = [(fid, *self.db.flights[fid][:4], self.db.flights[fid][4] == 'Cancelled')
+                         for fid in self._matching(params)]
+        else:
+            table = 'Pilots_on_Flights' if 'Pilots_on_Flights' in query else 'Flight_Attendant_on_Flights'
+            flight_ids = self._matching(params) if params else self.db.crews
+            self.rows = [(fid, emp) for fid in flight_ids for emp in self.db.crews[fid][table]]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_schedule_is_free_uses_half_open_intervals():
+    schedule = _Schedule([(h(0), h(2), 1, 'ATH'), (h(5), h(6), 2, 'TLV')])
+    assert not schedule.is_free(h(1), h(3))
+    assert schedule.is_free(h(2), h(5))            # touches both neighbours
+    assert not schedule.is_free(h(-1), h(7))       # covers everything
+    assert schedule.is_free(h(-3), h(0))
+    assert schedule.tail == ('TLV', h(6), 2)
+
+
+def test_schedule_long_flight_shadows_later_short_ones():
+    # max_ends: a long earlier flight still overlaps an interval after a later, shorter flight.
+    schedule = _Schedule([(h(0), h(10), 1, 'JFK'), (h(1), h(2), 2, 'ATH')])
+    assert not schedule.is_free(h(3), h(4))
+    assert schedule.tail == ('JFK', h(10), 1)
+
+
+def test_schedule_insert_and_remove_keep_tail_and_max_ends():
+    schedule = _Schedule()
+    schedule.insert(h(0), h(10), 1, 'JFK')
+    schedule.insert(h(1), h(2), 2, 'ATH')
+    schedule.remove(1)
+    assert schedule.is_free(h(3), h(4))
+    assert schedule.tail == ('ATH', h(2), 2)
+    schedule.remove(2)
+    schedule.remove(99)                            # unknown ids are ignored
+    assert schedule.tail is None and schedule.is_free(h(0), h(10))
+
+
+@pytest.fixture
+def db():
+    db = FakeDB()
+    db.write(1, 10, h(0), h(2), 'ATH', pilots=[5], attendants=[7])
+    return db
+
+
+def test_rebuild_and_continuity(db):
+    timeline = ResourceTimeline(db)
+    timeline.rebuild()
+    assert not timeline.is_free('aircraft', 10, h(1), h(3))
+    assert not timeline.is_free('pilot', '5', h(1), h(3))
+    assert timeline.tail('attendant', 7) == ('ATH', h(2))
+    assert timeline.can_take('aircraft', 10, 'ATH', h(3), h(5))
+    assert not timeline.can_take('aircraft', 10, 'TLV', h(3), h(5))    # chain ends in ATH
+    assert not timeline.can_take('aircraft', 10, 'ATH', h(1), h(5))    # overlaps
+    assert timeline.can_take('aircraft', 11, 'TLV', h(1), h(5))        # no flights: starts at TLV
+    assert not timeline.can_take('aircraft', 11, 'ATH', h(1), h(5))
+
+
+def test_refresh_picks_up_out_of_order_commits_and_cancellations(db):
+    timeline = ResourceTimeline(db, min_refresh_interval=0)
+    timeline.rebuild()
+    db.write(3, 11, h(0), h(2), 'ROM')     # committed while flight 2 is still open
+    db.cancel(1)
+    timeline.refresh()
+    assert not timeline.is_free('aircraft', 11, h(1), h(3))
+    assert timeline.is_free('aircraft', 10, h(1), h(3))
+    assert timeline.is_free('pilot', 5, h(1), h(3))
+    db.write(2, 12, h(0), h(2), 'ROM')     # the lower id commits last
+    timeline.refresh()
+    assert not timeline.is_free('aircraft', 12, h(1), h(3))
+
+
+def test_refresh_rereads_the_overlap_window(db):
+    timeline = ResourceTimeline(db, min_refresh_interval=0, refresh_overlap=60)
+    timeline.rebuild()
+    # Written (updated_at) before the last marker, committed after it: still inside the overlap.
+    db.flights[4] = [13, h(0), h(2), 'ROM', 'Active', db.now - timedelta(seconds=30)]
+    db.crews[4] = {'Pilots_on_Flights': [], 'Flight_Attendant_on_Flights': []}
+    timeline.refresh()
+    assert not timeline.is_free('aircraft', 13, h(1), h(3))
+
+
+def test_add_and_remove_flight(db):
+    timeline = ResourceTimeline(db)
+    timeline.rebuild()
+    timeline.add_flight(9, 10, ['5'], [], h(3), h(4), 'TLV')
+    assert timeline.tail('pilot', 5) == ('TLV', h(4))
+    timeline.remove_flight(9)
+    assert timeline.tail('pilot', 5) == ('ATH', h(2))
+
+
+def test_reservations_get_unique_ids_across_threads(db):
+    timeline = ResourceTimeline(db)
+    timeline.rebuild()
+    ids = []
+
+    def reserve():
+        for _ in range(100):
+            ids.append(timeline.reserve(20, [], [], h(3), h(4), 'ATH'))
+
+    threads = [threading.Thread(target=reserve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 400 and all(temp_id < 0 for temp_id in ids)
+
+
+def test_reservations_survive_rebuild_until_removed(db):
+    timeline = ResourceTimeline(db)
+    timeline.rebuild()
+    temp_id = timeline.reserve(20, ['6'], [], h(3), h(4), 'ATH')
+    timeline.rebuild()
+    assert not timeline.is_free('aircraft', 20, h(3), h(4))
+    assert not timeline.is_free('pilot', 6, h(3), h(4))
+    timeline.remove_flight(temp_id)
+    timeline.rebuild()
+    assert timeline.is_free('aircraft', 20, h(3), h(4))
@@ -0,0 +1,48 @@
+import pytest
+
+from main import Record, record_class, shape_rows
+
+COLUMNS = ('flight_id', 'class', 'price')
+ROWS = [(1, 'Economy', 500), (2, 'Business', 1500)]
+
+
+def test_record_access():
+    row = shape_rows(COLUMNS, ROWS, 'record')[0]
+    assert isinstance(row, Record)
+    assert row.flight_id == 1 and row['flight_id'] == 1
+    assert row['class'] == 'Economy' and getattr(row, 'class') == 'Economy'   # keyword column
+    assert row.get('price') == 500 and row.get('missing', 'x') == 'x'
+    assert list(row.keys()) == list(COLUMNS)
+    assert row._asdict() == {'flight_id': 1, 'class': 'Economy', 'price': 500}
+    assert not hasattr(row, '__dict__')
+
+
+def test_record_class_is_cached_per_shape():
+    assert record_class(COLUMNS) is record_class(COLUMNS)
+    assert record_class(COLUMNS) is not record_class(('flight_id',))
+
+
+def test_repeated_column_keeps_last_value():
+    row = record_class(('id', 'id'))(1, 2)
+    assert row['id'] == 2 and list(row.keys()) == ['id']
+
+
+def test_unknown_column():
+    row = record_class(('id',))(1)
+    with pytest.raises(AttributeError):
+        row.missing
+    with pytest.raises(KeyError):
+        row['missing']
+
+
+def test_tuple_and_columns_shapes():
+    assert shape_rows(COLUMNS, ROWS, 'tuple') == ROWS
+    assert shape_rows(COLUMNS, ROWS, 'columns') == {
+        'flight_id': (1, 2), 'class': ('Economy', 'Business'), 'price': (500, 1500),
+    }
+    assert shape_rows(COLUMNS, [], 'columns') == {'flight_id': (), 'class': (), 'price': ()}
+
+
+def test_unknown_row_factory():
+    with pytest.raises(ValueError):
+        shape_rows(COLUMNS, ROWS, 'namedtuple')
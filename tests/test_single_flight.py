@@ -0,0 +1,111 @@
+import pickle
+import threading
+import time
+
+import pytest
+
+import main
+from main import SingleFlight, shape_rows
+
+# Time given to the other callers to reach do() and block on the leader before it finishes.
+SETTLE = 0.2
+
+
+class Gate:
+    """fn for SingleFlight.do(): counts its executions and blocks until open() (then returns / raises)."""
+
+    def __init__(self, result='rows', error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self._open = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self._open.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def open(self):
+        self._open.set()
+
+
+def run_callers(flights, key, fn, gate):
+    """One leader, then one caller per remaining flight instance; returns (results, errors)."""
+    results, errors = [None] * len(flights), [None] * len(flights)
+
+    def call(i):
+        try:
+            results[i] = flights[i].do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(flights))]
+    threads[0].start()
+    gate.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(SETTLE)
+    gate.open()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    gate = Gate()
+    results, errors = run_callers([flight] * 5, 'k', gate, gate)
+    assert gate.calls == 1
+    assert results == ['rows'] * 5 and errors == [None] * 5
+    stats = flight.stats()
+    assert (stats['executions'], stats['coalesced'], stats['in_flight']) == (1, 4, 0)
+
+
+def test_results_are_not_cached():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do('k', lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_error_is_shared_with_waiters():
+    flight = SingleFlight()
+    gate = Gate(error=RuntimeError("db down"))
+    _, errors = run_callers([flight] * 3, 'k', gate, gate)
+    assert gate.calls == 1
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.do('k', lambda: 'again') == 'again'   # a failed key does not stay poisoned
+
+
+def test_waiter_runs_itself_after_timeout():
+    flight = SingleFlight(wait_timeout=0.05)
+    gate = Gate()
+    leader = threading.Thread(target=flight.do, args=('k', gate))
+    leader.start()
+    gate.started.wait(5)
+    assert flight.do('k', lambda: 'own') == 'own'
+    gate.open()
+    leader.join()
+    assert flight.stats()['timeouts'] == 1
+
+
+@pytest.mark.skipif(main.fcntl is None, reason="needs fcntl")
+def test_shared_dir_coalesces_across_processes(tmp_path):
+    # Two instances stand in for two worker processes: flock locks belong to the open file, so they
+    # exclude each other like separate processes would.
+    leader, follower = SingleFlight(shared_dir=str(tmp_path)), SingleFlight(shared_dir=str(tmp_path))
+    gate = Gate()
+    results, errors = run_callers([leader, follower], ('search', 'TLV'), gate, gate)
+    assert gate.calls == 1
+    assert results == ['rows', 'rows'] and errors == [None, None]
+    assert follower.stats()['coalesced_shared'] == 1
+
+
+def test_records_pickle_for_shared_results():
+    row = shape_rows(('flight_id', 'class'), [(1, 'Economy')], 'record')[0]
+    assert pickle.loads(pickle.dumps(row)) == row